@@ -0,0 +1,67 @@
+"""Add full-text search on observation comments
+
+Revision ID: 281c5a83899a
+Revises: a73ee197e6be
+Create Date: 2026-10-17 11:02:51.407716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '281c5a83899a'
+down_revision: Union[str, Sequence[str], None] = 'a73ee197e6be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    PostgreSQL: generated tsvector column (Dutch configuration) + GIN index, built
+    concurrently. SQLite: external-content FTS5 table kept in sync by triggers.
+    Mirrors app.db.ensure_search_index.
+    """
+    dialect = op.get_context().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            "ALTER TABLE observations ADD COLUMN IF NOT EXISTS comment_tsv tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('dutch', coalesce(comment, ''))) STORED"
+        )
+        with op.get_context().autocommit_block():
+            op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_observations_comment_tsv ON observations USING gin (comment_tsv)")
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS observations_fts USING fts5("
+            "comment, content='observations', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS observations_fts_ai AFTER INSERT ON observations BEGIN "
+            "INSERT INTO observations_fts(rowid, comment) VALUES (new.id, new.comment); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS observations_fts_ad AFTER DELETE ON observations BEGIN "
+            "INSERT INTO observations_fts(observations_fts, rowid, comment) VALUES ('delete', old.id, old.comment); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS observations_fts_au AFTER UPDATE OF comment ON observations BEGIN "
+            "INSERT INTO observations_fts(observations_fts, rowid, comment) VALUES ('delete', old.id, old.comment); "
+            "INSERT INTO observations_fts(rowid, comment) VALUES (new.id, new.comment); END"
+        )
+        op.execute("INSERT INTO observations_fts(observations_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_observations_comment_tsv")
+        op.execute("ALTER TABLE observations DROP COLUMN IF EXISTS comment_tsv")
+    elif dialect == 'sqlite':
+        for trigger in ('observations_fts_au', 'observations_fts_ad', 'observations_fts_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS observations_fts")
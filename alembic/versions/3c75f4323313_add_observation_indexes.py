@@ -0,0 +1,55 @@
+"""Add observation and person indexes
+
+Revision ID: 3c75f4323313
+Revises: 1b804f80154f
+Create Date: 2026-10-17 09:12:04.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c75f4323313'
+down_revision: Union[str, Sequence[str], None] = '1b804f80154f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, unique) — keep in sync with the Index() declarations in app/db.py
+INDEXES = [
+    ('ix_observations_observed_at_id', 'observations', ['observed_at', 'id'], False),
+    ('ix_observations_observed_at_category_id', 'observations', ['observed_at', 'category_id'], False),
+    ('ix_observations_category_observed_at_id', 'observations', ['category_id', 'observed_at', 'id'], False),
+    ('ix_observations_school_year_category_observed_at', 'observations', ['school_year_id', 'category_id', 'observed_at'], False),
+    ('uq_observations_person_category_observed_at', 'observations', ['person_id', 'category_id', 'observed_at'], True),
+    ('ix_persons_school_year_full_name', 'persons', ['school_year_id', 'full_name'], False),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema.
+
+    On PostgreSQL the indexes are built with CREATE INDEX CONCURRENTLY so the
+    observations table stays writable during the build. That statement cannot run
+    inside a transaction, hence the autocommit block.
+    """
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=unique,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _unique in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,39 @@
+"""Add login_attempts table for the shared login rate limiter
+
+Revision ID: 5a2c9e7d1f08
+Revises: e1f7b3a90c52
+Create Date: 2026-10-17 18:05:13.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a2c9e7d1f08'
+down_revision: Union[str, Sequence[str], None] = 'e1f7b3a90c52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'login_attempts',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('window_start', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('previous', sa.Integer(), nullable=False),
+        sa.Column('locked_until', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_login_attempts_window_start', 'login_attempts', ['window_start'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_login_attempts_window_start', table_name='login_attempts', if_exists=True)
+    op.drop_table('login_attempts')
@@ -0,0 +1,53 @@
+"""Add updated_at index and observation tombstones for delta refresh
+
+Revision ID: 5e2d8c41a9b7
+Revises: 281c5a83899a
+Create Date: 2026-10-17 11:48:20.614092
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2d8c41a9b7'
+down_revision: Union[str, Sequence[str], None] = '281c5a83899a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'observation_deletions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('observation_id', sa.Integer(), nullable=False),
+        sa.Column('school_year_id', sa.Integer(), nullable=False),
+        sa.Column('person_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('observed_at', sa.Date(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index(
+        'ix_observation_deletions_school_year_id', 'observation_deletions', ['school_year_id', 'id'], if_not_exists=True
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_observations_school_year_updated_at',
+            'observations',
+            ['school_year_id', 'updated_at'],
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_observations_school_year_updated_at', table_name='observations', if_exists=True, postgresql_concurrently=True)
+    op.drop_index('ix_observation_deletions_school_year_id', table_name='observation_deletions', if_exists=True)
+    op.drop_table('observation_deletions', if_exists=True)
@@ -0,0 +1,56 @@
+"""Add category closure table for subtree filters
+
+Revision ID: 7f3a9c1d2e4b
+Revises: 5e2d8c41a9b7
+Create Date: 2026-10-17 14:02:37.118540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f3a9c1d2e4b'
+down_revision: Union[str, Sequence[str], None] = '5e2d8c41a9b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'category_closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['categories.id']),
+        sa.ForeignKeyConstraint(['descendant_id'], ['categories.id']),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id'),
+        if_not_exists=True,
+    )
+    op.create_index(
+        'ix_category_closure_descendant_id', 'category_closure', ['descendant_id', 'ancestor_id'], if_not_exists=True
+    )
+    # Same recursive query as app.db.rebuild_category_closure; depth is capped in case
+    # existing parent_id data contains a cycle.
+    op.execute(
+        """
+        WITH RECURSIVE tree(ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM categories
+            UNION ALL
+            SELECT tree.ancestor_id, categories.id, tree.depth + 1
+            FROM tree JOIN categories ON categories.parent_id = tree.descendant_id
+            WHERE tree.depth < 64
+        )
+        INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, MIN(depth) FROM tree GROUP BY ancestor_id, descendant_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_category_closure_descendant_id', table_name='category_closure', if_exists=True)
+    op.drop_table('category_closure', if_exists=True)
@@ -0,0 +1,40 @@
+"""Index observation_deletions by school year and deleted_at for the delta overlap
+
+Revision ID: 8d3f0b6a2c91
+Revises: 5a2c9e7d1f08
+Create Date: 2026-10-17 19:02:13.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3f0b6a2c91'
+down_revision: Union[str, Sequence[str], None] = '5a2c9e7d1f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_observation_deletions_school_year_deleted_at',
+            'observation_deletions',
+            ['school_year_id', 'deleted_at'],
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_observation_deletions_school_year_deleted_at',
+            table_name='observation_deletions',
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,40 @@
+"""Add prefix search indexes for the admin user list
+
+Revision ID: 9b1e6d4c8a20
+Revises: 7f3a9c1d2e4b
+Create Date: 2026-10-17 15:21:09.447103
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1e6d4c8a20'
+down_revision: Union[str, Sequence[str], None] = '7f3a9c1d2e4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        # text_pattern_ops lets LIKE 'abc%' use the index under any collation
+        with op.get_context().autocommit_block():
+            op.execute('CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_pattern ON users (email text_pattern_ops)')
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_full_name_lower ON users (lower(full_name) text_pattern_ops)'
+            )
+    else:
+        op.execute('CREATE INDEX IF NOT EXISTS ix_users_full_name_lower ON users (lower(full_name))')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_users_full_name_lower')
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_pattern')
+    else:
+        op.execute('DROP INDEX IF EXISTS ix_users_full_name_lower')
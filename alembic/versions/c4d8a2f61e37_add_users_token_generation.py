@@ -0,0 +1,29 @@
+"""Add users.token_generation for signed login tokens
+
+Revision ID: c4d8a2f61e37
+Revises: 9b1e6d4c8a20
+Create Date: 2026-10-17 16:40:52.301866
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8a2f61e37'
+down_revision: Union[str, Sequence[str], None] = '9b1e6d4c8a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a constant server default: no table rewrite on PostgreSQL 11+
+    op.add_column('users', sa.Column('token_generation', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_generation')
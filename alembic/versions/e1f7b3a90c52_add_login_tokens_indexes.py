@@ -0,0 +1,39 @@
+"""Add login_tokens indexes for purging and per-user caps
+
+Revision ID: e1f7b3a90c52
+Revises: c4d8a2f61e37
+Create Date: 2026-10-17 17:12:44.905311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f7b3a90c52'
+down_revision: Union[str, Sequence[str], None] = 'c4d8a2f61e37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_login_tokens_expires_at', 'login_tokens', ['expires_at'], if_not_exists=True, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_login_tokens_user_id_created_at',
+            'login_tokens',
+            ['user_id', 'created_at'],
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_login_tokens_user_id_created_at', table_name='login_tokens', if_exists=True, postgresql_concurrently=True)
+        op.drop_index('ix_login_tokens_expires_at', table_name='login_tokens', if_exists=True, postgresql_concurrently=True)
@@ -1,32 +1,40 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
 from typing import Optional
+import base64
+import hashlib
+import hmac
+import json
 import secrets
-import time
-import uuid
 
-import streamlit as st
+from sqlalchemy import bindparam, select
 
-from app.db import get_engine, users, get_user_by_email, hash_password, verify_password, login_tokens
+from app.db import _get_setting, bump_data_version, connect, get_session_user, transaction, users, get_user_by_email, login_tokens
+from app.hashing import hash_password, hash_passwords, needs_rehash, verify_password
+from app.ratelimit import Limit, create_limiter
+from app.state import is_dev_mode
 
 
 class AuthLocked(Exception):
     """Raised when an account is temporarily locked due to repeated failed attempts."""
 
 
-# Simple in-memory login attempt tracker. For single-process deployments this is sufficient.
-LOGIN_ATTEMPTS: dict[str, dict] = {}
+# Failed logins are limited per e-mail address and, optionally, per client (IP address
+# or browser session), on the backend chosen by RATE_LIMIT_BACKEND (see app.ratelimit).
 MAX_ATTEMPTS = 5
 WINDOW_SECONDS = 60
 LOCK_SECONDS = 300
+# one client trying several accounts; off (0) by default, as a whole school often
+# shares one IP address behind NAT
+MAX_CLIENT_ATTEMPTS = int(_get_setting("LOGIN_CLIENT_MAX_ATTEMPTS") or 0)
+
+EMAIL_LIMITER = create_limiter("email", Limit(MAX_ATTEMPTS, WINDOW_SECONDS, LOCK_SECONDS))
+CLIENT_LIMITER = create_limiter("client", Limit(MAX_CLIENT_ATTEMPTS, WINDOW_SECONDS, LOCK_SECONDS)) if MAX_CLIENT_ATTEMPTS > 0 else None
+# per-email entries of the memory backend (empty with the database backend)
+LOGIN_ATTEMPTS: dict[str, dict] = getattr(EMAIL_LIMITER, "entries", {})
 
-# In-memory token store (Streamlit only, now in session_state)
-def get_url_tokens():
-    """Get or initialize the in-memory URL token store in session_state."""
-    if "URL_TOKENS" not in st.session_state:
-        st.session_state.URL_TOKENS = {}
-    return st.session_state.URL_TOKENS
 TOKEN_VALIDITY = timedelta(hours=1)
 
 
@@ -38,78 +46,63 @@ def _normalize_email(email: str) -> str:
     return (email or "").strip().lower()
 
 
-def _record_failed_attempt(email: str) -> None:
-    """Record a failed login attempt for rate limiting."""
-    email = _normalize_email(email)
-    now = time.time()
-    entry = LOGIN_ATTEMPTS.get(email)
-    if not entry:
-        LOGIN_ATTEMPTS[email] = {"count": 1, "first": now, "locked_until": 0}
-        return
-    # if currently locked and lock expired, reset
-    if entry.get("locked_until", 0) and now >= entry["locked_until"]:
-        LOGIN_ATTEMPTS[email] = {"count": 1, "first": now, "locked_until": 0}
-        return
-    entry["count"] += 1
-    # if within window and exceed max attempts, set locked_until
-    if now - entry["first"] <= WINDOW_SECONDS and entry["count"] >= MAX_ATTEMPTS:
-        entry["locked_until"] = now + LOCK_SECONDS
+def _record_failed_attempt(email: Optional[str], client: Optional[str] = None) -> None:
+    """Record a failed login attempt for rate limiting (`email` None: count it for the client only)."""
+    if email:
+        EMAIL_LIMITER.record_failure(_normalize_email(email))
+    if client and CLIENT_LIMITER is not None:
+        CLIENT_LIMITER.record_failure(client)
 
 
 def _clear_attempts(email: str) -> None:
-    """Clear failed login attempts for a user."""
-    email = _normalize_email(email)
-    if email in LOGIN_ATTEMPTS:
-        del LOGIN_ATTEMPTS[email]
+    """Clear failed login attempts for a user (the client's count is kept)."""
+    EMAIL_LIMITER.clear(_normalize_email(email))
 
 
 def _is_locked(email: str) -> bool:
-    """Check if a user is currently locked out due to failed attempts."""
-    email = _normalize_email(email)
-    entry = LOGIN_ATTEMPTS.get(email)
-    if not entry:
-        return False
-    locked_until = entry.get("locked_until", 0)
-    if locked_until and time.time() < locked_until:
-        return True
-    # expired lock -> clear
-    if locked_until and time.time() >= locked_until:
-        del LOGIN_ATTEMPTS[email]
-        return False
-    return False
-
-
-def authenticate(email: str, password: str) -> Optional[dict]:
-    """Authenticate a user by email and password. Returns user dict or None."""
+    """Check if a user is locked out due to failed attempts."""
+    return EMAIL_LIMITER.is_locked(_normalize_email(email))
+
+
+def _client_locked(client: Optional[str]) -> bool:
+    """Check if the client trying to log in is locked out (never, when the client limit is off)."""
+    return bool(client) and CLIENT_LIMITER is not None and CLIENT_LIMITER.is_locked(client)
+
+
+def authenticate(email: str, password: str, client: Optional[str] = None) -> Optional[dict]:
+    """Authenticate a user by email and password. Returns user dict or None.
+
+    `client` identifies who is logging in (IP address or session id) for the per-client limit.
+    """
     email = _normalize_email(email)
 
     # simple lockout check
     if _is_locked(email):
         raise AuthLocked("Account temporarily locked due to repeated failed login attempts")
+    if _client_locked(client):
+        raise AuthLocked("Too many failed login attempts from this client")
 
-    engine = get_engine()
-    with engine.connect() as conn:
+    with transaction() as conn:
         row = get_user_by_email(conn, email)
-        if not row:
-            # no such user
-            return None
-        if not verify_password(password, row["password_hash"]):
-            _record_failed_attempt(email)
+        if not row or not verify_password(password, row["password_hash"]):
+            # an unknown address only counts for the client: made-up e-mails get no limiter entry
+            _record_failed_attempt(email if row else None, client)
             return None
         # success: clear attempts
         _clear_attempts(email)
-        # update last_login_at
-        conn.execute(users.update().where(users.c.id == row["id"]).values(last_login_at=datetime.now(timezone.utc)))
-        conn.commit()
-        return dict(row)
+        # update last_login_at, and upgrade a hash made with an outdated work factor while we have the password
+        values = {"last_login_at": datetime.now(timezone.utc)}
+        if needs_rehash(row["password_hash"]):
+            values["password_hash"] = hash_password(password)
+        conn.execute(users.update().where(users.c.id == row["id"]).values(**values))
+        return {**row, **values}
 
 
 def create_user(email: str, full_name: str, is_admin: bool = False, created_by_id: Optional[int] = None, temp_password: Optional[str] = None) -> dict:
     """Create a new user in the system."""
-    engine = get_engine()
     email_n = _normalize_email(email)
 
-    with engine.connect() as conn:
+    with transaction() as conn:
         # check for existing email
         existing = get_user_by_email(conn, email_n)
         if existing:
@@ -129,17 +122,15 @@ def create_user(email: str, full_name: str, is_admin: bool = False, created_by_i
             created_by_id=created_by_id,
         )
         res = conn.execute(ins)
-        conn.commit()
         new_id = res.inserted_primary_key[0]
         return {"id": new_id, "email": email_n, "full_name": full_name, "temp_password": pw}
 
 
 def reset_password(user_id: int) -> str:
     """Reset the password for a user, returning the new temporary password."""
-    engine = get_engine()
-    with engine.connect() as conn:
-        temp = secrets.token_urlsafe(10)
-        pw_hash = hash_password(temp)
+    temp = secrets.token_urlsafe(10)
+    pw_hash = hash_password(temp)
+    with transaction() as conn:
         # clear lockout attempts for this user (email) if present
         row = conn.execute(users.select().where(users.c.id == user_id)).mappings().first()
         if row and row.get("email"):
@@ -148,58 +139,204 @@ def reset_password(user_id: int) -> str:
         conn.execute(
             users.update()
             .where(users.c.id == user_id)
-            .values(password_hash=pw_hash, must_change_password=True, updated_at=datetime.now(timezone.utc))
+            .values(password_hash=pw_hash, must_change_password=True, token_generation=users.c.token_generation + 1, updated_at=datetime.now(timezone.utc))
         )
-        conn.commit()
+        bump_data_version(conn, "users")
         return temp
 
 
-def change_password(user_id: int, new_password: str) -> None:
-    """Change the password for a user."""
-    engine = get_engine()
-    with engine.connect() as conn:
-        pw_hash = hash_password(new_password)
+def reset_passwords(user_ids) -> dict[int, str]:
+    """Reset many passwords in one transaction; returns {user_id: temporary password}."""
+    ids = sorted(set(user_ids))
+    if not ids:
+        return {}
+    temps = {uid: secrets.token_urlsafe(10) for uid in ids}
+    now = datetime.now(timezone.utc)
+    with transaction() as conn:
+        rows = conn.execute(select(users.c.id, users.c.email).where(users.c.id.in_(ids))).all()
+        for row in rows:
+            _clear_attempts(row.email)
+        if not rows:
+            return {}
+        hashes = hash_passwords(temps[row.id] for row in rows)
+        conn.execute(
+            users.update().where(users.c.id == bindparam("uid")).values(token_generation=users.c.token_generation + 1),
+            [
+                {"uid": row.id, "password_hash": pw_hash, "must_change_password": True, "updated_at": now}
+                for row, pw_hash in zip(rows, hashes)
+            ],
+        )
+        bump_data_version(conn, "users")
+    return {row.id: temps[row.id] for row in rows}
+
 
+def change_password(user_id: int, new_password: str) -> Optional[dict]:
+    """Change the password for a user; returns the updated user (without hash), or None if unknown."""
+    pw_hash = hash_password(new_password)
+    with transaction() as conn:
         row = conn.execute(users.select().where(users.c.id == user_id)).mappings().first()
         if row and row.get("email"):
             _clear_attempts(row["email"])
 
-        conn.execute(
+        values = {"password_hash": pw_hash, "must_change_password": False, "updated_at": datetime.now(timezone.utc)}
+        # revoke the tokens signed before the change
+        generation = conn.execute(
             users.update()
             .where(users.c.id == user_id)
-            .values(password_hash=pw_hash, must_change_password=False, updated_at=datetime.now(timezone.utc))
-        )
-        conn.commit()
+            .values(**values, token_generation=users.c.token_generation + 1)
+            .returning(users.c.token_generation)
+        ).scalar()
+        bump_data_version(conn, "users")
+    if row is None:
+        return None
+    user = {**row, **values, "token_generation": generation}
+    del user["password_hash"]
+    return user
 
 
-# Genereer een login-token
-def generate_url_token(user_id: int) -> str:
-    """Generate a URL token for passwordless login."""
-    token = str(uuid.uuid4())
-    expires = datetime.now(timezone.utc) + timedelta(hours=1)
-    created = datetime.now(timezone.utc)
-    eng = get_engine()
-    with eng.connect() as conn:
-        conn.execute(login_tokens.insert().values(token=token, user_id=user_id, expires_at=expires, created_at=created))
-        conn.commit()
-    return token
+# --- Signed login tokens -------------------------------------------------------------------
+#
+# "v2.<payload>.<signature>": the payload is compact JSON with the user id, role flags,
+# expiry and the user's token_generation, signed with HMAC-SHA256. Checking one needs no
+# token table: the signature and expiry are verified in memory, and the generation is
+# compared with the cached user profile, which is only reloaded when the "users" data
+# version changes. Bumping users.token_generation revokes every token of that user.
+# Plain UUID tokens from login_tokens (issued before this format) keep working until they
+# expire.
 
+TOKEN_PREFIX = "v2"
 
-# Controleer of een token geldig is
-def check_url_token(token: str) -> int | None:
-    """Check if a URL token is valid and not expired."""
-    eng = get_engine()
-    with eng.connect() as conn:
-        row = conn.execute(login_tokens.select().where(login_tokens.c.token == token)).mappings().first()
-        if not row:
+
+@dataclass(frozen=True)
+class TokenClaims:
+    user_id: int
+    is_admin: bool
+    must_change_password: bool
+    expires_at: datetime
+    generation: int
+
+
+_token_secret: Optional[bytes] = None
+
+
+def _get_token_secret() -> bytes:
+    """TOKEN_SECRET from env/secrets.
+
+    Required outside dev mode: with a random per-process key, links signed by one server
+    process fail on the others and all links die on a restart. In dev mode a random key
+    is used instead.
+    """
+    global _token_secret
+    if _token_secret is None:
+        configured = _get_setting("TOKEN_SECRET")
+        if not configured and not is_dev_mode():
+            raise RuntimeError("TOKEN_SECRET is not set; configure the same random value on every server process")
+        _token_secret = configured.encode("utf-8") if configured else secrets.token_bytes(32)
+    return _token_secret
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64(hmac.new(_get_token_secret(), f"{TOKEN_PREFIX}.{payload}".encode(), hashlib.sha256).digest())
+
+
+def issue_token(claims: TokenClaims) -> str:
+    body = {
+        "u": claims.user_id,
+        "a": int(claims.is_admin),
+        "m": int(claims.must_change_password),
+        "e": int(claims.expires_at.timestamp()),
+        "g": claims.generation,
+    }
+    payload = _b64(json.dumps(body, separators=(",", ":")).encode())
+    return f"{TOKEN_PREFIX}.{payload}.{_sign(payload)}"
+
+
+def decode_token(token: str, now: Optional[datetime] = None) -> Optional[TokenClaims]:
+    """Claims of a correctly signed, unexpired token; None otherwise. No database access."""
+    try:
+        prefix, payload, signature = token.split(".")
+        if prefix != TOKEN_PREFIX or not hmac.compare_digest(signature, _sign(payload)):
             return None
-        # Fix: always compare offset-aware datetimes
-        from datetime import timezone
-        expires_at = row["expires_at"]
-        if expires_at.tzinfo is None:
-            # Assume UTC if naive
-            from datetime import timezone
-            expires_at = expires_at.replace(tzinfo=timezone.utc)
-        if expires_at < datetime.now(timezone.utc):
+        body = json.loads(_unb64(payload))
+        claims = TokenClaims(
+            user_id=int(body["u"]),
+            is_admin=bool(body["a"]),
+            must_change_password=bool(body["m"]),
+            expires_at=datetime.fromtimestamp(body["e"], timezone.utc),
+            generation=int(body["g"]),
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
+    if claims.expires_at <= (now or datetime.now(timezone.utc)):
+        return None
+    return claims
+
+
+def generate_url_token(user_id: int, user: Optional[dict] = None) -> str:
+    """Signed token for passwordless sign-in via the URL. Pass the user row when at hand to skip a lookup."""
+    if user is None:
+        with connect() as conn:
+            user = get_session_user(conn, user_id)
+    return issue_token(
+        TokenClaims(
+            user_id=user_id,
+            is_admin=bool(user["is_admin"]),
+            must_change_password=bool(user["must_change_password"]),
+            expires_at=datetime.now(timezone.utc) + TOKEN_VALIDITY,
+            generation=user["token_generation"] or 0,
+        )
+    )
+
+
+def _check_legacy_token(conn, token: str) -> Optional[int]:
+    """User id for an unexpired login_tokens row (tokens issued before signed tokens)."""
+    row = conn.execute(select(login_tokens.c.user_id, login_tokens.c.expires_at).where(login_tokens.c.token == token)).first()
+    if not row:
+        return None
+    expires_at = row.expires_at
+    if expires_at.tzinfo is None:
+        # stored naive; assume UTC
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at < datetime.now(timezone.utc):
+        return None
+    return row.user_id
+
+
+def user_from_url_token(token: str) -> Optional[dict]:
+    """The signed-in user for a URL token, or None when it is invalid, expired or revoked.
+
+    The dict is the cached session profile plus `token_expires_at`.
+    """
+    claims = decode_token(token) if token.startswith(TOKEN_PREFIX + ".") else None
+    with connect() as conn:
+        if claims is not None:
+            user = get_session_user(conn, claims.user_id)
+            if user is None or not user["is_active"] or user["token_generation"] != claims.generation:
+                return None
+            return {**user, "is_admin": claims.is_admin, "must_change_password": claims.must_change_password, "token_expires_at": claims.expires_at}
+        if token.startswith(TOKEN_PREFIX + "."):
             return None
-        return row["user_id"]
+        # legacy: a UUID, possibly base64-wrapped as the login page used to put it in the URL
+        try:
+            legacy = _unb64(token).decode()
+        except (ValueError, UnicodeDecodeError):
+            legacy = token
+        user_id = _check_legacy_token(conn, legacy) or _check_legacy_token(conn, token)
+        user = get_session_user(conn, user_id) if user_id else None
+        if user is None or not user["is_active"]:
+            return None
+        return {**user, "token_expires_at": None}
+
+
+def check_url_token(token: str) -> int | None:
+    """Check if a URL token is valid, not expired and not revoked; returns the user id."""
+    user = user_from_url_token(token)
+    return user["id"] if user else None
@@ -0,0 +1,128 @@
+"""Process-wide caches shared by all Streamlit sessions of one server process.
+
+Entries are tagged with the version of the data domain they were loaded from
+(e.g. "categories"). Writers bump the domain version, so the next read in any
+session reloads instead of serving stale rows.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class VersionedCache:
+    """Thread-safe mapping of key -> (version, value)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, tuple[Any, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: Hashable, version: Any, loader: Callable[[], Any], *, store: bool = True) -> Any:
+        """Return the cached value for `key` if it was loaded at `version`, else reload it.
+
+        With `store=False` the cache is bypassed: `loader()` is called and nothing is kept.
+        """
+        if not store:
+            return loader()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # load outside the lock so one slow query does not block other sessions
+        value = loader()
+        with self._lock:
+            self._entries[key] = (version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries also expire after `ttl` seconds.
+
+    Like `VersionedCache`, each entry remembers the data version it was loaded at and
+    is only served while that version is still current.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (version, expires_at, value); order = least recently used first
+        self._entries: OrderedDict[Hashable, tuple[Any, float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        version: Any,
+        loader: Callable[[], Any],
+        refresh: Optional[Callable[[Any, Any], Any]] = None,
+        *,
+        store: bool = True,
+    ) -> Any:
+        """Return the cached value, or load it.
+
+        When the entry exists but its version is outdated, `refresh(old_version,
+        old_value)` is used instead of `loader` if given, so callers can patch the old
+        value with just what changed. It must not mutate `old_value`, which other
+        sessions may still be reading. With `store=False` the cache is bypassed.
+        """
+        if not store:
+            return loader()
+        now = self._clock()
+        stale = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                if entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                stale = entry
+            self.misses += 1
+            if stale is not None and refresh is not None:
+                self.refreshes += 1
+        if stale is not None and refresh is not None:
+            value = refresh(stale[0], stale[2])
+        else:
+            value = loader()
+        with self._lock:
+            self._entries[key] = (version, self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refreshes": self.refreshes,
+            }
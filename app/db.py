@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import functools
 import os
-from typing import Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from typing import Iterable, Iterator, Optional, Union
 import hashlib
 import base64
 import hmac
+import json
+import re
+import threading
+import time
 from pathlib import Path
 
+import pandas as pd
+
 from sqlalchemy import (
     Table,
     Column,
@@ -14,15 +24,33 @@ from sqlalchemy import (
     String,
     Boolean,
     DateTime,
+    Float,
     MetaData,
     create_engine,
+    event,
+    func,
+    literal_column,
+    null,
     select,
     Date,
     Text,
     ForeignKey,
+    Index,
+    case,
+    cast,
+    inspect,
+    text,
+    true,
+    tuple_,
 )
 from sqlalchemy.engine import Engine
-from datetime import datetime, timezone
+from sqlalchemy.sql import column as sa_column, table as sa_table
+from sqlalchemy.exc import IntegrityError, TimeoutError as SATimeoutError
+from sqlalchemy.pool import QueuePool
+from datetime import date, datetime, timedelta, timezone
+
+from app.cache import TTLCache, VersionedCache
+from app.matrix import SCORE_NULL, ScoreMatrix
 
 
 def _default_sqlite_url() -> str:
@@ -40,8 +68,8 @@ def _default_sqlite_url() -> str:
     return f"sqlite:///{db_path}"
 
 
-def _get_database_url_from_streamlit_secrets() -> Optional[str]:
-    """Try to read DATABASE_URL from Streamlit secrets.
+def _get_streamlit_secret(name: str) -> Optional[str]:
+    """Try to read a single value from Streamlit secrets.
 
     This is intended for actual Streamlit runs. For hermetic unit tests / CLI tools,
     you can disable secrets resolution by setting:
@@ -55,14 +83,27 @@ def _get_database_url_from_streamlit_secrets() -> Optional[str]:
     try:
         import streamlit as st  # type: ignore
 
-        value = st.secrets.get("DATABASE_URL")
-        if value:
+        value = st.secrets.get(name)
+        if value is not None:
             return str(value).strip() or None
     except Exception:
         return None
     return None
 
 
+def _get_database_url_from_streamlit_secrets() -> Optional[str]:
+    """Try to read DATABASE_URL from Streamlit secrets."""
+    return _get_streamlit_secret("DATABASE_URL")
+
+
+def _get_setting(name: str) -> Optional[str]:
+    """Read a setting from the environment first, then from Streamlit secrets."""
+    value = os.environ.get(name)
+    if value is not None and value.strip():
+        return value.strip()
+    return _get_streamlit_secret(name)
+
+
 DB_URL = (
     os.environ.get("DATABASE_URL")
     or _get_database_url_from_streamlit_secrets()
@@ -85,6 +126,8 @@ users = Table(
     Column("updated_at", DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc)),
     Column("last_login_at", DateTime, nullable=True),
     Column("created_by_id", Integer, ForeignKey("users.id"), nullable=True),
+    # bumped to revoke every signed login token of the user (password change/reset, role change)
+    Column("token_generation", Integer, nullable=False, default=0, server_default="0"),
 )
 
 school_years = Table(
@@ -105,6 +148,8 @@ persons = Table(
     Column("last_name", String, nullable=False),
     Column("full_name", String, nullable=False),
     Column("external_id", String, nullable=True),
+    # class list for a school year, already in display order
+    Index("ix_persons_school_year_full_name", "school_year_id", "full_name"),
 )
 
 categories = Table(
@@ -119,6 +164,18 @@ categories = Table(
     Column("is_active", Boolean, default=True),
 )
 
+# Transitive closure of categories.parent_id: one row per (ancestor, descendant) pair,
+# including (id, id, 0). Maintained by the category write helpers below.
+category_closure = Table(
+    "category_closure",
+    metadata,
+    Column("ancestor_id", Integer, ForeignKey("categories.id"), primary_key=True),
+    Column("descendant_id", Integer, ForeignKey("categories.id"), primary_key=True),
+    Column("depth", Integer, nullable=False),
+    # "which categories are above this one"
+    Index("ix_category_closure_descendant_id", "descendant_id", "ancestor_id"),
+)
+
 observations = Table(
     "observations",
     metadata,
@@ -131,6 +188,39 @@ observations = Table(
     Column("comment", Text, nullable=True),
     Column("created_at", DateTime, default=lambda: datetime.now(timezone.utc)),
     Column("updated_at", DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc)),
+    # browse query: date range filter + keyset order on (observed_at, id)
+    Index("ix_observations_observed_at_id", "observed_at", "id"),
+    Index("ix_observations_observed_at_category_id", "observed_at", "category_id"),
+    # browse query filtered on one category, keyset order preserved
+    Index("ix_observations_category_observed_at_id", "category_id", "observed_at", "id"),
+    # class pivot: one category over a school year
+    Index("ix_observations_school_year_category_observed_at", "school_year_id", "category_id", "observed_at"),
+    # one observation per (person, category, date); also serves the per-person view
+    Index("uq_observations_person_category_observed_at", "person_id", "category_id", "observed_at", unique=True),
+    # delta refresh: rows of a school year changed since a watermark
+    Index("ix_observations_school_year_updated_at", "school_year_id", "updated_at"),
+)
+
+# Tombstones for deleted observations, so loaded grids can drop them on a delta refresh.
+observation_deletions = Table(
+    "observation_deletions",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("observation_id", Integer, nullable=False),
+    Column("school_year_id", Integer, nullable=False),
+    Column("person_id", Integer, nullable=False),
+    Column("category_id", Integer, nullable=False),
+    Column("observed_at", Date, nullable=False),
+    Column("deleted_at", DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)),
+    Index("ix_observation_deletions_school_year_id", "school_year_id", "id"),
+    Index("ix_observation_deletions_school_year_deleted_at", "school_year_id", "deleted_at"),
+)
+
+data_versions = Table(
+    "data_versions",
+    metadata,
+    Column("domain", String, primary_key=True),
+    Column("version", Integer, nullable=False, default=0),
 )
 
 login_tokens = Table(
@@ -140,19 +230,452 @@ login_tokens = Table(
     Column("user_id", Integer, nullable=False),
     Column("expires_at", DateTime, nullable=False),
     Column("created_at", DateTime, nullable=False),
+    # purge of expired tokens, in expiry order
+    Index("ix_login_tokens_expires_at", "expires_at"),
+    # per-user cap: newest tokens of a user first
+    Index("ix_login_tokens_user_id_created_at", "user_id", "created_at"),
+)
+
+# Shared state of the login rate limiter (RATE_LIMIT_BACKEND=database), one row per
+# limited key ("email:<address>" or "client:<ip/session>"); times are epoch seconds.
+login_attempts = Table(
+    "login_attempts",
+    metadata,
+    Column("key", String, primary_key=True),
+    Column("window_start", Float, nullable=False),
+    Column("count", Integer, nullable=False, default=0),
+    Column("previous", Integer, nullable=False, default=0),
+    Column("locked_until", Float, nullable=False, default=0),
+    # purge of stale rows
+    Index("ix_login_attempts_window_start", "window_start"),
+)
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """Connection pool and timeout settings for the SQLAlchemy engine.
+
+    Every field can be overridden via an environment variable or Streamlit secret
+    (see `ENGINE_PROFILE_SETTINGS`); unset fields use the defaults for the dialect.
+    """
+
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float  # seconds to wait for a free pooled connection
+    pool_recycle: int  # seconds before a pooled connection is replaced (-1 = never)
+    pool_pre_ping: bool
+    connect_timeout: int  # seconds; SQLite uses it as the busy timeout
+    statement_timeout_ms: Optional[int]  # Postgres only; None/0 = server default
+
+
+# SQLite: local file, no network hops. Pre-ping and recycling buy nothing.
+SQLITE_ENGINE_DEFAULTS = EngineProfile(
+    pool_size=5,
+    max_overflow=10,
+    pool_timeout=30.0,
+    pool_recycle=-1,
+    pool_pre_ping=False,
+    connect_timeout=15,
+    statement_timeout_ms=None,
 )
 
+# Postgres behind the Supabase session pooler: idle connections get dropped, so
+# recycle well before that and ping on checkout instead of failing the first click.
+POSTGRES_ENGINE_DEFAULTS = EngineProfile(
+    pool_size=5,
+    max_overflow=5,
+    pool_timeout=10.0,
+    pool_recycle=300,
+    pool_pre_ping=True,
+    connect_timeout=10,
+    statement_timeout_ms=30_000,
+)
+
+# field name -> env var / secret name
+ENGINE_PROFILE_SETTINGS = {
+    "pool_size": "DB_POOL_SIZE",
+    "max_overflow": "DB_MAX_OVERFLOW",
+    "pool_timeout": "DB_POOL_TIMEOUT",
+    "pool_recycle": "DB_POOL_RECYCLE",
+    "pool_pre_ping": "DB_POOL_PRE_PING",
+    "connect_timeout": "DB_CONNECT_TIMEOUT",
+    "statement_timeout_ms": "DB_STATEMENT_TIMEOUT_MS",
+}
+
+
+def _parse_setting(name: str, raw: str, current):
+    """Parse a raw setting string into the type of the default value."""
+    try:
+        if isinstance(current, bool):
+            if raw.lower() in {"1", "true", "yes", "on"}:
+                return True
+            if raw.lower() in {"0", "false", "no", "off"}:
+                return False
+            raise ValueError(raw)
+        if isinstance(current, float):
+            return float(raw)
+        return int(raw)
+    except ValueError as e:
+        raise ValueError(f"Invalid value for {name}: {raw!r}") from e
+
+
+def load_engine_profile(url: Optional[str] = None) -> EngineProfile:
+    """Build the engine profile for `url` from dialect defaults plus env/secrets overrides."""
+    url = url or DB_URL
+    profile = SQLITE_ENGINE_DEFAULTS if url.startswith("sqlite") else POSTGRES_ENGINE_DEFAULTS
+    overrides = {}
+    for field_name, setting in ENGINE_PROFILE_SETTINGS.items():
+        raw = _get_setting(setting)
+        if raw is None:
+            continue
+        current = getattr(profile, field_name)
+        overrides[field_name] = _parse_setting(setting, raw, 0 if current is None else current)
+    return replace(profile, **overrides) if overrides else profile
+
+
+class PoolMetrics:
+    """Thread-safe counters for pool checkouts, used to size the pool.
+
+    `wait` is the time spent inside the pool getting a connection: queueing for a
+    free slot plus opening a new connection when the pool grows.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(1000 * self.total_wait_seconds / self.checkouts, 2) if self.checkouts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait_seconds, 2),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits in `pool_metrics`."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except SATimeoutError:
+            pool_metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record(time.perf_counter() - start)
+        return entry
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in {"sqlite:", "sqlite+pysqlite:"})
+
+
+def _engine_kwargs(url: str, profile: EngineProfile) -> dict:
+    """Translate an EngineProfile into create_engine() keyword arguments."""
+    if url.startswith("sqlite"):
+        connect_args = {"check_same_thread": False, "timeout": profile.connect_timeout}
+        if _is_memory_sqlite(url):
+            # in-memory databases live in a single connection; keep SQLAlchemy's default pool
+            return {"connect_args": connect_args}
+    else:
+        connect_args = {"connect_timeout": profile.connect_timeout}
+    return {
+        "connect_args": connect_args,
+        "poolclass": MeteredQueuePool,
+        "pool_size": profile.pool_size,
+        "max_overflow": profile.max_overflow,
+        "pool_timeout": profile.pool_timeout,
+        "pool_recycle": profile.pool_recycle,
+        "pool_pre_ping": profile.pool_pre_ping,
+    }
+
+
+def _set_statement_timeout(timeout_ms: int):
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET statement_timeout = {int(timeout_ms)}")
+        cursor.close()
+        # make the setting survive the pool's reset-on-return rollback
+        dbapi_connection.commit()
+
+    return _on_connect
+
+
 _engine: Optional[Engine] = None
 
 
 def get_engine() -> Engine:
     global _engine
     if _engine is None:
-        _engine = create_engine(DB_URL, connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {})
+        profile = load_engine_profile(DB_URL)
+        _engine = create_engine(DB_URL, **_engine_kwargs(DB_URL, profile))
+        if profile.statement_timeout_ms and _engine.dialect.name == "postgresql":
+            event.listen(_engine, "connect", _set_statement_timeout(profile.statement_timeout_ms))
+        _install_query_counters(_engine)
+        _install_version_guards(_engine)
     return _engine
 
 
-def _pbkdf2_hash(password: str, iterations: int = 120_000) -> str:
+def get_pool_metrics() -> dict:
+    """Return checkout/wait counters plus the live pool occupancy, for diagnostics."""
+    stats = pool_metrics.snapshot()
+    pool = get_engine().pool
+    if isinstance(pool, QueuePool):
+        stats.update(
+            pool_size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    return stats
+
+
+@dataclass
+class QueryStats:
+    """Connections checked out and database round trips seen inside `count_queries()`."""
+
+    connections: int = 0
+    statements: int = 0
+    commits: int = 0
+    rollbacks: int = 0
+    parent: Optional["QueryStats"] = None
+
+    @property
+    def round_trips(self) -> int:
+        return self.statements + self.commits + self.rollbacks
+
+    def _bump(self, field_name: str) -> None:
+        stats: Optional[QueryStats] = self
+        while stats is not None:
+            setattr(stats, field_name, getattr(stats, field_name) + 1)
+            stats = stats.parent
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _install_query_counters(engine: Engine) -> None:
+    def _counter(field_name: str):
+        def _listener(*args, **kwargs):
+            stats = _query_stats.get()
+            if stats is not None:
+                stats._bump(field_name)
+
+        return _listener
+
+    event.listen(engine, "checkout", _counter("connections"))
+    event.listen(engine, "before_cursor_execute", _counter("statements"))
+    event.listen(engine, "commit", _counter("commits"))
+    event.listen(engine, "rollback", _counter("rollbacks"))
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Count pool checkouts and round trips made by the current thread inside the block.
+
+    Nested counters also add to the enclosing one.
+    """
+    stats = QueryStats(parent=_query_stats.get())
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+class RequestScope:
+    """One Streamlit rerun: a lazily opened connection shared by all its units of work."""
+
+    def __init__(self) -> None:
+        self._conn = None
+        # nesting of connect() blocks; the outermost one ends the transaction
+        self.depth = 0
+        self.in_write_unit = False
+        # data_versions snapshot polled at most once per rerun (see read_data_versions)
+        self.data_versions: Optional[dict[str, int]] = None
+
+    @property
+    def has_connection(self) -> bool:
+        return self._conn is not None
+
+    def owns(self, conn) -> bool:
+        return conn is not None and conn is self._conn
+
+    def connection(self):
+        if self._conn is None:
+            self._conn = get_engine().connect()
+        return self._conn
+
+    def end_transaction(self, *, commit: bool) -> None:
+        """Commit or roll back the open transaction; the connection stays checked out."""
+        if self._conn is None or not self._conn.in_transaction():
+            return
+        if commit:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+
+    def close(self, *, commit: bool) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if commit:
+                conn.commit()
+            else:
+                conn.rollback()
+        finally:
+            conn.close()
+
+
+_request_scope: ContextVar[Optional[RequestScope]] = ContextVar("request_scope", default=None)
+
+try:
+    from streamlit.runtime.scriptrunner import RerunException, StopException
+
+    _SCRIPT_CONTROL: tuple[type[BaseException], ...] = (RerunException, StopException)
+except ImportError:  # CLI tools without Streamlit
+    _SCRIPT_CONTROL = ()
+
+
+def _commits_on(exc: BaseException) -> bool:
+    """Whether work still open when `exc` ends a block is kept: only for `st.rerun()` / `st.stop()`."""
+    return isinstance(exc, _SCRIPT_CONTROL)
+
+
+@contextmanager
+def request_scope() -> Iterator[RequestScope]:
+    """Share one connection between everything that runs in a single rerun.
+
+    The connection is only checked out on first use. Transactions on it stay short:
+    write helpers commit as soon as they return (see `write_unit`) and every outermost
+    `connect()` block ends its transaction. Whatever is still open when the block ends
+    is committed, also when `st.rerun()` / `st.stop()` end the script early, and rolled
+    back on any other exception (KeyboardInterrupt and SystemExit included).
+    """
+    scope = RequestScope()
+    token = _request_scope.set(scope)
+    try:
+        yield scope
+    except BaseException as e:
+        scope.close(commit=_commits_on(e))
+        raise
+    else:
+        scope.close(commit=True)
+    finally:
+        _request_scope.reset(token)
+
+
+@contextmanager
+def connect():
+    """Yield a connection for a unit of work; callers never commit themselves.
+
+    Inside `request_scope()` this is the rerun's shared connection; the outermost block
+    commits its transaction when it ends, or rolls it back if it raises. Outside one
+    (CLI scripts, tests) a short-lived connection is opened and committed the same way.
+    """
+    scope = _request_scope.get()
+    if scope is not None:
+        conn = scope.connection()
+        scope.depth += 1
+        try:
+            yield conn
+        except BaseException as e:
+            if scope.depth == 1:
+                scope.end_transaction(commit=_commits_on(e))
+            raise
+        else:
+            if scope.depth == 1:
+                scope.end_transaction(commit=True)
+        finally:
+            scope.depth -= 1
+        return
+    conn = get_engine().connect()
+    try:
+        yield conn
+    except BaseException as e:
+        if _commits_on(e):
+            conn.commit()
+        else:
+            conn.rollback()
+        raise
+    else:
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@contextmanager
+def write_unit(conn) -> Iterator[None]:
+    """Commit the writes made on `conn` inside the block as soon as it ends.
+
+    On the rerun's shared connection this keeps row locks short and rolls a failed
+    write back on its own, so the rest of the rerun can still use the connection.
+    Nested units join the outermost one. On any other connection it does nothing;
+    its owner commits.
+    """
+    scope = _request_scope.get()
+    if scope is None or not scope.owns(conn) or scope.in_write_unit:
+        yield
+        return
+    scope.in_write_unit = True
+    try:
+        yield
+    except BaseException as e:
+        scope.end_transaction(commit=_commits_on(e))
+        raise
+    else:
+        scope.end_transaction(commit=True)
+    finally:
+        scope.in_write_unit = False
+
+
+def writes(func):
+    """Run a `(conn, ...)` write helper as its own `write_unit`."""
+
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        with write_unit(conn):
+            return func(conn, *args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def transaction():
+    """`connect()` for several writes that must be committed or rolled back together."""
+    with connect() as conn, write_unit(conn):
+        yield conn
+
+
+# Work factor for new password hashes; pick it with scripts/calibrate_hashing.py.
+# Stored hashes with fewer iterations are upgraded on the next successful login.
+DEFAULT_PBKDF2_ITERATIONS = 120_000
+PBKDF2_ITERATIONS = int(_get_setting("PBKDF2_ITERATIONS") or DEFAULT_PBKDF2_ITERATIONS)
+
+
+def _pbkdf2_hash(password: str, iterations: Optional[int] = None) -> str:
+    iterations = iterations or PBKDF2_ITERATIONS
     salt = os.urandom(16)
     dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
     return f"pbkdf2_sha256${iterations}${base64.b64encode(salt).decode()}${base64.b64encode(dk).decode()}"
@@ -170,10 +693,165 @@ def _pbkdf2_verify(password: str, stored: str) -> bool:
         return False
 
 
+def _pbkdf2_iterations(stored: str) -> Optional[int]:
+    """Iteration count of a stored hash, or None when it is not a pbkdf2_sha256 hash."""
+    try:
+        algo, iterations_s, _, _ = stored.split("$")
+        return int(iterations_s) if algo == "pbkdf2_sha256" else None
+    except (AttributeError, ValueError):
+        return None
+
+
+# --- Full-text search on observation comments -------------------------------------------
+#
+# PostgreSQL: a generated `comment_tsv` tsvector column (Dutch configuration) with a GIN
+# index. SQLite: an external-content FTS5 table kept in sync by triggers. Neither is part
+# of `metadata` (the column types are dialect specific); `ensure_search_index` creates
+# them for create_all-managed databases and the Alembic migration does so for the rest.
+
+SEARCH_MODES = ("fts", "substring")
+FTS_CONFIG = "dutch"
+
+_SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS observations_fts USING fts5("
+    "comment, content='observations', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS observations_fts_ai AFTER INSERT ON observations BEGIN "
+    "INSERT INTO observations_fts(rowid, comment) VALUES (new.id, new.comment); END",
+    "CREATE TRIGGER IF NOT EXISTS observations_fts_ad AFTER DELETE ON observations BEGIN "
+    "INSERT INTO observations_fts(observations_fts, rowid, comment) VALUES ('delete', old.id, old.comment); END",
+    "CREATE TRIGGER IF NOT EXISTS observations_fts_au AFTER UPDATE OF comment ON observations BEGIN "
+    "INSERT INTO observations_fts(observations_fts, rowid, comment) VALUES ('delete', old.id, old.comment); "
+    "INSERT INTO observations_fts(rowid, comment) VALUES (new.id, new.comment); END",
+]
+
+_POSTGRES_FTS_DDL = [
+    "ALTER TABLE observations ADD COLUMN IF NOT EXISTS comment_tsv tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{FTS_CONFIG}', coalesce(comment, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_observations_comment_tsv ON observations USING gin (comment_tsv)",
+]
+
+
+def ensure_search_index(conn) -> None:
+    """Create the full-text search structures for the connection's dialect if missing."""
+    if conn.dialect.name == "sqlite":
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'observations_fts'")).first()
+        for ddl in _SQLITE_FTS_DDL:
+            conn.execute(text(ddl))
+        if not exists:
+            # index the rows that were there before the triggers
+            conn.execute(text("INSERT INTO observations_fts(observations_fts) VALUES ('rebuild')"))
+    elif conn.dialect.name == "postgresql":
+        for ddl in _POSTGRES_FTS_DDL:
+            conn.execute(text(ddl))
+
+
+# lightweight handle on the SQLite FTS5 table for building queries
+_observations_fts = sa_table("observations_fts", sa_column("rowid"))
+
+
+def _fts_match(match: str):
+    return literal_column("observations_fts").op("MATCH")(match)
+
+
+def _search_terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query or "")
+
+
+def _fts_clause(dialect_name: str, query: str):
+    """WHERE clause matching comments that contain every word of `query` (as a prefix).
+
+    Returns None when full-text search is not available for the dialect or the query has
+    no searchable words; callers then fall back to the substring filter.
+    """
+    terms = _search_terms(query)
+    if not terms:
+        return None
+    if dialect_name == "postgresql":
+        tsquery = func.to_tsquery(FTS_CONFIG, " & ".join(f"{t}:*" for t in terms))
+        return literal_column("observations.comment_tsv").op("@@")(tsquery)
+    if dialect_name == "sqlite":
+        match = " ".join('"' + t.replace('"', '""') + '"*' for t in terms)
+        return observations.c.id.in_(select(_observations_fts.c.rowid).where(_fts_match(match)))
+    return None
+
+
+def search_observations(
+    conn,
+    query: str,
+    *,
+    limit: int = 50,
+    category_id: Optional[int] = None,
+    school_year_id: Optional[int] = None,
+    spec: Optional[ObservationFilter] = None,
+) -> list:
+    """Full-text search on comments, best matches first.
+
+    Each row carries a `rank` column; higher is better on PostgreSQL (ts_rank), lower is
+    better on SQLite (bm25), but the rows are always returned best-first. Other dialects
+    have no index: they match the query as a substring, newest first, with rank None. `spec` adds
+    the other filters of a browse query (dates, category subtree); its text and page
+    position are ignored.
+    """
+    terms = _search_terms(query)
+    if not terms:
+        return []
+    filters = _observation_filters(replace(spec, text=None), conn.dialect.name) if spec is not None else []
+    if category_id:
+        filters.append(observations.c.category_id == category_id)
+    if school_year_id:
+        filters.append(observations.c.school_year_id == school_year_id)
+
+    if conn.dialect.name == "postgresql":
+        tsquery = func.to_tsquery(FTS_CONFIG, " & ".join(f"{t}:*" for t in terms))
+        tsv = literal_column("observations.comment_tsv")
+        rank = func.ts_rank(tsv, tsquery).label("rank")
+        stmt = select(observations, rank).where(tsv.op("@@")(tsquery), *filters).order_by(rank.desc(), observations.c.observed_at.desc())
+    elif conn.dialect.name == "sqlite":
+        match = " ".join('"' + t.replace('"', '""') + '"*' for t in terms)
+        rank = func.bm25(literal_column("observations_fts")).label("rank")
+        stmt = (
+            select(observations, rank)
+            .select_from(observations.join(_observations_fts, _observations_fts.c.rowid == observations.c.id))
+            .where(_fts_match(match), *filters)
+            .order_by(rank.asc(), observations.c.observed_at.desc())
+        )
+    else:
+        # no full-text index on this dialect: the substring filter, newest first
+        rank = null().label("rank")
+        stmt = select(observations, rank).where(observations.c.comment.ilike(f"%{query.strip()}%"), *filters).order_by(observations.c.observed_at.desc())
+    return conn.execute(stmt.limit(limit)).mappings().all()
+
+
+# Alembic head revision this code expects. Bump together with every new migration.
+SCHEMA_REVISION = "8d3f0b6a2c91"
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _schema_is_current(conn) -> bool:
+    """Return True if the database is stamped with the Alembic revision this code expects."""
+    if not inspect(conn).has_table("alembic_version"):
+        return False
+    version = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    return version == SCHEMA_REVISION
+
+
 def init_db() -> None:
-    """Create tables if they do not exist and bootstrap an initial admin if DB is empty."""
+    """Create tables if they do not exist and bootstrap an initial admin if DB is empty.
+
+    Databases managed by Alembic that are already at `SCHEMA_REVISION` skip `create_all`
+    (and its catalog reflection) entirely.
+    """
     engine = get_engine()
-    metadata.create_all(engine)
+    with engine.connect() as conn:
+        schema_current = _schema_is_current(conn)
+    if not schema_current:
+        metadata.create_all(engine)
+        with engine.begin() as conn:
+            ensure_search_index(conn)
+            ensure_user_search_index(conn)
+            ensure_category_closure(conn)
 
     # bootstrap admin if no users exist
     with engine.connect() as conn:
@@ -194,8 +872,29 @@ def init_db() -> None:
                 created_at=datetime.now(timezone.utc),
                 updated_at=datetime.now(timezone.utc),
             )
-            conn.execute(ins)
-            conn.commit()
+            try:
+                conn.execute(ins)
+                conn.commit()
+            except IntegrityError:
+                # another server process bootstrapped the admin first
+                conn.rollback()
+
+
+def ensure_db_initialized() -> None:
+    """Run `init_db` once per server process.
+
+    Streamlit re-executes the whole script on every interaction; after the first
+    successful call this returns without touching the database. The lock keeps
+    concurrent sessions of a fresh process from bootstrapping in parallel.
+    """
+    global _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        init_db()
+        _initialized = True
 
 
 def get_user_by_email(conn, email: str):
@@ -203,27 +902,1404 @@ def get_user_by_email(conn, email: str):
     return conn.execute(sel).mappings().first()
 
 
+# --- Admin user list ------------------------------------------------------------------------
+
+# Columns shown in the admin list; password_hash is never fetched for it
+USER_LIST_COLUMNS = (
+    users.c.id,
+    users.c.email,
+    users.c.full_name,
+    users.c.is_active,
+    users.c.is_admin,
+    users.c.must_change_password,
+    users.c.last_login_at,
+)
+
+# Prefix search on email and name. Emails are stored lowercased; names are matched on
+# lower(full_name). PostgreSQL needs text_pattern_ops to use a btree for LIKE 'abc%'
+# under a non-C collation; SQLite compares bytes, so a range scan on a plain index works.
+_SQLITE_USER_SEARCH_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_users_full_name_lower ON users (lower(full_name))",
+]
+
+_POSTGRES_USER_SEARCH_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_users_email_pattern ON users (email text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_full_name_lower ON users (lower(full_name) text_pattern_ops)",
+]
+
+
+def ensure_user_search_index(conn) -> None:
+    """Create the indexes behind the admin user search for the connection's dialect if missing."""
+    ddl = {"sqlite": _SQLITE_USER_SEARCH_DDL, "postgresql": _POSTGRES_USER_SEARCH_DDL}.get(conn.dialect.name, [])
+    for stmt in ddl:
+        conn.execute(text(stmt))
+
+
+def _prefix_match(expr, prefix: str, dialect_name: str):
+    """`expr` starts with `prefix`, in a form the dialect can answer from a btree index."""
+    if dialect_name == "postgresql":
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return expr.like(escaped + "%", escape="\\")
+    # [prefix, prefix with its last character incremented)
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return (expr >= prefix) & (expr < upper)
+
+
+@dataclass(frozen=True)
+class UserPage:
+    """One page of the admin user list; `next_cursor` is None on the last page."""
+
+    rows: list
+    next_cursor: Optional[str] = None
+
+
+def list_users_page(conn, *, search: Optional[str] = None, after: Optional[str] = None, limit: int = 50) -> UserPage:
+    """Users ordered by email, `limit` at a time, continuing after the email `after`.
+
+    `search` matches the start of the email or of the full name (case-insensitive).
+    """
+    stmt = select(*USER_LIST_COLUMNS)
+    search = (search or "").strip().lower()
+    if search:
+        stmt = stmt.where(
+            _prefix_match(users.c.email, search, conn.dialect.name) | _prefix_match(func.lower(users.c.full_name), search, conn.dialect.name)
+        )
+    if after is not None:
+        stmt = stmt.where(users.c.email > after)
+    rows = conn.execute(stmt.order_by(users.c.email).limit(limit + 1)).mappings().all()
+    next_cursor = rows[limit - 1]["email"] if len(rows) > limit else None
+    return UserPage(list(rows[:limit]), next_cursor)
+
+
+@writes
+def set_users_admin(conn, user_ids: Iterable[int], is_admin: bool) -> int:
+    """Grant or revoke admin rights for many users in one statement; returns the rows changed."""
+    ids = sorted(set(user_ids))
+    if not ids:
+        return 0
+    res = conn.execute(
+        users.update()
+        .where(users.c.id.in_(ids), users.c.is_admin.isnot(is_admin))
+        # the admin flag is part of the signed login token; revoke tokens carrying the old one
+        .values(is_admin=is_admin, token_generation=users.c.token_generation + 1, updated_at=datetime.now(timezone.utc))
+    )
+    if res.rowcount:
+        bump_data_version(conn, "users")
+    return res.rowcount
+
+
 def verify_password(candidate: str, password_hash: str) -> bool:
+    """Verify on the calling thread; the app goes through `app.hashing` instead."""
     return _pbkdf2_verify(candidate, password_hash)
 
 
 def hash_password(password: str) -> str:
+    """Hash on the calling thread; the app goes through `app.hashing` instead."""
     return _pbkdf2_hash(password)
 
 
-def get_observations(conn, *, start_date=None, end_date=None, category_id=None, text=None, limit=50, offset=0):
-    """Fetch observations with optional filters and pagination."""
-    stmt = select(observations)
+# --- Data versions -----------------------------------------------------------------------
+#
+# Every write path bumps a counter per data domain in `data_versions`, in the same
+# transaction as the write. Cached results are tagged with the version they were loaded
+# at; readers poll the (tiny) table once per rerun to decide whether a cache entry is
+# still valid. Because the counters live in the database, this also works across
+# several server processes sharing one database.
+
+
+def observation_domains(school_year_id: Optional[int] = None) -> tuple[str, ...]:
+    """Domains to bump when observations change (globally and per school year)."""
+    if school_year_id is None:
+        return ("observations",)
+    return ("observations", f"observations:{school_year_id}")
+
+
+def _dialect_insert(conn):
+    """Return the dialect-specific insert() that supports ON CONFLICT."""
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+        return pg_insert
+    if conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+        return sqlite_insert
+    raise NotImplementedError(f"ON CONFLICT is not supported for dialect {conn.dialect.name}")
+
+
+# conn.info flag: this connection bumped a version that is not committed yet
+_PENDING_VERSIONS = "pending_data_versions"
+
+
+def _install_version_guards(engine: Engine) -> None:
+    def _committed(conn):
+        conn.info.pop(_PENDING_VERSIONS, None)
+
+    def _rolled_back(conn):
+        if conn.info.pop(_PENDING_VERSIONS, None):
+            scope = _request_scope.get()
+            if scope is not None:
+                # the memoized versions included the discarded bump
+                scope.data_versions = None
+
+    event.listen(engine, "commit", _committed)
+    event.listen(engine, "rollback", _rolled_back)
+
+
+def shares_cache(conn) -> bool:
+    """False while `conn` has uncommitted version bumps: what it reads must not reach the shared caches."""
+    return not conn.info.get(_PENDING_VERSIONS)
+
+
+def bump_data_version(conn, *domains: str) -> None:
+    """Increment the version of each domain as part of the caller's transaction.
+
+    The domain rows stay locked until that transaction ends, so call this from a write
+    helper (see `write_unit`), which commits right after. Until then the connection
+    bypasses the shared caches.
+    """
+    if not domains:
+        return
+    insert_ = _dialect_insert(conn)
+    stmt = insert_(data_versions).values([{"domain": d, "version": 1} for d in dict.fromkeys(domains)])
+    stmt = stmt.on_conflict_do_update(index_elements=[data_versions.c.domain], set_={"version": data_versions.c.version + 1})
+    conn.execute(stmt)
+    conn.info[_PENDING_VERSIONS] = True
+    scope = _request_scope.get()
+    if scope is not None:
+        # this rerun must see its own writes; re-poll on the next read
+        scope.data_versions = None
+
+
+def read_data_versions(conn) -> dict[str, int]:
+    """Read all domain versions with one SELECT.
+
+    Inside a request scope the result is memoized, so a rerun polls at most once
+    (plus once more after each of its own writes).
+    """
+    scope = _request_scope.get()
+    if scope is not None and scope.data_versions is not None:
+        return scope.data_versions
+    versions = {row.domain: row.version for row in conn.execute(select(data_versions.c.domain, data_versions.c.version))}
+    if scope is not None:
+        scope.data_versions = versions
+    return versions
+
+
+def data_version(conn, domain: str) -> int:
+    """Return the current version of a data domain (0 if it was never written)."""
+    return read_data_versions(conn).get(domain, 0)
+
+
+# --- Reference data (categories, school years, persons) ---------------------------------
+#
+# These lookups change rarely but are read on almost every rerun. They are cached per
+# server process and validated against `data_versions`; the write helpers below bump
+# the domain they touch.
+
+reference_cache = VersionedCache()
+
+
+def list_categories(conn) -> tuple:
+    """All categories ordered by label (cached)."""
+    return reference_cache.get_or_load(
+        "categories",
+        data_version(conn, "categories"),
+        lambda: tuple(conn.execute(select(categories).order_by(categories.c.label, categories.c.id)).mappings().all()),
+        store=shares_cache(conn),
+    )
+
+
+def list_school_years(conn) -> tuple:
+    """All school years, most recent first (cached)."""
+    return reference_cache.get_or_load(
+        "school_years",
+        data_version(conn, "school_years"),
+        lambda: tuple(
+            conn.execute(select(school_years).order_by(school_years.c.start_year.desc(), school_years.c.id.desc())).mappings().all()
+        ),
+        store=shares_cache(conn),
+    )
+
+
+def get_latest_school_year(conn):
+    """The most recent school year, or None if there are none."""
+    years = list_school_years(conn)
+    return years[0] if years else None
+
+
+# Profile columns for the signed-in user; no password hash
+SESSION_USER_COLUMNS = (
+    users.c.id,
+    users.c.email,
+    users.c.full_name,
+    users.c.is_active,
+    users.c.is_admin,
+    users.c.must_change_password,
+    users.c.token_generation,
+)
+
+
+def get_session_user(conn, user_id: int):
+    """Profile of a user for token sign-in (cached; the "users" version changes when tokens are revoked)."""
+    return reference_cache.get_or_load(
+        ("session_user", user_id),
+        data_version(conn, "users"),
+        lambda: conn.execute(select(*SESSION_USER_COLUMNS).where(users.c.id == user_id)).mappings().first(),
+        store=shares_cache(conn),
+    )
+
+
+def list_persons(conn, school_year_id: int) -> tuple:
+    """The class list for a school year ordered by full name (cached)."""
+    return reference_cache.get_or_load(
+        ("persons", school_year_id),
+        data_version(conn, "persons"),
+        lambda: tuple(
+            conn.execute(
+                select(persons).where(persons.c.school_year_id == school_year_id).order_by(persons.c.full_name, persons.c.id)
+            ).mappings().all()
+        ),
+        store=shares_cache(conn),
+    )
+
+
+@writes
+def create_category(conn, *, label: str, key: str, parent_id: Optional[int] = None, description: Optional[str] = None, is_active: bool = True, display_order: Optional[int] = None) -> int:
+    res = conn.execute(
+        categories.insert().values(label=label, key=key, parent_id=parent_id, description=description, is_active=is_active, display_order=display_order)
+    )
+    category_id = res.inserted_primary_key[0]
+    _attach_subtree(conn, category_id, parent_id)
+    bump_data_version(conn, "categories")
+    return category_id
+
+
+@writes
+def update_category(conn, category_id: int, **values) -> None:
+    """Update a category; moving it under a new parent also moves its subtree.
+
+    Raises ValueError("category_cycle") when the new parent is the category itself or
+    one of its descendants.
+    """
+    reparent = "parent_id" in values
+    if reparent:
+        if values["parent_id"] is not None and is_category_descendant(conn, values["parent_id"], category_id):
+            raise ValueError("category_cycle")
+        _detach_subtree(conn, category_id)
+    conn.execute(categories.update().where(categories.c.id == category_id).values(**values))
+    if reparent:
+        _attach_subtree(conn, category_id, values["parent_id"])
+    bump_data_version(conn, "categories")
+
+
+@writes
+def delete_category(conn, category_id: int) -> None:
+    """Delete a category; its children move up to its parent."""
+    parent_id = conn.execute(select(categories.c.parent_id).where(categories.c.id == category_id)).scalar()
+    cc = category_closure
+    above = select(cc.c.ancestor_id).where(cc.c.descendant_id == category_id, cc.c.depth > 0)
+    below = select(cc.c.descendant_id).where(cc.c.ancestor_id == category_id, cc.c.depth > 0)
+    # paths that ran through the deleted category get one step shorter
+    conn.execute(cc.update().where(cc.c.ancestor_id.in_(above), cc.c.descendant_id.in_(below)).values(depth=cc.c.depth - 1))
+    conn.execute(cc.delete().where((cc.c.ancestor_id == category_id) | (cc.c.descendant_id == category_id)))
+    conn.execute(categories.update().where(categories.c.parent_id == category_id).values(parent_id=parent_id))
+    conn.execute(categories.delete().where(categories.c.id == category_id))
+    bump_data_version(conn, "categories")
+
+
+# --- Category hierarchy (closure table) ----------------------------------------------------
+
+# guards the recursive rebuild against parent_id cycles in legacy data
+MAX_CATEGORY_DEPTH = 64
+
+
+def _attach_subtree(conn, category_id: int, parent_id: Optional[int]) -> None:
+    """Link the subtree rooted at `category_id` under `parent_id` in the closure table.
+
+    A new category first gets its own (id, id, 0) row. Then every ancestor of the parent
+    (the parent included) is paired with every node of the subtree.
+    """
+    cc = category_closure
+    own_row = conn.execute(select(cc.c.depth).where(cc.c.ancestor_id == category_id, cc.c.descendant_id == category_id)).first()
+    if own_row is None:
+        conn.execute(cc.insert().values(ancestor_id=category_id, descendant_id=category_id, depth=0))
+    if parent_id is None:
+        return
+    up = cc.alias("up")
+    down = cc.alias("down")
+    # every ancestor of the parent x every node of the subtree: an intended cross join
+    pairs = (
+        select(up.c.ancestor_id, down.c.descendant_id, up.c.depth + down.c.depth + 1)
+        .select_from(up.join(down, true()))
+        .where(up.c.descendant_id == parent_id, down.c.ancestor_id == category_id)
+    )
+    conn.execute(cc.insert().from_select(["ancestor_id", "descendant_id", "depth"], pairs))
+
+
+def _detach_subtree(conn, category_id: int) -> None:
+    """Remove the links between the subtree of `category_id` and everything above it."""
+    cc = category_closure
+    subtree = select(cc.c.descendant_id).where(cc.c.ancestor_id == category_id)
+    conn.execute(cc.delete().where(cc.c.descendant_id.in_(subtree), cc.c.ancestor_id.not_in(subtree)))
+
+
+def is_category_descendant(conn, category_id: int, ancestor_id: int) -> bool:
+    """Whether `category_id` is `ancestor_id` itself or lies below it."""
+    cc = category_closure
+    return conn.execute(select(cc.c.depth).where(cc.c.ancestor_id == ancestor_id, cc.c.descendant_id == category_id)).first() is not None
+
+
+def category_subtree(category_id: int):
+    """SELECT of the ids of a category and all its descendants (an index range on the closure PK)."""
+    return select(category_closure.c.descendant_id).where(category_closure.c.ancestor_id == category_id)
+
+
+@dataclass(frozen=True)
+class CategoryTree:
+    """All categories, keyed by id, in display (pre-)order with their depth."""
+
+    by_id: dict
+    children: dict
+    # (category_id, depth) in pre-order: parents before children, siblings by display_order/label
+    order: tuple
+
+    def descendants(self, category_id: int) -> set:
+        """`category_id` and everything below it."""
+        found, todo = set(), [category_id]
+        while todo:
+            cid = todo.pop()
+            if cid not in found:
+                found.add(cid)
+                todo.extend(self.children.get(cid, ()))
+        return found
+
+    def parent_choices(self, category_id: Optional[int] = None) -> list:
+        """Ids a category may be moved under: everything except its own subtree."""
+        excluded = self.descendants(category_id) if category_id is not None else set()
+        return [cid for cid, _ in self.order if cid not in excluded]
+
+
+def _category_tree(conn) -> CategoryTree:
+    cc = category_closure
+    rows = conn.execute(
+        select(categories, func.max(cc.c.depth).label("depth"))
+        .join(cc, cc.c.descendant_id == categories.c.id)
+        .group_by(categories.c.id)
+        .order_by(categories.c.display_order.is_(None), categories.c.display_order, categories.c.label, categories.c.id)
+    ).mappings().all()
+    by_id = {r["id"]: r for r in rows}
+    children: dict = {}
+    for r in rows:
+        parent_id = r["parent_id"] if r["parent_id"] in by_id else None
+        children.setdefault(parent_id, []).append(r["id"])
+    order, seen, todo = [], set(), list(reversed(children.get(None, [])))
+    while todo:
+        cid = todo.pop()
+        if cid in seen:
+            continue
+        seen.add(cid)
+        order.append((cid, by_id[cid]["depth"]))
+        todo.extend(reversed(children.get(cid, [])))
+    # categories caught in a legacy parent_id cycle are unreachable from the roots
+    order.extend((r["id"], 0) for r in rows if r["id"] not in seen)
+    return CategoryTree(by_id, {k: tuple(v) for k, v in children.items()}, tuple(order))
+
+
+def get_category_tree(conn) -> CategoryTree:
+    """The category hierarchy from one query (cached)."""
+    return reference_cache.get_or_load("category_tree", data_version(conn, "categories"), lambda: _category_tree(conn), store=shares_cache(conn))
+
+
+@writes
+def rebuild_category_closure(conn) -> int:
+    """Recompute the whole closure table from categories.parent_id with one recursive query.
+
+    Returns the number of rows written.
+    """
+    conn.execute(category_closure.delete())
+    tree = select(
+        categories.c.id.label("ancestor_id"), categories.c.id.label("descendant_id"), literal_column("0").label("depth")
+    ).cte("tree", recursive=True)
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, categories.c.id, tree.c.depth + 1).where(
+            categories.c.parent_id == tree.c.descendant_id, tree.c.depth < MAX_CATEGORY_DEPTH
+        )
+    )
+    # a cycle would yield the same pair more than once; keep the shortest path
+    rows = select(tree.c.ancestor_id, tree.c.descendant_id, func.min(tree.c.depth)).group_by(tree.c.ancestor_id, tree.c.descendant_id)
+    res = conn.execute(category_closure.insert().from_select(["ancestor_id", "descendant_id", "depth"], rows))
+    return res.rowcount
+
+
+def ensure_category_closure(conn) -> None:
+    """Build the closure table for databases that have categories but no closure rows yet."""
+    closure_rows = conn.execute(select(func.count()).select_from(category_closure).where(category_closure.c.depth == 0)).scalar()
+    category_count = conn.execute(select(func.count()).select_from(categories)).scalar()
+    if closure_rows != category_count:
+        rebuild_category_closure(conn)
+
+
+@writes
+def create_school_year(conn, *, name: str, start_year: Optional[int] = None, end_year: Optional[int] = None) -> int:
+    res = conn.execute(school_years.insert().values(name=name, start_year=start_year, end_year=end_year))
+    bump_data_version(conn, "school_years")
+    return res.inserted_primary_key[0]
+
+
+@writes
+def create_person(conn, *, school_year_id: int, first_name: str, last_name: str, external_id: Optional[str] = None) -> int:
+    res = conn.execute(
+        persons.insert().values(
+            school_year_id=school_year_id,
+            first_name=first_name,
+            last_name=last_name,
+            full_name=f"{first_name} {last_name}".strip(),
+            external_id=external_id,
+        )
+    )
+    bump_data_version(conn, "persons")
+    return res.inserted_primary_key[0]
+
+
+@writes
+def update_person(conn, person_id: int, **values) -> None:
+    """Update a person; keeps the denormalized `full_name` in sync with first/last name."""
+    if "first_name" in values or "last_name" in values:
+        current = conn.execute(select(persons.c.first_name, persons.c.last_name).where(persons.c.id == person_id)).mappings().first()
+        if current is not None:
+            first = values.get("first_name", current["first_name"])
+            last = values.get("last_name", current["last_name"])
+            values["full_name"] = f"{first} {last}".strip()
+    conn.execute(persons.update().where(persons.c.id == person_id).values(**values))
+    bump_data_version(conn, "persons")
+
+
+@writes
+def delete_person(conn, person_id: int) -> None:
+    conn.execute(persons.delete().where(persons.c.id == person_id))
+    bump_data_version(conn, "persons")
+
+
+@dataclass(frozen=True)
+class ObservationFilter:
+    """Hashable description of one browse query: filters plus page position.
+
+    Used directly as the key of the observation result cache, so two reruns with the
+    same filters and cursor share one cached page. Empty text/zero category mean "no
+    filter" and are normalized to None so they hash the same.
+    """
+
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    category_id: Optional[int] = None
+    text: Optional[str] = None
+    limit: int = 50
+    cursor: Optional[str] = None
+    # "substring": ILIKE '%text%' (the original behaviour); "fts": full-text index (whole words / word prefixes)
+    search_mode: str = "substring"
+    # with category_id: also match observations in its subcategories
+    include_descendants: bool = False
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "text", (self.text or "").strip() or None)
+        object.__setattr__(self, "category_id", self.category_id or None)
+        if self.search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {self.search_mode}")
+
+    def first_page(self) -> "ObservationFilter":
+        """The same filters without a page position."""
+        return replace(self, cursor=None)
+
+    def without_paging(self) -> "ObservationFilter":
+        """Only the filters; the key under which counts are cached for every page."""
+        return replace(self, cursor=None, limit=0)
+
+
+def _observation_filters(spec: ObservationFilter, dialect_name: str) -> list:
+    """Build the WHERE clauses shared by the browse queries."""
     filters = []
-    if start_date:
-        filters.append(observations.c.observed_at >= start_date)
-    if end_date:
-        filters.append(observations.c.observed_at <= end_date)
-    if category_id:
-        filters.append(observations.c.category_id == category_id)
-    if text:
-        filters.append(observations.c.comment.ilike(f"%{text}%"))
+    if spec.start_date:
+        filters.append(observations.c.observed_at >= spec.start_date)
+    if spec.end_date:
+        filters.append(observations.c.observed_at <= spec.end_date)
+    if spec.category_id and spec.include_descendants:
+        filters.append(observations.c.category_id.in_(category_subtree(spec.category_id)))
+    elif spec.category_id:
+        filters.append(observations.c.category_id == spec.category_id)
+    if spec.text:
+        clause = _fts_clause(dialect_name, spec.text) if spec.search_mode == "fts" else None
+        filters.append(clause if clause is not None else observations.c.comment.ilike(f"%{spec.text}%"))
+    return filters
+
+
+def get_observations(conn, spec: Optional[ObservationFilter] = None, *, start_date=None, end_date=None, category_id=None, text=None, limit=50, offset=0):
+    """Fetch observations with optional filters and pagination.
+
+    Filters come from `spec` when given, otherwise from the keyword arguments.
+    """
+    if spec is None:
+        spec = ObservationFilter(start_date=start_date, end_date=end_date, category_id=category_id, text=text, limit=limit)
+    stmt = select(observations)
+    filters = _observation_filters(spec, conn.dialect.name)
     if filters:
         stmt = stmt.where(*filters)
-    stmt = stmt.order_by(observations.c.observed_at.desc()).limit(limit).offset(offset)
+    stmt = stmt.order_by(observations.c.observed_at.desc(), observations.c.id.desc()).limit(spec.limit).offset(offset)
     return conn.execute(stmt).mappings().all()
+
+
+@dataclass(frozen=True)
+class ObservationPage:
+    """One page of observations plus opaque cursors to its neighbours.
+
+    `next_cursor` / `prev_cursor` are None when there is nothing further in that direction.
+    """
+
+    rows: list
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def encode_cursor(observed_at: date, observation_id: int, direction: str) -> str:
+    """Encode a keyset position as an opaque, URL-safe string."""
+    payload = {"o": observed_at.isoformat(), "i": int(observation_id), "d": direction}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, int, str]:
+    """Decode a cursor produced by `encode_cursor`. Raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        direction = payload["d"]
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return date.fromisoformat(payload["o"]), int(payload["i"]), direction
+    except Exception as e:
+        raise ValueError("invalid_cursor") from e
+
+
+def get_observations_page(conn, spec: Optional[ObservationFilter] = None, *, start_date=None, end_date=None, category_id=None, text=None, limit=50, cursor: Optional[str] = None) -> ObservationPage:
+    """Fetch one page of observations using keyset (seek) pagination.
+
+    Rows are ordered by `(observed_at, id)` descending. Instead of an OFFSET, the page
+    continues from the position encoded in `cursor`, so every page costs the same
+    regardless of depth and rows do not shift when new observations are saved.
+    Filters and cursor come from `spec` when given, otherwise from the keyword arguments.
+    """
+    if spec is None:
+        spec = ObservationFilter(start_date=start_date, end_date=end_date, category_id=category_id, text=text, limit=limit, cursor=cursor)
+    cursor, limit = spec.cursor, spec.limit
+    key = tuple_(observations.c.observed_at, observations.c.id)
+    stmt = select(observations)
+    filters = _observation_filters(spec, conn.dialect.name)
+
+    direction = "next"
+    if cursor:
+        observed_at, observation_id, direction = decode_cursor(cursor)
+        if direction == "next":
+            filters.append(key < tuple_(observed_at, observation_id))
+        else:
+            filters.append(key > tuple_(observed_at, observation_id))
+    if filters:
+        stmt = stmt.where(*filters)
+
+    if direction == "next":
+        stmt = stmt.order_by(observations.c.observed_at.desc(), observations.c.id.desc())
+    else:
+        stmt = stmt.order_by(observations.c.observed_at.asc(), observations.c.id.asc())
+
+    # fetch one extra row to learn whether another page exists in this direction
+    rows = list(conn.execute(stmt.limit(limit + 1)).mappings().all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == "prev":
+        rows.reverse()
+    if not rows:
+        return ObservationPage(rows=[])
+
+    first, last = rows[0], rows[-1]
+    if direction == "next":
+        has_next, has_prev = has_more, cursor is not None
+    else:
+        has_next, has_prev = True, has_more
+    return ObservationPage(
+        rows=rows,
+        next_cursor=encode_cursor(last["observed_at"], last["id"], "next") if has_next else None,
+        prev_cursor=encode_cursor(first["observed_at"], first["id"], "prev") if has_prev else None,
+    )
+
+
+# Browse results keyed by ObservationFilter. Entries are validated against the
+# "observations" data version, so any saved observation invalidates them; the TTL only
+# bounds how long rarely used pages stay in memory.
+observation_cache = TTLCache(maxsize=256, ttl=300.0)
+
+
+def _filter_version(conn, spec: ObservationFilter):
+    """Data version a cached result for `spec` depends on (subtree filters also follow the category tree)."""
+    if spec.category_id and spec.include_descendants:
+        return (data_version(conn, "observations"), data_version(conn, "categories"))
+    return data_version(conn, "observations")
+
+
+def get_cached_ranked_observations(conn, spec: ObservationFilter) -> list:
+    """The `spec.limit` best full-text matches for `spec.text` (see `search_observations`), cached like pages."""
+    spec = spec.first_page()
+    return observation_cache.get_or_load(
+        ("ranked", spec),
+        _filter_version(conn, spec),
+        lambda: search_observations(conn, spec.text, limit=spec.limit, spec=spec),
+        store=shares_cache(conn),
+    )
+
+
+def get_cached_observations_page(conn, spec: ObservationFilter) -> ObservationPage:
+    """`get_observations_page` served from the per-process result cache when possible."""
+    return observation_cache.get_or_load(
+        ("page", spec),
+        _filter_version(conn, spec),
+        lambda: get_observations_page(conn, spec),
+        store=shares_cache(conn),
+    )
+
+
+# Above this many matches counting stops; the count becomes "more than COUNT_CAP" or,
+# on PostgreSQL, the planner's row estimate.
+COUNT_CAP = 10_000
+
+
+@dataclass(frozen=True)
+class ObservationCount:
+    """Number of observations matching a filter.
+
+    `exact` is False when counting stopped at the cap; `value` is then either the
+    planner estimate (`estimated=True`) or the cap itself as a lower bound.
+    """
+
+    value: int
+    exact: bool = True
+    estimated: bool = False
+
+    def label(self) -> str:
+        n = f"{self.value:,}".replace(",", " ")
+        if self.exact:
+            return n
+        return f"ongeveer {n}" if self.estimated else f"meer dan {n}"
+
+
+def _planner_row_estimate(conn, stmt) -> Optional[int]:
+    """Ask the PostgreSQL planner how many rows `stmt` returns (no execution)."""
+    compiled = stmt.compile(conn, compile_kwargs={"literal_binds": True})
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    try:
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def count_observations(conn, spec: ObservationFilter, *, cap: int = COUNT_CAP) -> ObservationCount:
+    """Count the observations matching `spec`, stopping early for very broad filters.
+
+    The count runs over `SELECT id ... LIMIT cap + 1`, so it never touches more than
+    cap + 1 index entries. Filters matching more than that get a planner estimate on
+    PostgreSQL and "more than cap" elsewhere.
+    """
+    matching = select(observations.c.id)
+    filters = _observation_filters(spec, conn.dialect.name)
+    if filters:
+        matching = matching.where(*filters)
+    bounded = conn.execute(select(func.count()).select_from(matching.limit(cap + 1).subquery())).scalar_one()
+    if bounded <= cap:
+        return ObservationCount(bounded)
+    if conn.dialect.name == "postgresql":
+        estimate = _planner_row_estimate(conn, matching)
+        if estimate is not None:
+            return ObservationCount(max(estimate, cap + 1), exact=False, estimated=True)
+    return ObservationCount(cap, exact=False)
+
+
+def get_cached_observation_count(conn, spec: ObservationFilter) -> ObservationCount:
+    """`count_observations` cached next to the pages, shared by every page of a filter."""
+    key = spec.without_paging()
+    return observation_cache.get_or_load(
+        ("count", key),
+        _filter_version(conn, key),
+        lambda: count_observations(conn, key),
+        store=shares_cache(conn),
+    )
+
+
+# --- Observation writes -------------------------------------------------------------------
+
+# Scores are 1..4; "?" (unknown) is stored as 0 and "no score" as NULL.
+SCORE_UNKNOWN = 0
+VALID_SCORES = (SCORE_UNKNOWN, 1, 2, 3, 4)
+
+
+@dataclass(frozen=True)
+class ObservationInput:
+    """One cell of the data-entry grid: a score and/or comment for (person, category, date)."""
+
+    person_id: int
+    category_id: int
+    observed_at: date
+    score: Optional[int] = None
+    comment: Optional[str] = None
+
+    @property
+    def key(self) -> tuple[int, int, date]:
+        return (self.person_id, self.category_id, self.observed_at)
+
+    @property
+    def is_empty(self) -> bool:
+        """NULL score and no comment: such cells are not stored."""
+        return self.score is None and not (self.comment or "").strip()
+
+
+@dataclass(frozen=True)
+class UpsertResult:
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+
+
+def _normalize_observation(row: Union[ObservationInput, dict]) -> ObservationInput:
+    if isinstance(row, dict):
+        row = ObservationInput(**row)
+    if row.score is not None and row.score not in VALID_SCORES:
+        raise ValueError(f"invalid_score: {row.score!r}")
+    comment = (row.comment or "").strip() or None
+    return replace(row, comment=comment) if comment != row.comment else row
+
+
+@writes
+def upsert_observations(conn, rows: Iterable[Union[ObservationInput, dict]], *, school_year_id: int, batch_size: int = 500) -> UpsertResult:
+    """Write a whole data-entry grid with one multi-row INSERT ... ON CONFLICT DO UPDATE.
+
+    Existing observations for the same (person, category, date) are overwritten. Cells
+    with a NULL score and no comment are skipped. Runs in the caller's transaction, so
+    a grid spanning several categories is saved atomically; the observation data
+    versions are bumped in the same transaction. Batches of `batch_size` rows keep
+    each statement below the database's parameter limits.
+    """
+    pending: dict[tuple, ObservationInput] = {}
+    skipped = 0
+    for raw in rows:
+        row = _normalize_observation(raw)
+        if row.is_empty:
+            skipped += 1
+            continue
+        pending[row.key] = row  # later cells for the same key win
+
+    if not pending:
+        return UpsertResult(skipped=skipped)
+
+    now = datetime.now(timezone.utc)
+    insert_ = _dialect_insert(conn)
+    inserted = updated = 0
+    values = [
+        dict(
+            person_id=r.person_id,
+            category_id=r.category_id,
+            observed_at=r.observed_at,
+            school_year_id=school_year_id,
+            score=r.score,
+            comment=r.comment,
+            created_at=now,
+            updated_at=now,
+        )
+        for r in pending.values()
+    ]
+    for start in range(0, len(values), batch_size):
+        stmt = insert_(observations).values(values[start : start + batch_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[observations.c.person_id, observations.c.category_id, observations.c.observed_at],
+            set_={
+                "score": stmt.excluded.score,
+                "comment": stmt.excluded.comment,
+                "school_year_id": stmt.excluded.school_year_id,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        # a fresh row has created_at == updated_at; an overwritten one keeps its old created_at
+        for created_at, updated_at in conn.execute(stmt.returning(observations.c.created_at, observations.c.updated_at)):
+            if created_at == updated_at:
+                inserted += 1
+            else:
+                updated += 1
+
+    bump_data_version(conn, *observation_domains(school_year_id))
+    return UpsertResult(inserted=inserted, updated=updated, skipped=skipped)
+
+
+# --- Diff-only grid saves with optimistic concurrency --------------------------------------
+
+
+@dataclass(frozen=True)
+class CellState:
+    """What a grid cell held when it was loaded (all None = no observation)."""
+
+    score: Optional[int] = None
+    comment: Optional[str] = None
+    observation_id: Optional[int] = None
+    updated_at: Optional[datetime] = None
+
+
+def _cells(matrix: ScoreMatrix) -> dict[tuple[int, int], CellState]:
+    """The filled cells of a one-date matrix as (person_id, category_id) -> CellState."""
+    out = {}
+    for person_id, day, category_id in matrix.filled():
+        score, comment = matrix.get(person_id, day, category_id)
+        out[(person_id, category_id)] = CellState(score, comment, *matrix.version(person_id, day, category_id))
+    return out
+
+
+@dataclass(eq=False)
+class GridSnapshot:
+    """Per-session copy of a loaded entry grid (persons x categories for one date).
+
+    Kept in session state between reruns as a compact ScoreMatrix that also tracks
+    each cell's observation id and `updated_at`. On save only cells that differ from
+    the snapshot are written, and each write is conditional on the row's `updated_at`
+    still being the one seen at load time.
+    """
+
+    school_year_id: int
+    observed_at: date
+    matrix: ScoreMatrix
+
+    @property
+    def cells(self) -> dict[tuple[int, int], CellState]:
+        return _cells(self.matrix)
+
+    def get(self, person_id: int, category_id: int) -> CellState:
+        if (person_id, self.observed_at, category_id) not in self.matrix:
+            return CellState()
+        score, comment = self.matrix.get(person_id, self.observed_at, category_id)
+        return CellState(score, comment, *self.matrix.version(person_id, self.observed_at, category_id))
+
+    def put(self, person_id: int, category_id: int, cell: CellState) -> None:
+        self.matrix.set(person_id, self.observed_at, category_id, cell.score, cell.comment, observation_id=cell.observation_id, updated_at=cell.updated_at)
+
+    def changed(self, edits: Iterable[Union[ObservationInput, dict]]) -> list[ObservationInput]:
+        """The edited cells whose score or comment differ from the snapshot."""
+        out = []
+        for raw in edits:
+            edit = _normalize_observation(raw)
+            if edit.observed_at != self.observed_at:
+                raise ValueError("edit_outside_snapshot_date")
+            if (edit.person_id, edit.observed_at, edit.category_id) not in self.matrix:
+                raise ValueError("edit_outside_snapshot")
+            before = self.get(edit.person_id, edit.category_id)
+            if (edit.score, edit.comment) != (before.score, before.comment):
+                out.append(edit)
+        return out
+
+
+@dataclass(frozen=True)
+class GridSaveResult:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    # (person_id, category_id, new state) of every written cell, for `apply`
+    cells: tuple[tuple[int, int, CellState], ...] = field(default=(), compare=False, repr=False)
+
+    def apply(self, snapshot: GridSnapshot) -> None:
+        """Record the written cells in `snapshot`; call it once the save is committed."""
+        for person_id, category_id, cell in self.cells:
+            snapshot.put(person_id, category_id, cell)
+
+
+class GridConflict(Exception):
+    """Someone else changed some of the edited cells since the grid was loaded; nothing was saved."""
+
+    def __init__(self, conflicts: tuple[tuple[int, int], ...]) -> None:
+        super().__init__(f"{len(conflicts)} conflicting cell(s)")
+        # (person_id, category_id) of the conflicting cells
+        self.conflicts = conflicts
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """How far a loaded grid is up to date: see `fetch_observation_delta`."""
+
+    # newest observations.updated_at among the loaded rows
+    updated_at: Optional[datetime] = None
+    # newest observation_deletions.id of the school year at load time
+    deletion_id: int = 0
+    # newest observation_deletions.deleted_at seen; tombstones are read DELTA_OVERLAP back from it
+    deleted_at: Optional[datetime] = None
+
+
+@dataclass(frozen=True, eq=False)
+class EntryGrid:
+    """Everything the entry screen shows for one date: the class list and its cells."""
+
+    school_year_id: Optional[int]
+    observed_at: date
+    category_ids: tuple[int, ...]
+    matrix: ScoreMatrix
+    watermark: Watermark = Watermark()
+
+    @property
+    def persons(self) -> tuple[tuple[int, str], ...]:
+        """(person_id, full_name) ordered by full name."""
+        return tuple(zip(self.matrix.persons.tolist(), self.matrix.person_names))
+
+    @property
+    def cells(self) -> dict[tuple[int, int], CellState]:
+        return _cells(self.matrix)
+
+    def snapshot(self) -> GridSnapshot:
+        """A private, mutable copy for one session (the grid itself may be cached)."""
+        return GridSnapshot(school_year_id=self.school_year_id, observed_at=self.observed_at, matrix=self.matrix.copy())
+
+
+def _year_filter(school_year_id: Optional[int]):
+    """Match the given school year, or the most recent one."""
+    if school_year_id is not None:
+        return school_years.c.id == school_year_id
+    latest = select(school_years.c.id).order_by(school_years.c.start_year.desc(), school_years.c.id.desc()).limit(1)
+    return school_years.c.id == latest.scalar_subquery()
+
+
+def _load_score_matrix(conn, stmt, *, dates: Optional[Iterable[date]] = None, category_ids: Iterable[int] = ()) -> tuple[Optional[int], ScoreMatrix, Watermark]:
+    """Run a `_score_matrix_stmt` into a ScoreMatrix and its delta watermark.
+
+    The batch is transposed into columns (zip) and scattered with numpy; nothing loops
+    over rows. Without `dates` the date axis is every observed date, ascending.
+    """
+    result = conn.execute(stmt)
+    keys = list(result.keys())
+    frame = pd.DataFrame(dict(zip(keys, zip(*result.fetchall()))), columns=keys)
+    year_id = int(frame["school_year_id"].iloc[0]) if len(frame) else None
+    people = frame.dropna(subset=["person_id"]).drop_duplicates("person_id")
+    obs = frame.dropna(subset=["observation_id"])
+    if dates is None:
+        dates = sorted(obs["observed_at"].unique())
+    matrix = ScoreMatrix.build(
+        person_ids=people["person_id"].astype("int64").to_numpy(),
+        person_names=people["full_name"].tolist(),
+        dates=list(dates),
+        category_ids=list(category_ids),
+        obs_person_ids=obs["person_id"].to_numpy(),
+        obs_dates=obs["observed_at"].to_numpy(),
+        obs_category_ids=obs["category_id"].to_numpy(),
+        obs_scores=obs["score"].to_numpy(dtype=object),
+        obs_comments=obs["comment"].to_numpy(dtype=object),
+        obs_ids=obs["observation_id"].to_numpy(),
+        obs_updated_at=obs["updated_at"].to_numpy(),
+    )
+    deleted_at = frame["deleted_at"].iloc[0] if len(frame) else None
+    watermark = Watermark(
+        updated_at=obs["updated_at"].max().to_pydatetime() if len(obs) else None,
+        deletion_id=int(frame["deletion_id"].iloc[0]) if len(frame) else 0,
+        deleted_at=None if pd.isna(deleted_at) else pd.Timestamp(deleted_at).to_pydatetime(),
+    )
+    return year_id, matrix, watermark
+
+
+def _score_matrix_stmt(observation_filter, school_year_id: Optional[int]):
+    return (
+        select(
+            school_years.c.id.label("school_year_id"),
+            persons.c.id.label("person_id"),
+            persons.c.full_name,
+            observations.c.id.label("observation_id"),
+            observations.c.observed_at,
+            observations.c.category_id,
+            observations.c.score,
+            observations.c.comment,
+            observations.c.updated_at,
+            select(func.coalesce(func.max(observation_deletions.c.id), 0))
+            .where(observation_deletions.c.school_year_id == school_years.c.id)
+            .scalar_subquery()
+            .label("deletion_id"),
+            select(func.max(observation_deletions.c.deleted_at))
+            .where(observation_deletions.c.school_year_id == school_years.c.id)
+            .scalar_subquery()
+            .label("deleted_at"),
+        )
+        .select_from(
+            school_years.outerjoin(persons, persons.c.school_year_id == school_years.c.id).outerjoin(
+                observations,
+                (observations.c.person_id == persons.c.id) & (observations.c.school_year_id == school_years.c.id) & observation_filter,
+            )
+        )
+        .where(_year_filter(school_year_id))
+        .order_by(persons.c.full_name, persons.c.id, observations.c.observed_at)
+    )
+
+
+def load_entry_grid(conn, *, observed_at: date, category_ids: Iterable[int], school_year_id: Optional[int] = None) -> EntryGrid:
+    """Load the class list and its observations for one date in a single query.
+
+    The school year (the most recent one unless given) is outer-joined to its persons
+    and to their observations of `observed_at` in the chosen categories, so a class
+    without persons or observations still comes back with its school year.
+    """
+    category_ids = tuple(sorted(set(category_ids)))
+    stmt = _score_matrix_stmt((observations.c.observed_at == observed_at) & observations.c.category_id.in_(category_ids), school_year_id)
+    year_id, matrix, watermark = _load_score_matrix(conn, stmt, dates=[observed_at], category_ids=category_ids)
+    return EntryGrid(school_year_id=year_id, observed_at=observed_at, category_ids=category_ids, matrix=matrix, watermark=watermark)
+
+
+def get_cached_entry_grid(conn, *, observed_at: date, category_ids: Iterable[int], school_year_id: Optional[int] = None) -> EntryGrid:
+    """Cached `load_entry_grid`, keyed per (school year, date, category set).
+
+    Valid until the class list or that school year's observations change, which
+    includes every `save_grid_changes` on it.
+    """
+    category_ids = tuple(sorted(set(category_ids)))
+    if school_year_id is None:
+        latest = get_latest_school_year(conn)
+        if latest is None:
+            return load_entry_grid(conn, observed_at=observed_at, category_ids=category_ids)
+        school_year_id = latest["id"]
+    versions = read_data_versions(conn)
+    version = (versions.get("persons", 0), versions.get(f"observations:{school_year_id}", 0))
+
+    def load():
+        return load_entry_grid(conn, observed_at=observed_at, category_ids=category_ids, school_year_id=school_year_id)
+
+    def refresh(old_version, old):
+        # only observations changed: patch a copy with the delta instead of reloading
+        return refresh_entry_grid(conn, old) if old_version[0] == version[0] else load()
+
+    return observation_cache.get_or_load(("entry", school_year_id, observed_at, category_ids), version, load, refresh, store=shares_cache(conn))
+
+
+def load_grid_snapshot(conn, *, school_year_id: int, observed_at: date, category_ids: Iterable[int]) -> GridSnapshot:
+    """Load the existing observations of one date for the given categories."""
+    return load_entry_grid(conn, observed_at=observed_at, category_ids=category_ids, school_year_id=school_year_id).snapshot()
+
+
+@writes
+def save_grid_changes(conn, snapshot: GridSnapshot, edits: Iterable[Union[ObservationInput, dict]]) -> GridSaveResult:
+    """Persist only the cells that changed since `snapshot` was loaded.
+
+    At most three statements, each detecting conflicts itself through RETURNING:
+
+    - new cells: INSERT ... ON CONFLICT DO NOTHING (a row that appeared meanwhile is a conflict)
+    - changed cells: one UPDATE ... WHERE (id, updated_at) IN (...) (a row that was
+      modified or deleted meanwhile is a conflict)
+    - cleared cells (NULL score, no comment): DELETE ... WHERE (id, updated_at) IN (...)
+
+    All or nothing: if any cell conflicts, `GridConflict` is raised and the transaction
+    must be rolled back (the write unit does that on the rerun's connection; `connect()`
+    does when the exception leaves the block). `snapshot` is not modified; call
+    `result.apply(snapshot)` once the save is committed.
+    """
+    changed = snapshot.changed(edits)
+    now = datetime.now(timezone.utc)
+    to_insert: list[ObservationInput] = []
+    to_update: dict[int, ObservationInput] = {}
+    to_delete: dict[int, ObservationInput] = {}
+    for edit in changed:
+        before = snapshot.get(edit.person_id, edit.category_id)
+        if before.observation_id is None:
+            if not edit.is_empty:
+                to_insert.append(edit)
+        elif edit.is_empty:
+            to_delete[before.observation_id] = edit
+        else:
+            to_update[before.observation_id] = edit
+
+    conflicts: list[tuple[int, int]] = []
+    applied: list[tuple[int, int, CellState]] = []
+    inserted = updated = deleted = 0
+
+    if to_insert:
+        insert_ = _dialect_insert(conn)
+        stmt = insert_(observations).values(
+            [
+                dict(
+                    person_id=e.person_id,
+                    category_id=e.category_id,
+                    observed_at=e.observed_at,
+                    school_year_id=snapshot.school_year_id,
+                    score=e.score,
+                    comment=e.comment,
+                    created_at=now,
+                    updated_at=now,
+                )
+                for e in to_insert
+            ]
+        ).on_conflict_do_nothing(index_elements=[observations.c.person_id, observations.c.category_id, observations.c.observed_at])
+        stmt = stmt.returning(observations.c.id, observations.c.person_id, observations.c.category_id, observations.c.updated_at)
+        written = {(r.person_id, r.category_id): r for r in conn.execute(stmt)}
+        for e in to_insert:
+            r = written.get((e.person_id, e.category_id))
+            if r is None:
+                conflicts.append((e.person_id, e.category_id))
+                continue
+            applied.append((e.person_id, e.category_id, CellState(e.score, e.comment, r.id, r.updated_at)))
+            inserted += 1
+
+    if to_update:
+        expected = [(oid, snapshot.get(e.person_id, e.category_id).updated_at) for oid, e in to_update.items()]
+        stmt = (
+            observations.update()
+            .where(tuple_(observations.c.id, observations.c.updated_at).in_(expected))
+            .values(
+                score=cast(case({oid: e.score for oid, e in to_update.items()}, value=observations.c.id), Integer),
+                comment=cast(case({oid: e.comment for oid, e in to_update.items()}, value=observations.c.id), Text),
+                updated_at=now,
+            )
+            .returning(observations.c.id, observations.c.updated_at)
+        )
+        written = {r.id: r.updated_at for r in conn.execute(stmt)}
+        for oid, e in to_update.items():
+            if oid not in written:
+                conflicts.append((e.person_id, e.category_id))
+                continue
+            applied.append((e.person_id, e.category_id, CellState(e.score, e.comment, oid, written[oid])))
+            updated += 1
+
+    if to_delete:
+        expected = [(oid, snapshot.get(e.person_id, e.category_id).updated_at) for oid, e in to_delete.items()]
+        stmt = observations.delete().where(tuple_(observations.c.id, observations.c.updated_at).in_(expected)).returning(observations.c.id)
+        gone = {r.id for r in conn.execute(stmt)}
+        if gone:
+            conn.execute(
+                observation_deletions.insert(),
+                [
+                    dict(observation_id=oid, school_year_id=snapshot.school_year_id, person_id=e.person_id, category_id=e.category_id, observed_at=e.observed_at, deleted_at=now)
+                    for oid, e in to_delete.items()
+                    if oid in gone
+                ],
+            )
+        for oid, e in to_delete.items():
+            if oid not in gone:
+                conflicts.append((e.person_id, e.category_id))
+                continue
+            applied.append((e.person_id, e.category_id, CellState()))
+            deleted += 1
+
+    if conflicts:
+        raise GridConflict(tuple(conflicts))
+    if applied:
+        bump_data_version(conn, *observation_domains(snapshot.school_year_id))
+    return GridSaveResult(inserted=inserted, updated=updated, deleted=deleted, cells=tuple(applied))
+
+
+# --- Class overview pivot (persons x dates for one category) ----------------------------
+
+
+@dataclass(frozen=True, eq=False)
+class ClassPivot:
+    """One category over a school year, as persons x observation dates.
+
+    Backed by a ScoreMatrix; `scores` is a zero-copy int8 view (SCORE_NULL for no
+    score) indexed by person_id in class-list order with one column per date.
+    """
+
+    school_year_id: Optional[int]
+    category_id: int
+    matrix: ScoreMatrix
+    watermark: Watermark = Watermark()
+
+    @property
+    def persons(self) -> tuple[tuple[int, str], ...]:
+        return tuple(zip(self.matrix.persons.tolist(), self.matrix.person_names))
+
+    @property
+    def dates(self) -> tuple[date, ...]:
+        return tuple(self.matrix.dates.tolist())
+
+    @property
+    def scores(self) -> pd.DataFrame:
+        return self.matrix.codes_frame(self.category_id)
+
+    @property
+    def flat(self) -> pd.DataFrame:
+        """One row per observation ordered by person and date."""
+        return self.matrix.flat(self.category_id)
+
+    def detail(self, person_id: int) -> pd.DataFrame:
+        """All observations of one person (date, score, comment), oldest first."""
+        return self.matrix.flat(self.category_id, person_id)[["observed_at", "score", "comment"]]
+
+
+def load_class_pivot(conn, *, category_id: int, school_year_id: Optional[int] = None) -> ClassPivot:
+    """Build the class overview for one category with a single query."""
+    stmt = _score_matrix_stmt(observations.c.category_id == category_id, school_year_id)
+    year_id, matrix, watermark = _load_score_matrix(conn, stmt, category_ids=[category_id])
+    if year_id is None:
+        year_id = school_year_id
+    return ClassPivot(school_year_id=year_id, category_id=category_id, matrix=matrix, watermark=watermark)
+
+
+def get_cached_class_pivot(conn, *, category_id: int, school_year_id: Optional[int] = None) -> ClassPivot:
+    """Cached `load_class_pivot`, valid until the class list or its observations change."""
+    if school_year_id is None:
+        latest = get_latest_school_year(conn)
+        if latest is None:
+            return load_class_pivot(conn, category_id=category_id)
+        school_year_id = latest["id"]
+    versions = read_data_versions(conn)
+    version = (versions.get("persons", 0), versions.get(f"observations:{school_year_id}", 0))
+
+    def load():
+        return load_class_pivot(conn, category_id=category_id, school_year_id=school_year_id)
+
+    def refresh(old_version, old):
+        return refresh_class_pivot(conn, old) if old_version[0] == version[0] else load()
+
+    return observation_cache.get_or_load(("pivot", school_year_id, category_id), version, load, refresh, store=shares_cache(conn))
+
+
+# --- Delta refresh of loaded grids ---------------------------------------------------------
+#
+# A loaded pivot or entry grid carries a Watermark. A refresh fetches only the rows whose
+# updated_at is past it plus the tombstones added since, and merges them into a copy of
+# the matrix. updated_at is stamped by the clocks of several app servers, and a row can
+# commit a little after it was stamped, so the delta reaches DELTA_OVERLAP further back;
+# rows seen twice are simply applied twice. Tombstones are read the same way, from
+# DELTA_OVERLAP before the newest deleted_at seen.
+
+DELTA_OVERLAP = timedelta(seconds=float(_get_setting("DELTA_CLOCK_SKEW_SECONDS") or 120))
+
+
+@dataclass(frozen=True, eq=False)
+class ObservationDelta:
+    # observation_id, person_id, observed_at, category_id, score, comment, updated_at
+    changes: pd.DataFrame
+    # observation_id, person_id, observed_at, category_id
+    deletions: pd.DataFrame
+    watermark: Watermark
+
+    def __bool__(self) -> bool:
+        return bool(len(self.changes) or len(self.deletions))
+
+    def unseen_by(self, matrix: ScoreMatrix) -> "ObservationDelta":
+        """Drop the changes `matrix` already holds (the overlap window re-reads them)."""
+        seen = matrix.is_current(self.changes)
+        if not seen.any():
+            return self
+        return replace(self, changes=self.changes[~seen].reset_index(drop=True))
+
+
+def _frame(result) -> pd.DataFrame:
+    keys = list(result.keys())
+    return pd.DataFrame(dict(zip(keys, zip(*result.fetchall()))), columns=keys)
+
+
+def fetch_observation_delta(
+    conn,
+    *,
+    school_year_id: int,
+    since: Watermark,
+    category_ids: Optional[Iterable[int]] = None,
+    observed_at: Optional[date] = None,
+) -> ObservationDelta:
+    """Observations of a school year changed or deleted after `since`.
+
+    Optionally limited to some categories and/or one date, like the grid that is being
+    refreshed. Two small indexed queries (ix_observations_school_year_updated_at and
+    ix_observation_deletions_school_year_deleted_at).
+
+    Tombstone ids are assigned when the DELETE runs, not when it commits, so a lower
+    id can become visible after a higher one was seen. Tombstones are therefore read
+    DELTA_OVERLAP back from the newest `deleted_at` seen, like changed rows; applying
+    one twice is harmless (see `ScoreMatrix.merge`).
+    """
+    filters = [observations.c.school_year_id == school_year_id]
+    tomb_filters = [observation_deletions.c.school_year_id == school_year_id]
+    if since.updated_at is not None:
+        filters.append(observations.c.updated_at > since.updated_at - DELTA_OVERLAP)
+    if since.deleted_at is not None:
+        tomb_filters.append(observation_deletions.c.deleted_at > since.deleted_at - DELTA_OVERLAP)
+    else:
+        tomb_filters.append(observation_deletions.c.id > since.deletion_id)
+    if category_ids is not None:
+        category_ids = list(category_ids)
+        filters.append(observations.c.category_id.in_(category_ids))
+        tomb_filters.append(observation_deletions.c.category_id.in_(category_ids))
+    if observed_at is not None:
+        filters.append(observations.c.observed_at == observed_at)
+        tomb_filters.append(observation_deletions.c.observed_at == observed_at)
+
+    changes = _frame(
+        conn.execute(
+            select(
+                observations.c.id.label("observation_id"),
+                observations.c.person_id,
+                observations.c.observed_at,
+                observations.c.category_id,
+                observations.c.score,
+                observations.c.comment,
+                observations.c.updated_at,
+            ).where(*filters)
+        )
+    )
+    deletions = _frame(
+        conn.execute(
+            select(
+                observation_deletions.c.id,
+                observation_deletions.c.observation_id,
+                observation_deletions.c.person_id,
+                observation_deletions.c.observed_at,
+                observation_deletions.c.category_id,
+                observation_deletions.c.deleted_at,
+            )
+            .where(*tomb_filters)
+            .order_by(observation_deletions.c.id)
+        )
+    )
+    newest = changes["updated_at"].max().to_pydatetime() if len(changes) else None
+    newest_deletion = deletions["deleted_at"].max().to_pydatetime() if len(deletions) else None
+    watermark = Watermark(
+        updated_at=max(filter(None, (since.updated_at, newest)), default=None),
+        deletion_id=max(since.deletion_id, int(deletions["id"].max())) if len(deletions) else since.deletion_id,
+        deleted_at=max(filter(None, (since.deleted_at, newest_deletion)), default=None),
+    )
+    return ObservationDelta(changes=changes, deletions=deletions, watermark=watermark)
+
+
+def refresh_entry_grid(conn, grid: EntryGrid) -> EntryGrid:
+    """`grid` brought up to date with the rows changed since it was loaded.
+
+    The grid is not modified (it may be shared); the result holds a patched copy of its
+    matrix. Falls back to a full load when a change concerns a person who is not on it.
+    """
+    if grid.school_year_id is None:
+        return load_entry_grid(conn, observed_at=grid.observed_at, category_ids=grid.category_ids)
+    delta = fetch_observation_delta(
+        conn, school_year_id=grid.school_year_id, since=grid.watermark, category_ids=grid.category_ids, observed_at=grid.observed_at
+    )
+    delta = delta.unseen_by(grid.matrix)
+    if not delta:
+        return replace(grid, watermark=delta.watermark)
+    if not grid.matrix.covers(delta.changes):
+        return load_entry_grid(conn, observed_at=grid.observed_at, category_ids=grid.category_ids, school_year_id=grid.school_year_id)
+    matrix = grid.matrix.copy()
+    matrix.merge(delta.changes, delta.deletions)
+    return replace(grid, matrix=matrix, watermark=delta.watermark)
+
+
+def refresh_class_pivot(conn, pivot: ClassPivot) -> ClassPivot:
+    """`pivot` brought up to date with the rows changed since it was loaded.
+
+    New dates get a column, dates left without observations lose theirs. Like
+    `refresh_entry_grid` the pivot itself is not modified.
+    """
+    if pivot.school_year_id is None:
+        return load_class_pivot(conn, category_id=pivot.category_id)
+    delta = fetch_observation_delta(conn, school_year_id=pivot.school_year_id, since=pivot.watermark, category_ids=[pivot.category_id])
+    delta = delta.unseen_by(pivot.matrix)
+    if not delta:
+        return replace(pivot, watermark=delta.watermark)
+    matrix = pivot.matrix
+    new_dates = set(delta.changes["observed_at"]) - set(matrix.dates.tolist())
+    if new_dates:
+        matrix = matrix.reindex_dates(sorted(set(matrix.dates.tolist()) | new_dates))
+    else:
+        matrix = matrix.copy()
+    if not matrix.covers(delta.changes):
+        return load_class_pivot(conn, category_id=pivot.category_id, school_year_id=pivot.school_year_id)
+    matrix.merge(delta.changes, delta.deletions)
+    return replace(pivot, matrix=matrix.drop_empty_dates(), watermark=delta.watermark)
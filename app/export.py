@@ -0,0 +1,200 @@
+"""XLSX exports that stream rows from the database into the workbook.
+
+Every sheet is fed by a query executed with `yield_per`. On PostgreSQL that is a
+server-side cursor; SQLite fetches in batches. Rows go straight into an openpyxl
+write-only workbook, which spools each sheet to disk, so building it takes flat memory
+however many observations there are. The workbook is written to a temp file, which the
+page hands to `st.download_button`; Streamlit holds the finished file in memory while
+the button is shown. Temp files whose download never came (the session ended first) are
+swept when the next export is built, once older than EXPORT_MAX_AGE_SECONDS.
+
+- `export_all`: every table an admin may see, one sheet each (no password hashes).
+- `export_class`: one category for a school year, as a pivot (persons x dates, score
+  and comment per date) and a flat sheet.
+- `export_person`: all observations of one person (flat).
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from typing import Callable, Iterable, Iterator, Optional
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from sqlalchemy import select
+
+from app import db
+from app.matrix import SCORE_LABELS, SCORE_NULL
+
+# rows fetched per round trip from the (server-side) cursor
+EXPORT_BATCH_SIZE = 1000
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+TEMP_PREFIX = "export-"
+# built exports not downloaded within this time are removed by the next build
+EXPORT_MAX_AGE_SECONDS = int(db._get_setting("EXPORT_MAX_AGE_SECONDS") or 3600)
+
+
+def _cell(sheet, value):
+    """A value openpyxl can store: naive UTC datetimes, and text that is never read as a formula."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, str) and value.startswith("="):
+        cell = WriteOnlyCell(sheet, value)
+        cell.data_type = "s"
+        return cell
+    return value
+
+
+def _score_label(score: Optional[int]) -> Optional[str]:
+    return None if score is None else SCORE_LABELS[score]
+
+
+def stream_rows(conn, stmt, transform: Optional[Callable[[dict], dict]] = None) -> tuple[list[str], Iterator[tuple]]:
+    """Column names and a row iterator for `stmt`, fetched EXPORT_BATCH_SIZE rows at a time."""
+    result = conn.execute(stmt, execution_options={"yield_per": EXPORT_BATCH_SIZE})
+    header = list(result.keys())
+    if transform is None:
+        return header, (tuple(row) for row in result)
+    return header, (tuple(transform(dict(row)).values()) for row in result.mappings())
+
+
+def write_sheet(workbook: Workbook, title: str, header: list[str], rows: Iterable[tuple]) -> int:
+    """Append a sheet with a header row; returns the number of data rows."""
+    sheet = workbook.create_sheet(title)
+    sheet.append(header)
+    count = 0
+    for row in rows:
+        sheet.append([_cell(sheet, v) for v in row])
+        count += 1
+    return count
+
+
+def _save(workbook: Workbook, path: str) -> str:
+    workbook.save(path)
+    return path
+
+
+# --- Queries --------------------------------------------------------------------------------
+
+def _observations_stmt(*where):
+    o, p, c, sy = db.observations, db.persons, db.categories, db.school_years
+    return (
+        select(
+            o.c.id,
+            sy.c.name.label("school_year"),
+            o.c.observed_at,
+            o.c.person_id,
+            p.c.full_name.label("person"),
+            o.c.category_id,
+            c.c.label.label("category"),
+            o.c.score,
+            o.c.comment,
+            o.c.created_at,
+            o.c.updated_at,
+        )
+        .select_from(o.join(p, p.c.id == o.c.person_id).join(c, c.c.id == o.c.category_id).join(sy, sy.c.id == o.c.school_year_id))
+        .where(*where)
+    )
+
+
+def _with_score_label(row: dict) -> dict:
+    row["score"] = _score_label(row["score"])
+    return row
+
+
+# --- Exports --------------------------------------------------------------------------------
+
+def export_all(path: str) -> str:
+    """All production data, one sheet per table (users without password hashes)."""
+    o = db.observations
+    sheets = [
+        ("Observaties", _observations_stmt().order_by(o.c.school_year_id, o.c.observed_at, o.c.id), _with_score_label),
+        ("Personen", select(db.persons).order_by(db.persons.c.school_year_id, db.persons.c.last_name, db.persons.c.first_name, db.persons.c.id), None),
+        ("Categorieën", select(db.categories).order_by(db.categories.c.id), None),
+        ("Schooljaren", select(db.school_years).order_by(db.school_years.c.id), None),
+        ("Gebruikers", select(*db.USER_LIST_COLUMNS).order_by(db.users.c.email), None),
+    ]
+    workbook = Workbook(write_only=True)
+    with db.connect() as conn:
+        for title, stmt, transform in sheets:
+            write_sheet(workbook, title, *stream_rows(conn, stmt, transform))
+    return _save(workbook, path)
+
+
+def _pivot_rows(pivot: db.ClassPivot) -> Iterator[tuple]:
+    """Per person: the name, then score and comment for every date."""
+    matrix = pivot.matrix
+    c = matrix.categories.position(pivot.category_id)
+    codes = matrix.codes(pivot.category_id)
+    for p, name in enumerate(matrix.person_names):
+        row = [name]
+        for d, code in enumerate(codes[p].tolist()):
+            row.append(None if code == SCORE_NULL else SCORE_LABELS[code])
+            row.append(matrix.comments.get((c, d, p)))
+        yield tuple(row)
+
+
+def export_class(path: str, *, category_id: int, school_year_id: Optional[int] = None) -> str:
+    """One category for a school year (default: the most recent): a pivot and a flat sheet."""
+    o = db.observations
+    with db.connect() as conn:
+        if school_year_id is None:
+            latest = db.get_latest_school_year(conn)
+            school_year_id = latest["id"] if latest else None
+        # the pivot is one class list wide (it is also what the overview page shows)
+        pivot = db.get_cached_class_pivot(conn, category_id=category_id, school_year_id=school_year_id)
+        header = ["Naam"]
+        for day in pivot.dates:
+            header += [f"{day:%d/%m/%Y} score", f"{day:%d/%m/%Y} commentaar"]
+        workbook = Workbook(write_only=True)
+        write_sheet(workbook, "Overzicht", header, _pivot_rows(pivot))
+        flat = _observations_stmt(o.c.category_id == category_id, o.c.school_year_id == school_year_id)
+        write_sheet(workbook, "Observaties", *stream_rows(conn, flat.order_by(o.c.person_id, o.c.observed_at), _with_score_label))
+    return _save(workbook, path)
+
+
+def export_person(path: str, *, person_id: int) -> str:
+    """All observations of one person, by category and date."""
+    o, c = db.observations, db.categories
+    stmt = _observations_stmt(o.c.person_id == person_id).order_by(c.c.display_order.is_(None), c.c.display_order, c.c.label, o.c.observed_at)
+    workbook = Workbook(write_only=True)
+    with db.connect() as conn:
+        write_sheet(workbook, "Observaties", *stream_rows(conn, stmt, _with_score_label))
+    return _save(workbook, path)
+
+
+def sweep_stale_exports(max_age: Optional[float] = None, *, now: Optional[float] = None) -> int:
+    """Remove export temp files older than `max_age` seconds (EXPORT_MAX_AGE_SECONDS); returns the number removed."""
+    cutoff = (time.time() if now is None else now) - (EXPORT_MAX_AGE_SECONDS if max_age is None else max_age)
+    removed = 0
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{TEMP_PREFIX}*.xlsx")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            # removed meanwhile by its own session or another process
+            pass
+    return removed
+
+
+def export_to_tempfile(export: Callable[..., str], **kwargs) -> str:
+    """Run an export into a new temporary .xlsx file and return its path; the caller removes it."""
+    sweep_stale_exports()
+    fd, path = tempfile.mkstemp(suffix=".xlsx", prefix=TEMP_PREFIX)
+    os.close(fd)
+    try:
+        return export(path, **kwargs)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def export_filename(kind: str, *, today: Optional[date] = None) -> str:
+    return f"observaties-{kind}-{(today or date.today()):%Y%m%d}.xlsx"
@@ -0,0 +1,179 @@
+"""Password hashing off the Streamlit script threads.
+
+PBKDF2 is deliberately slow. Running it inline makes every login, reset and password
+change hold a script thread for the whole work factor. Here the hashes run on a small,
+process-wide thread pool: `hashlib.pbkdf2_hmac` releases the GIL, so the workers use
+real cores while script threads only wait for the result.
+
+The pool has a concurrency cap (HASH_WORKERS) and a bound on queued jobs
+(HASH_MAX_PENDING). When the queue stays full for HASH_QUEUE_TIMEOUT_SECONDS,
+`HashingBusy` is raised instead of piling up more waiting sessions.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, Optional
+
+from app import db
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue stays full for longer than the queue timeout."""
+
+
+def _setting(name: str, default: float) -> float:
+    raw = db._get_setting(name)
+    return type(default)(raw) if raw is not None else default
+
+
+class HashMetrics:
+    """Thread-safe counters for hashing jobs: time queued before a worker picked them up, and run time."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.jobs = 0
+            self.rejected = 0
+            self.in_flight = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.total_run_seconds = 0.0
+            self.max_run_seconds = 0.0
+
+    def submitted(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def record(self, wait_seconds: float, run_seconds: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.jobs += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+            self.total_run_seconds += run_seconds
+            self.max_run_seconds = max(self.max_run_seconds, run_seconds)
+
+    def record_rejected(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "jobs": self.jobs,
+                "rejected": self.rejected,
+                "in_flight": self.in_flight,
+                "avg_wait_ms": round(1000 * self.total_wait_seconds / self.jobs, 2) if self.jobs else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait_seconds, 2),
+                "avg_run_ms": round(1000 * self.total_run_seconds / self.jobs, 2) if self.jobs else 0.0,
+                "max_run_ms": round(1000 * self.max_run_seconds, 2),
+            }
+
+
+class HashExecutor:
+    """A thread pool of `workers` threads that accepts at most `max_pending` queued or running jobs."""
+
+    def __init__(self, workers: int, max_pending: int, queue_timeout: float) -> None:
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.metrics = HashMetrics()
+        self._slots = threading.BoundedSemaphore(max(max_pending, workers))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pw-hash")
+
+    def submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.metrics.record_rejected()
+            raise HashingBusy("password hashing queue is full")
+        queued = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.metrics.record(started - queued, time.perf_counter() - started)
+
+        self.metrics.submitted()
+        try:
+            future = self._pool.submit(job)
+        except BaseException:
+            self.metrics.record(0.0, 0.0)
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn: Callable, *args):
+        return self.submit(fn, *args).result()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+_executor: Optional[HashExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> HashExecutor:
+    """The process-wide hashing executor, sized from HASH_WORKERS / HASH_MAX_PENDING."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(_setting("HASH_WORKERS", max(1, min(4, os.cpu_count() or 1))))
+                _executor = HashExecutor(
+                    workers,
+                    int(_setting("HASH_MAX_PENDING", workers * 16)),
+                    _setting("HASH_QUEUE_TIMEOUT_SECONDS", 10.0),
+                )
+    return _executor
+
+
+def hash_password(password: str) -> str:
+    return get_executor().run(db._pbkdf2_hash, password)
+
+
+def hash_passwords(passwords: Iterable[str], iterations: Optional[int] = None) -> list[str]:
+    """Hash many passwords, up to HASH_WORKERS at a time."""
+    executor = get_executor()
+    futures = [executor.submit(db._pbkdf2_hash, pw, iterations) for pw in passwords]
+    return [f.result() for f in futures]
+
+
+def hash_passwords_in_processes(passwords: list[str], processes: Optional[int] = None, iterations: Optional[int] = None) -> list[str]:
+    """Hash a large batch (bulk imports) across a process pool, one process per core by default.
+
+    Meant for CLI/admin batch jobs, not for the login path: starting the pool costs more
+    than a handful of hashes.
+    """
+    processes = processes or os.cpu_count() or 1
+    if len(passwords) < 2 * processes:
+        return hash_passwords(passwords, iterations)
+    # pass the work factor explicitly: the children may read other settings
+    work = partial(db._pbkdf2_hash, iterations=iterations or db.PBKDF2_ITERATIONS)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return list(pool.map(work, passwords, chunksize=max(1, len(passwords) // (4 * processes))))
+
+
+def verify_password(password: str, stored: str) -> bool:
+    return get_executor().run(db._pbkdf2_verify, password, stored)
+
+
+def needs_rehash(stored: str) -> bool:
+    """Whether a stored hash uses fewer iterations than PBKDF2_ITERATIONS (or another scheme)."""
+    iterations = db._pbkdf2_iterations(stored)
+    return iterations is None or iterations < db.PBKDF2_ITERATIONS
+
+
+def hash_metrics() -> dict:
+    """Queue/run counters plus the pool size, for diagnostics."""
+    executor = get_executor()
+    return {"workers": executor.workers, **executor.metrics.snapshot()}
@@ -0,0 +1,289 @@
+"""Bulk import of user accounts and class lists (persons) from CSV or XLSX files.
+
+Every row is validated before anything is written. A file with errors imports nothing
+and the errors are reported per spreadsheet row; a file that cannot be read at all is
+reported on row 1. CSV files are read as UTF-8, or as Windows-1252 when they are not
+(what Excel writes). Inserts use multi-row INSERTs (COPY on PostgreSQL).
+
+Temporary passwords are hashed at PBKDF2_ITERATIONS before any transaction is opened.
+The rows are then validated again and inserted in one short transaction, so a row that
+another session added meanwhile is reported like any other error. The admin page hashes
+on the shared thread executor; the CLI passes a process count for a process pool.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import re
+import secrets
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.hashing import hash_passwords, hash_passwords_in_processes
+
+# rows per multi-row INSERT / existence check (well below SQLite's bound-parameter limit)
+BATCH_SIZE = 500
+
+# accepted header names per field (compared lowercased)
+USER_COLUMNS = {
+    "email": ("email", "e-mail", "e-mailadres", "gebruikersnaam"),
+    "full_name": ("full_name", "naam", "volledige naam"),
+    "is_admin": ("is_admin", "admin"),
+}
+PERSON_COLUMNS = {
+    "first_name": ("first_name", "voornaam"),
+    "last_name": ("last_name", "achternaam", "familienaam"),
+    "external_id": ("external_id", "extern id", "stamboeknummer"),
+}
+OPTIONAL_COLUMNS = {"is_admin", "external_id"}
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_TRUE = {"1", "true", "ja", "yes", "x", "waar"}
+_FALSE = {"", "0", "false", "nee", "no", "onwaar"}
+
+
+@dataclass(frozen=True)
+class RowError:
+    """A problem with one row; `row` is the line number in the file (the header is row 1)."""
+
+    row: int
+    message: str
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    errors: list = field(default_factory=list)
+    # email -> temporary password (user imports only)
+    passwords: dict = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def _decode(data: bytes) -> str:
+    """CSV text: UTF-8 (with or without BOM), else Windows-1252 as Excel saves it."""
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1252")
+
+
+def read_rows(data: bytes, filename: str) -> tuple[list[tuple[int, dict]], list[RowError]]:
+    """(row number, {lowercased header: text}) for every non-empty row of a CSV or the first XLSX sheet.
+
+    A file that cannot be read gives no rows and one error on row 1.
+    """
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+
+        try:
+            workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+            try:
+                table = [list(values) for values in workbook.active.iter_rows(values_only=True)]
+            finally:
+                workbook.close()
+        except (zipfile.BadZipFile, InvalidFileException, KeyError, ValueError, OSError):
+            return [], [RowError(1, "het bestand is geen leesbaar XLSX-bestand")]
+    else:
+        try:
+            text = _decode(data)
+        except UnicodeDecodeError:
+            return [], [RowError(1, "het bestand is geen tekstbestand in UTF-8 of Windows-1252")]
+        try:
+            dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        try:
+            table = list(csv.reader(io.StringIO(text), dialect))
+        except csv.Error as e:
+            return [], [RowError(1, f"het bestand is geen leesbaar CSV-bestand ({e})")]
+    if not table:
+        return [], []
+    header = [str(h or "").strip().lower() for h in table[0]]
+    rows = []
+    for number, values in enumerate(table[1:], start=2):
+        cells = ["" if v is None else str(v).strip() for v in values]
+        if any(cells):
+            rows.append((number, dict(zip(header, cells))))
+    return rows, []
+
+
+def _columns(rows, spec: dict) -> tuple[dict, list]:
+    """Map each field to the header used for it in this file; missing required columns are errors."""
+    headers = set(rows[0][1]) if rows else set()
+    mapping, errors = {}, []
+    for name, aliases in spec.items():
+        found = next((a for a in aliases if a in headers), None)
+        if found is not None:
+            mapping[name] = found
+        elif name not in OPTIONAL_COLUMNS:
+            errors.append(RowError(1, f"kolom '{aliases[0]}' ontbreekt (ook goed: {', '.join(aliases[1:])})"))
+    return mapping, errors
+
+
+def _existing(conn, column, values: list, *where) -> set:
+    """Which of `values` already occur in `column`, checked in batches."""
+    found = set()
+    for i in range(0, len(values), BATCH_SIZE):
+        chunk = values[i : i + BATCH_SIZE]
+        found.update(conn.execute(select(column).where(column.in_(chunk), *where)).scalars())
+    return found
+
+
+def validate_users(conn, rows: list[tuple[int, dict]]) -> tuple[list[tuple[int, dict]], list[RowError]]:
+    """Check user rows; returns the cleaned records and the errors (nothing is written)."""
+    cols, errors = _columns(rows, USER_COLUMNS)
+    if errors:
+        return [], errors
+    records, first_row = [], {}
+    for number, row in rows:
+        email = row.get(cols["email"], "").lower()
+        full_name = row.get(cols["full_name"], "")
+        admin_raw = row.get(cols.get("is_admin"), "").lower()
+        if not _EMAIL_RE.match(email):
+            errors.append(RowError(number, f"ongeldig e-mailadres '{email}'"))
+            continue
+        if email in first_row:
+            errors.append(RowError(number, f"{email} staat ook al op rij {first_row[email]}"))
+            continue
+        first_row[email] = number
+        if not full_name:
+            errors.append(RowError(number, "naam ontbreekt"))
+            continue
+        if admin_raw not in _TRUE | _FALSE:
+            errors.append(RowError(number, f"admin moet ja of nee zijn, niet '{admin_raw}'"))
+            continue
+        records.append((number, {"email": email, "full_name": full_name, "is_admin": admin_raw in _TRUE}))
+    for email in _existing(conn, db.users.c.email, list(first_row)):
+        errors.append(RowError(first_row[email], f"er bestaat al een gebruiker {email}"))
+    return records, sorted(errors, key=lambda e: e.row)
+
+
+def validate_persons(conn, rows: list[tuple[int, dict]], school_year_id: int) -> tuple[list[tuple[int, dict]], list[RowError]]:
+    """Check class list rows for one school year; returns the cleaned records and the errors."""
+    cols, errors = _columns(rows, PERSON_COLUMNS)
+    if errors:
+        return [], errors
+    records, first_row = [], {}
+    for number, row in rows:
+        first_name = row.get(cols["first_name"], "")
+        last_name = row.get(cols["last_name"], "")
+        external_id = row.get(cols.get("external_id"), "") or None
+        if not first_name or not last_name:
+            errors.append(RowError(number, "voornaam en achternaam zijn verplicht"))
+            continue
+        if external_id is not None:
+            if external_id in first_row:
+                errors.append(RowError(number, f"extern id {external_id} staat ook al op rij {first_row[external_id]}"))
+                continue
+            first_row[external_id] = number
+        records.append((number, {"first_name": first_name, "last_name": last_name, "external_id": external_id}))
+    existing = _existing(conn, db.persons.c.external_id, list(first_row), db.persons.c.school_year_id == school_year_id)
+    for external_id in existing:
+        errors.append(RowError(first_row[external_id], f"extern id {external_id} zit al in dit schooljaar"))
+    return records, sorted(errors, key=lambda e: e.row)
+
+
+def _copy_rows(conn, table, records: list[dict]) -> bool:
+    """Stream `records` with COPY FROM STDIN when the driver is psycopg 3; False if not possible."""
+    raw = conn.connection.driver_connection
+    columns = list(records[0])
+    with raw.cursor() as cursor:
+        if not hasattr(cursor, "copy"):
+            return False
+        with cursor.copy(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN") as copy:
+            for record in records:
+                copy.write_row([record[c] for c in columns])
+    return True
+
+
+def insert_batches(conn, table, records: list[dict]) -> None:
+    """Insert `records` with COPY on PostgreSQL, else with multi-row INSERTs of BATCH_SIZE rows."""
+    if not records:
+        return
+    if conn.dialect.name == "postgresql" and _copy_rows(conn, table, records):
+        return
+    for i in range(0, len(records), BATCH_SIZE):
+        conn.execute(table.insert().values(records[i : i + BATCH_SIZE]))
+
+
+def _conflict_report(validate) -> ImportReport:
+    """Errors for an insert that hit a unique constraint: the rows someone else added meanwhile."""
+    with db.connect() as conn:
+        _, errors = validate(conn)
+    return ImportReport(errors=errors or [RowError(1, "een rij bestaat intussen al; er is niets geïmporteerd, probeer opnieuw")])
+
+
+def import_users(rows: list[tuple[int, dict]], *, created_by_id: Optional[int] = None, dry_run: bool = False, processes: Optional[int] = None) -> ImportReport:
+    """Create an account with a temporary password per row, all or nothing.
+
+    `processes` hashes across a process pool (CLI); None uses the shared thread executor.
+    """
+    with db.connect() as conn:
+        records, errors = validate_users(conn, rows)
+    if errors or dry_run:
+        return ImportReport(errors=errors)
+
+    # hash with no transaction open: this takes seconds for a large file
+    temps = [secrets.token_urlsafe(10) for _ in records]
+    hashes = hash_passwords_in_processes(temps, processes) if processes else hash_passwords(temps)
+    try:
+        with db.transaction() as conn:
+            # rows added by someone else while we were hashing
+            _, errors = validate_users(conn, rows)
+            if errors:
+                return ImportReport(errors=errors)
+            now = datetime.now(timezone.utc)
+            values = [
+                {
+                    **record,
+                    "password_hash": pw_hash,
+                    "is_active": True,
+                    "must_change_password": True,
+                    "created_at": now,
+                    "updated_at": now,
+                    "created_by_id": created_by_id,
+                }
+                for (_, record), pw_hash in zip(records, hashes)
+            ]
+            insert_batches(conn, db.users, values)
+    except IntegrityError:
+        return _conflict_report(lambda conn: validate_users(conn, rows))
+    return ImportReport(inserted=len(values), passwords={r["email"]: pw for (_, r), pw in zip(records, temps)})
+
+
+def import_persons(rows: list[tuple[int, dict]], *, school_year_id: int, dry_run: bool = False) -> ImportReport:
+    """Add a class list to a school year, all or nothing."""
+    try:
+        with db.transaction() as conn:
+            records, errors = validate_persons(conn, rows, school_year_id)
+            if errors or dry_run:
+                return ImportReport(errors=errors)
+            values = [
+                {**record, "school_year_id": school_year_id, "full_name": f"{record['first_name']} {record['last_name']}"}
+                for _, record in records
+            ]
+            insert_batches(conn, db.persons, values)
+            db.bump_data_version(conn, "persons")
+    except IntegrityError:
+        return _conflict_report(lambda conn: validate_persons(conn, rows, school_year_id))
+    return ImportReport(inserted=len(values))
+
+
+def passwords_csv(report: ImportReport) -> str:
+    """The temporary passwords of a user import as CSV text (e-mail;wachtwoord)."""
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=";")
+    writer.writerow(["e-mail", "tijdelijk wachtwoord"])
+    writer.writerows(report.passwords.items())
+    return out.getvalue()
@@ -0,0 +1,180 @@
+"""Housekeeping for the login_tokens and login_attempts tables.
+
+Sign-in links now use signed tokens (see app.auth), so no new rows are written. The table
+still holds legacy UUID tokens until they expire. The purge deletes expired rows in
+small batches, each in its own short transaction, so no long lock is held on a busy
+table. An optional cap (LOGIN_TOKENS_PER_USER) keeps only each user's newest live
+tokens. Rate limiter rows (login_attempts) that are unlocked and idle are removed too.
+
+Runs from `scripts/purge_login_tokens.py` (cron) or in-process on a background thread
+started by `start_maintenance_scheduler()` (TOKEN_PURGE_INTERVAL_SECONDS, 0 = off).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func, select
+
+from app import db
+
+DEFAULT_BATCH_SIZE = 1000
+# login_attempts rows without a lock and without failures for this long are dropped
+STALE_ATTEMPT_SECONDS = 3600
+
+
+def _setting(name: str, default: Optional[int]) -> Optional[int]:
+    raw = db._get_setting(name)
+    return int(raw) if raw is not None else default
+
+
+class MaintenanceMetrics:
+    """Thread-safe counters of purge runs, for monitoring."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.runs = 0
+            self.failures = 0
+            self.deleted_expired = 0
+            self.deleted_over_cap = 0
+            self.deleted_attempts = 0
+            self.last_run_at: Optional[datetime] = None
+            self.last_duration_seconds = 0.0
+
+    def record(self, expired: int, over_cap: int, attempts: int, duration_seconds: float) -> None:
+        with self._lock:
+            self.runs += 1
+            self.deleted_expired += expired
+            self.deleted_over_cap += over_cap
+            self.deleted_attempts += attempts
+            self.last_run_at = datetime.now(timezone.utc)
+            self.last_duration_seconds = duration_seconds
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "failures": self.failures,
+                "deleted_expired": self.deleted_expired,
+                "deleted_over_cap": self.deleted_over_cap,
+                "deleted_attempts": self.deleted_attempts,
+                "last_run_at": self.last_run_at.isoformat(timespec="seconds") if self.last_run_at else None,
+                "last_duration_ms": round(1000 * self.last_duration_seconds, 2),
+            }
+
+
+maintenance_metrics = MaintenanceMetrics()
+
+
+def _delete_in_batches(key, victims, batch_size: int, pause: float) -> int:
+    """Delete the rows whose primary key `key` is selected by `victims`, `batch_size` per transaction."""
+    deleted = 0
+    while True:
+        # a transaction of its own per batch, also when called inside a request scope
+        with db.get_engine().begin() as conn:
+            batch = conn.execute(key.table.delete().where(key.in_(victims.limit(batch_size)))).rowcount
+        deleted += batch
+        if batch < batch_size:
+            return deleted
+        if pause:
+            time.sleep(pause)
+
+
+def purge_expired_login_tokens(*, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0.0, now: Optional[datetime] = None) -> int:
+    """Delete expired login tokens, oldest first; returns the number deleted."""
+    lt = db.login_tokens
+    now = now or datetime.now(timezone.utc)
+    victims = select(lt.c.token).where(lt.c.expires_at < now).order_by(lt.c.expires_at)
+    return _delete_in_batches(lt.c.token, victims, batch_size, pause)
+
+
+def cap_login_tokens_per_user(max_per_user: int, *, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0.0) -> int:
+    """Keep only the `max_per_user` newest tokens of every user; returns the number deleted."""
+    lt = db.login_tokens
+    ranked = select(
+        lt.c.token,
+        func.row_number().over(partition_by=lt.c.user_id, order_by=(lt.c.created_at.desc(), lt.c.token)).label("rank"),
+    ).subquery()
+    victims = select(ranked.c.token).where(ranked.c.rank > max_per_user)
+    return _delete_in_batches(lt.c.token, victims, batch_size, pause)
+
+
+def purge_stale_login_attempts(*, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0.0, now: Optional[float] = None) -> int:
+    """Delete rate limiter rows that are not locked and saw no failure for STALE_ATTEMPT_SECONDS."""
+    la = db.login_attempts
+    now = time.time() if now is None else now
+    victims = select(la.c.key).where(la.c.window_start < now - STALE_ATTEMPT_SECONDS, la.c.locked_until < now)
+    return _delete_in_batches(la.c.key, victims, batch_size, pause)
+
+
+def run_token_maintenance(*, max_per_user: Optional[int] = None, batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0.0) -> dict:
+    """Purge expired tokens, apply the per-user cap (LOGIN_TOKENS_PER_USER when not given) and drop idle limiter rows."""
+    if max_per_user is None:
+        max_per_user = _setting("LOGIN_TOKENS_PER_USER", None)
+    start = time.perf_counter()
+    expired = purge_expired_login_tokens(batch_size=batch_size, pause=pause)
+    over_cap = cap_login_tokens_per_user(max_per_user, batch_size=batch_size, pause=pause) if max_per_user else 0
+    attempts = purge_stale_login_attempts(batch_size=batch_size, pause=pause)
+    maintenance_metrics.record(expired, over_cap, attempts, time.perf_counter() - start)
+    return {"deleted_expired": expired, "deleted_over_cap": over_cap, "deleted_attempts": attempts}
+
+
+def login_token_counts(conn, now: Optional[datetime] = None) -> dict:
+    """Live and expired rows in login_tokens (the expired count is a range scan on the expiry index)."""
+    lt = db.login_tokens
+    now = now or datetime.now(timezone.utc)
+    total = conn.execute(select(func.count()).select_from(lt)).scalar()
+    expired = conn.execute(select(func.count()).select_from(lt).where(lt.c.expires_at < now)).scalar()
+    return {"total": total, "expired": expired, "live": total - expired}
+
+
+# --- In-process schedule ---------------------------------------------------------------------
+
+_scheduler: Optional[threading.Thread] = None
+_scheduler_stop = threading.Event()
+_scheduler_lock = threading.Lock()
+
+
+def _maintenance_loop(interval: float, pause: float) -> None:
+    while not _scheduler_stop.wait(interval):
+        try:
+            run_token_maintenance(pause=pause)
+        except Exception:
+            # keep the schedule alive; the failure shows up in the metrics
+            maintenance_metrics.record_failure()
+
+
+def start_maintenance_scheduler(interval: Optional[float] = None, pause: float = 0.05) -> bool:
+    """Start the purge thread once per process; returns False when disabled or already running."""
+    global _scheduler
+    if interval is None:
+        interval = _setting("TOKEN_PURGE_INTERVAL_SECONDS", 3600)
+    if not interval or interval <= 0:
+        return False
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler.is_alive():
+            return False
+        _scheduler_stop.clear()
+        _scheduler = threading.Thread(target=_maintenance_loop, args=(interval, pause), name="token-maintenance", daemon=True)
+        _scheduler.start()
+    return True
+
+
+def stop_maintenance_scheduler() -> None:
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler_stop.set()
+        if _scheduler is not None:
+            _scheduler.join(timeout=5)
+        _scheduler = None
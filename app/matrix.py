@@ -0,0 +1,325 @@
+"""Compact score matrices shared by the entry grid, the class overview and exports.
+
+Scores are int8 codes in a (categories, dates, persons) array: -1 = no score (NULL),
+0 = "?" and 1..4 the scores themselves. Those are exactly the codes of a categorical
+with categories ["?", "1", "2", "3", "4"], so a category slice converts to pandas or
+Arrow without copying (each date is one contiguous column, the layout pandas uses
+internally). Comments are sparse and kept in a dict keyed by position.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import weakref
+from datetime import date, datetime
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+SCORE_NULL = -1
+SCORE_LABELS = ("?", "1", "2", "3", "4")
+
+
+class Axis:
+    """Read-only axis labels with O(1) label -> position lookup."""
+
+    __slots__ = ("values", "_positions", "__weakref__")
+
+    def __init__(self, values: np.ndarray):
+        # a private copy: freezing the caller's array would make it read-only for them too
+        values = np.array(values, copy=True)
+        values.setflags(write=False)
+        self.values = values
+        self._positions = {v: i for i, v in enumerate(values.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, label) -> bool:
+        return label in self._positions
+
+    def position(self, label) -> int:
+        return self._positions[label]
+
+    def positions(self, labels) -> np.ndarray:
+        """Positions of many labels at once (-1 for unknown labels)."""
+        return pd.Index(self.values).get_indexer(labels)
+
+    def tolist(self) -> list:
+        return self.values.tolist()
+
+
+_axes: "weakref.WeakValueDictionary[tuple, Axis]" = weakref.WeakValueDictionary()
+_axes_lock = threading.Lock()
+
+
+def intern_axis(labels: Iterable, dtype) -> Axis:
+    """Return the shared Axis for these labels.
+
+    Sessions looking at the same class, dates or categories hold the same Axis object
+    instead of one copy each; unused axes are dropped with their last matrix.
+    """
+    values = np.asarray(list(labels) if not isinstance(labels, np.ndarray) else labels, dtype=dtype)
+    key = (values.dtype.str, values.tobytes())
+    with _axes_lock:
+        axis = _axes.get(key)
+        if axis is None:
+            axis = Axis(values)
+            _axes[key] = axis
+        return axis
+
+
+class ScoreMatrix:
+    """Scores (and optionally row versions) for persons x dates x categories."""
+
+    __slots__ = ("persons", "person_names", "dates", "categories", "scores", "comments", "observation_ids", "updated_at")
+
+    def __init__(self, persons: Axis, dates: Axis, categories: Axis, *, person_names: Sequence[str] = (), track_versions: bool = False):
+        self.persons = persons
+        self.person_names = tuple(sys.intern(n) for n in person_names)
+        self.dates = dates
+        self.categories = categories
+        shape = (len(categories), len(dates), len(persons))
+        self.scores = np.full(shape, SCORE_NULL, dtype=np.int8)
+        # (category, date, person) position -> comment, only for cells that have one
+        self.comments: dict[tuple[int, int, int], str] = {}
+        # id and updated_at of the stored observation, for optimistic concurrency (0 / NaT: none)
+        self.observation_ids = np.zeros(shape, dtype=np.int64) if track_versions else None
+        self.updated_at = np.full(shape, np.datetime64("NaT"), dtype="datetime64[us]") if track_versions else None
+
+    @classmethod
+    def build(
+        cls,
+        *,
+        person_ids: Sequence[int],
+        person_names: Sequence[str],
+        dates: Sequence[date],
+        category_ids: Sequence[int],
+        obs_person_ids,
+        obs_dates,
+        obs_category_ids,
+        obs_scores,
+        obs_comments,
+        obs_ids=None,
+        obs_updated_at=None,
+    ) -> "ScoreMatrix":
+        """Scatter column-wise observation data into a new matrix."""
+        matrix = cls(
+            intern_axis(person_ids, np.int64),
+            intern_axis(dates, "datetime64[D]"),
+            intern_axis(category_ids, np.int64),
+            person_names=person_names,
+            track_versions=obs_ids is not None,
+        )
+        if len(obs_person_ids):
+            pos = (
+                matrix.categories.positions(np.asarray(obs_category_ids, dtype=np.int64)),
+                matrix.dates.positions(np.asarray(obs_dates, dtype="datetime64[D]")),
+                matrix.persons.positions(np.asarray(obs_person_ids, dtype=np.int64)),
+            )
+            matrix.scores[pos] = pd.array(obs_scores, dtype="Int8").to_numpy(dtype=np.int8, na_value=SCORE_NULL)
+            comments = np.asarray(obs_comments, dtype=object)
+            for i in np.flatnonzero(pd.notna(comments)):
+                matrix.comments[(int(pos[0][i]), int(pos[1][i]), int(pos[2][i]))] = comments[i]
+            if obs_ids is not None:
+                matrix.observation_ids[pos] = np.asarray(obs_ids, dtype=np.int64)
+                matrix.updated_at[pos] = pd.to_datetime(pd.Series(obs_updated_at)).to_numpy(dtype="datetime64[us]")
+        return matrix
+
+    # --- single cells (entry grid) ---
+
+    def _pos(self, person_id: int, day: date, category_id: int) -> tuple[int, int, int]:
+        return self.categories.position(category_id), self.dates.position(day), self.persons.position(person_id)
+
+    def __contains__(self, cell: tuple[int, date, int]) -> bool:
+        person_id, day, category_id = cell
+        return person_id in self.persons and day in self.dates and category_id in self.categories
+
+    def get(self, person_id: int, day: date, category_id: int) -> tuple[Optional[int], Optional[str]]:
+        pos = self._pos(person_id, day, category_id)
+        code = int(self.scores[pos])
+        return (None if code == SCORE_NULL else code), self.comments.get(pos)
+
+    def version(self, person_id: int, day: date, category_id: int) -> tuple[Optional[int], Optional[datetime]]:
+        pos = self._pos(person_id, day, category_id)
+        observation_id = int(self.observation_ids[pos])
+        return (observation_id or None), self.updated_at[pos].item()
+
+    def set(self, person_id: int, day: date, category_id: int, score: Optional[int], comment: Optional[str], *, observation_id: Optional[int] = None, updated_at: Optional[datetime] = None) -> None:
+        pos = self._pos(person_id, day, category_id)
+        self.scores[pos] = SCORE_NULL if score is None else score
+        if comment:
+            self.comments[pos] = comment
+        else:
+            self.comments.pop(pos, None)
+        if self.observation_ids is not None:
+            self.observation_ids[pos] = observation_id or 0
+            self.updated_at[pos] = np.datetime64(updated_at, "us") if updated_at is not None else np.datetime64("NaT")
+
+    def _filled_mask(self) -> np.ndarray:
+        mask = self.scores != SCORE_NULL
+        if self.observation_ids is not None:
+            mask |= self.observation_ids != 0
+        for pos in self.comments:
+            mask[pos] = True
+        return mask
+
+    def filled(self) -> Iterable[tuple[int, date, int]]:
+        """(person_id, date, category_id) of every cell with a score, comment or stored row."""
+        mask = self._filled_mask()
+        person_ids, days, category_ids = self.persons.tolist(), self.dates.tolist(), self.categories.tolist()
+        for c, d, p in zip(*np.nonzero(mask)):
+            yield person_ids[p], days[d], category_ids[c]
+
+    def copy(self) -> "ScoreMatrix":
+        """An independent copy of the cells; the (immutable) axes are shared."""
+        other = object.__new__(ScoreMatrix)
+        other.persons, other.person_names, other.dates, other.categories = self.persons, self.person_names, self.dates, self.categories
+        other.scores = self.scores.copy()
+        other.comments = dict(self.comments)
+        other.observation_ids = None if self.observation_ids is None else self.observation_ids.copy()
+        other.updated_at = None if self.updated_at is None else self.updated_at.copy()
+        return other
+
+    # --- delta refresh ---
+
+    def _positions_of(self, rows: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return (
+            self.categories.positions(rows["category_id"].to_numpy(dtype=np.int64)),
+            self.dates.positions(rows["observed_at"].to_numpy(dtype="datetime64[D]")),
+            self.persons.positions(rows["person_id"].to_numpy(dtype=np.int64)),
+        )
+
+    def covers(self, rows: pd.DataFrame) -> bool:
+        """Whether every row's person, date and category is on the axes."""
+        return all((pos >= 0).all() for pos in self._positions_of(rows))
+
+    def is_current(self, rows: pd.DataFrame) -> np.ndarray:
+        """Per changed row: whether the matrix already holds exactly that row version."""
+        if self.observation_ids is None or not len(rows):
+            return np.zeros(len(rows), dtype=bool)
+        pos = self._positions_of(rows)
+        inside = (pos[0] >= 0) & (pos[1] >= 0) & (pos[2] >= 0)
+        current = np.zeros(len(rows), dtype=bool)
+        at = tuple(p[inside] for p in pos)
+        current[inside] = (self.observation_ids[at] == rows["observation_id"].to_numpy(dtype=np.int64)[inside]) & (
+            self.updated_at[at] == pd.to_datetime(rows["updated_at"]).to_numpy(dtype="datetime64[us]")[inside]
+        )
+        return current
+
+    def merge(self, changes: pd.DataFrame, deletions: pd.DataFrame) -> None:
+        """Apply changed rows and tombstones in place.
+
+        `changes` has person_id, observed_at, category_id, observation_id, score, comment
+        and updated_at; `deletions` has person_id, observed_at, category_id and
+        observation_id. A tombstone only clears a cell that still holds that observation,
+        so stale or repeated tombstones are harmless, and so is re-applying a change.
+        Every changed row must be `covers`-ed by the axes.
+        """
+        if self.observation_ids is None:
+            raise ValueError("merge needs a matrix that tracks observation versions")
+        if len(deletions):
+            pos = self._positions_of(deletions)
+            inside = (pos[0] >= 0) & (pos[1] >= 0) & (pos[2] >= 0)
+            pos = tuple(p[inside] for p in pos)
+            current = self.observation_ids[pos] == deletions["observation_id"].to_numpy(dtype=np.int64)[inside]
+            pos = tuple(p[current] for p in pos)
+            self.scores[pos] = SCORE_NULL
+            self.observation_ids[pos] = 0
+            self.updated_at[pos] = np.datetime64("NaT")
+            for key in zip(*(p.tolist() for p in pos)):
+                self.comments.pop(key, None)
+        if len(changes):
+            pos = self._positions_of(changes)
+            if not all((p >= 0).all() for p in pos):
+                raise KeyError("changed row outside the matrix axes")
+            self.scores[pos] = pd.array(changes["score"].to_numpy(dtype=object), dtype="Int8").to_numpy(dtype=np.int8, na_value=SCORE_NULL)
+            self.observation_ids[pos] = changes["observation_id"].to_numpy(dtype=np.int64)
+            self.updated_at[pos] = pd.to_datetime(changes["updated_at"]).to_numpy(dtype="datetime64[us]")
+            for key, comment in zip(zip(*(p.tolist() for p in pos)), changes["comment"].tolist()):
+                if isinstance(comment, str) and comment:
+                    self.comments[key] = comment
+                else:
+                    self.comments.pop(key, None)
+
+    def reindex_dates(self, dates: Iterable[date]) -> "ScoreMatrix":
+        """A copy on another date axis; cells on dates that are not in `dates` are dropped."""
+        other = ScoreMatrix(self.persons, intern_axis(dates, "datetime64[D]"), self.categories, track_versions=self.observation_ids is not None)
+        other.person_names = self.person_names
+        new_pos = other.dates.positions(self.dates.values)
+        kept = new_pos >= 0
+        other.scores[:, new_pos[kept]] = self.scores[:, kept]
+        if self.observation_ids is not None:
+            other.observation_ids[:, new_pos[kept]] = self.observation_ids[:, kept]
+            other.updated_at[:, new_pos[kept]] = self.updated_at[:, kept]
+        other.comments = {(c, int(new_pos[d]), p): text for (c, d, p), text in self.comments.items() if new_pos[d] >= 0}
+        return other
+
+    def drop_empty_dates(self) -> "ScoreMatrix":
+        """Self, or a copy without the dates on which no cell is filled anymore."""
+        used = self._filled_mask().any(axis=(0, 2))
+        if used.all():
+            return self
+        return self.reindex_dates(self.dates.values[used])
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the cells (axes are shared and not counted)."""
+        total = self.scores.nbytes + sum(sys.getsizeof(c) for c in self.comments.values()) + sys.getsizeof(self.comments)
+        if self.observation_ids is not None:
+            total += self.observation_ids.nbytes + self.updated_at.nbytes
+        return total
+
+    # --- whole categories (class overview, export) ---
+
+    def codes(self, category_id: int) -> np.ndarray:
+        """The persons x dates int8 codes of one category (a view, not a copy)."""
+        return self.scores[self.categories.position(category_id)].T
+
+    def codes_frame(self, category_id: int) -> pd.DataFrame:
+        """Codes of one category indexed by person_id with one column per date, without copying."""
+        return pd.DataFrame(self.codes(category_id), index=pd.Index(self.persons.values, name="person_id"), columns=self.dates.tolist(), copy=False)
+
+    def to_pandas(self, category_id: int) -> pd.DataFrame:
+        """One category for display: categorical "?"/"1".."4" columns, person names as index."""
+        by_date = self.scores[self.categories.position(category_id)]
+        columns = {day: pd.Categorical.from_codes(by_date[j], categories=SCORE_LABELS, validate=False) for j, day in enumerate(self.dates.tolist())}
+        return pd.DataFrame(columns, index=pd.Index(self.person_names, name="Naam"), copy=False)
+
+    def to_arrow(self, category_id: int):
+        """One category as an Arrow table of dictionary-encoded columns over the int8 codes."""
+        import pyarrow as pa
+
+        by_date = self.scores[self.categories.position(category_id)]
+        dictionary = pa.array(SCORE_LABELS)
+        columns = [pa.array(self.person_names, type=pa.string())]
+        for codes in by_date:
+            columns.append(pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes == SCORE_NULL), dictionary))
+        return pa.table(columns, names=["Naam"] + [d.isoformat() for d in self.dates.tolist()])
+
+    def flat(self, category_id: Optional[int] = None, person_id: Optional[int] = None) -> pd.DataFrame:
+        """One row per filled cell (person_id, observed_at, category_id, score, comment).
+
+        Ordered by category, person (class-list order) and date.
+        """
+        c_sel = slice(None) if category_id is None else self.categories.position(category_id)
+        p_sel = slice(None) if person_id is None else self.persons.position(person_id)
+        mask = np.zeros(self.scores.shape, dtype=bool)
+        mask[c_sel, :, p_sel] = self.scores[c_sel, :, p_sel] != SCORE_NULL
+        for c, d, p in self.comments:
+            if (category_id is None or c == c_sel) and (person_id is None or p == p_sel):
+                mask[c, d, p] = True
+        # walk (category, person, date) so each person's rows are contiguous and by date
+        c, p, d = np.nonzero(mask.transpose(0, 2, 1))
+        codes = self.scores[c, d, p]
+        return pd.DataFrame(
+            {
+                "person_id": self.persons.values[p],
+                "observed_at": self.dates.values[d].astype(object),
+                "category_id": self.categories.values[c],
+                "score": pd.arrays.IntegerArray(codes, codes == SCORE_NULL),
+                "comment": pd.Series([self.comments.get(k) for k in zip(c.tolist(), d.tolist(), p.tolist())], dtype=object),
+            }
+        )
@@ -3,27 +3,84 @@ Admin: Category management page (categoriebeheer)
 - List categories (hierarchical, visually indented)
 - Create, edit, delete categories
 - Only accessible to admins
-- Uses streamlit-elements for UI
+- The tree comes from one cached query; only the selected category gets an edit form
 """
+from html import escape
+
 import streamlit as st
 from app import db, state
-from sqlalchemy import select, insert, update, delete
-
-def fetch_categories(conn):
-    """Fetch all categories and build a parent_id -> children tree."""
-    cats = conn.execute(select(db.categories)).mappings().all()
-    tree = {}
-    for cat in cats:
-        tree.setdefault(cat["parent_id"], []).append(cat)
-    return tree
-
-def render_category_tree(tree, parent_id=None, level=0):
-    """Recursively render the category tree with indentation and parent/child structure."""
-    for cat in tree.get(parent_id, []):
-        indent = "&nbsp;&nbsp;&nbsp;" * level
-        bullet = "\u2022 " if level > 0 else ""
-        st.markdown(f"{indent}{bullet}**{cat['label']}** <span style='color:gray'>({cat['key']})</span>", unsafe_allow_html=True)
-        render_category_tree(tree, cat["id"], level + 1)
+
+# Session key of the category whose edit panel is open
+EDIT_KEY = "cat_edit_id"
+
+
+def fetch_categories(conn) -> db.CategoryTree:
+    """The whole category tree: id-keyed rows, children per parent and the display order."""
+    return db.get_category_tree(conn)
+
+
+def render_category_tree(tree: db.CategoryTree) -> None:
+    """Render the whole tree as a single markdown block (one element, however many categories)."""
+    lines = []
+    for cid, depth in tree.order:
+        cat = tree.by_id[cid]
+        indent = "&nbsp;&nbsp;&nbsp;" * depth
+        bullet = "• " if depth > 0 else ""
+        inactive = " <span style='color:gray'>(inactief)</span>" if not cat["is_active"] else ""
+        lines.append(f"{indent}{bullet}**{escape(cat['label'])}** <span style='color:gray'>({escape(cat['key'])})</span>{inactive}")
+    st.markdown("  \n".join(lines), unsafe_allow_html=True)
+
+
+def _tree_label(tree: db.CategoryTree, depths: dict):
+    """format_func for selectboxes: the label indented by its depth in the tree."""
+    def fmt(cid):
+        if cid is None:
+            return "—"
+        return "\u2003\u2003" * depths.get(cid, 0) + tree.by_id[cid]["label"]
+    return fmt
+
+
+def render_add_form(conn, tree: db.CategoryTree, fmt) -> None:
+    with st.form("add_cat_form", clear_on_submit=True):
+        label = st.text_input("Label")
+        parent_id = st.selectbox("Parent categorie", [None] + tree.parent_choices(), format_func=fmt)
+        desc = st.text_area("Beschrijving")
+        submit = st.form_submit_button("Toevoegen")
+    if submit and label:
+        gen_key = label.lower().replace(" ", "_")
+        db.create_category(conn, label=label, key=gen_key, parent_id=parent_id, description=desc, is_active=True)
+        st.success(f"Categorie '{label}' toegevoegd.")
+        st.rerun()
+
+
+def render_edit_panel(conn, tree: db.CategoryTree, cat, fmt) -> None:
+    """Edit/delete form for one category; its own subtree is not offered as parent."""
+    cid = cat["id"]
+    with st.form(f"edit_cat_form_{cid}"):
+        new_label = st.text_input("Label", value=cat["label"])
+        new_desc = st.text_area("Beschrijving", value=cat["description"] or "")
+        new_active = st.checkbox("Actief", value=cat["is_active"])
+        parent_options = [None] + tree.parent_choices(cid)
+        parent_index = parent_options.index(cat["parent_id"]) if cat["parent_id"] in parent_options else 0
+        new_parent_id = st.selectbox("Parent categorie", parent_options, index=parent_index, format_func=fmt)
+        edit = st.form_submit_button("Opslaan")
+    if edit:
+        try:
+            db.update_category(conn, cid, label=new_label, description=new_desc, is_active=new_active, parent_id=new_parent_id)
+        except ValueError:
+            st.error("Een categorie kan niet onder zichzelf of een van haar subcategorieën geplaatst worden.")
+        else:
+            st.success("Categorie bijgewerkt.")
+            st.rerun()
+    n_children = len(tree.children.get(cid, ()))
+    if n_children:
+        st.caption(f"Bij verwijderen schuiven {n_children} subcategorieën een niveau op.")
+    if st.button("Verwijderen", key=f"del_btn_{cid}"):
+        db.delete_category(conn, cid)
+        st.session_state.pop(EDIT_KEY, None)
+        st.success("Categorie verwijderd.")
+        st.rerun()
+
 
 def show():
     """Main entry point for the category management admin page."""
@@ -31,52 +88,24 @@ def show():
     if not state.is_admin(st.session_state):
         st.error("Alleen admins mogen categorieën beheren.")
         return
-    with db.get_engine().connect() as conn:
+    with db.connect() as conn:
         tree = fetch_categories(conn)
+        fmt = _tree_label(tree, dict(tree.order))
         st.subheader("Categorieën (hiërarchisch)")
-        render_category_tree(tree)
+        if tree.order:
+            render_category_tree(tree)
+        else:
+            st.info("Er zijn nog geen categorieën.")
         st.divider()
         st.subheader("Categorie toevoegen")
-        with st.form("add_cat_form", clear_on_submit=True):
-            label = st.text_input("Label")
-            parent = st.selectbox("Parent categorie", [None] + [c["label"] for c in conn.execute(select(db.categories)).mappings().all()])
-            desc = st.text_area("Beschrijving")
-            submit = st.form_submit_button("Toevoegen")
-        if submit and label:
-            gen_key = label.lower().replace(" ", "_")
-            parent_id = None
-            if parent:
-                parent_id = next((c["id"] for c in conn.execute(select(db.categories)).mappings().all() if c["label"] == parent), None)
-            conn.execute(insert(db.categories).values(label=label, key=gen_key, parent_id=parent_id, description=desc, is_active=True))
-            conn.commit()
-            st.success(f"Categorie '{label}' toegevoegd.")
-            st.rerun()
+        render_add_form(conn, tree, fmt)
         st.divider()
         st.subheader("Categorie bewerken/verwijderen")
-        cats = conn.execute(select(db.categories)).mappings().all()
-        all_labels = {c["id"]: c["label"] for c in cats}
-        for cat in cats:
-            with st.expander(f"{cat['label']} ({cat['key']})"):
-                new_label = st.text_input("Label", value=cat["label"], key=f"edit_label_{cat['id']}")
-                new_desc = st.text_area("Beschrijving", value=cat["description"] or "", key=f"edit_desc_{cat['id']}")
-                new_active = st.checkbox("Actief", value=cat["is_active"], key=f"edit_active_{cat['id']}")
-                parent_options = [None] + [lbl for cid, lbl in all_labels.items() if cid != cat["id"]]
-                new_parent_label = st.selectbox("Parent categorie", parent_options, index=parent_options.index(all_labels.get(cat["parent_id"])) if cat["parent_id"] in all_labels else 0, key=f"edit_parent_{cat['id']}")
-                edit = st.button("Opslaan", key=f"edit_btn_{cat['id']}")
-                delete_btn = st.button("Verwijderen", key=f"del_btn_{cat['id']}")
-                if edit:
-                    new_parent_id = None
-                    if new_parent_label:
-                        new_parent_id = next((cid for cid, lbl in all_labels.items() if lbl == new_parent_label), None)
-                    conn.execute(update(db.categories).where(db.categories.c.id == cat["id"]).values(label=new_label, description=new_desc, is_active=new_active, parent_id=new_parent_id))
-                    conn.commit()
-                    st.success("Categorie bijgewerkt.")
-                    st.rerun()
-                if delete_btn:
-                    conn.execute(delete(db.categories).where(db.categories.c.id == cat["id"]))
-                    conn.commit()
-                    st.success("Categorie verwijderd.")
-                    st.rerun()
+        if st.session_state.get(EDIT_KEY) not in tree.by_id:
+            st.session_state.pop(EDIT_KEY, None)
+        edit_id = st.selectbox("Categorie", [None] + [cid for cid, _ in tree.order], format_func=fmt, key=EDIT_KEY)
+        if edit_id is not None:
+            render_edit_panel(conn, tree, tree.by_id[edit_id], fmt)
 
 # For router integration
 page = {
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import os
+from typing import Callable
+
+import streamlit as st
+from app import export
+from app.db import connect, get_cached_class_pivot, list_categories, read_data_versions
+from app.state import get_auth_state
+
+
+def _display_frame(pivot):
+    """Scores as "?"/"1".."4" categoricals over the matrix codes, dd/mm dates as columns."""
+    frame = pivot.matrix.to_pandas(pivot.category_id)
+    frame.columns = [d.strftime("%d/%m") for d in pivot.dates]
+    return frame
+
+
+# Session key: exports built and waiting for their download, {button key: (temp file path, file name, data version)}
+EXPORTS_KEY = "class_exports"
+
+
+def _discard_export(key: str) -> None:
+    """Forget a built export and remove its temp file (once downloaded, or when it is outdated)."""
+    path, *_ = st.session_state.get(EXPORTS_KEY, {}).pop(key, (None,))
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def _export_button(label: str, key: str, filename: str, version, build: Callable[[], str]) -> None:
+    """Build the export into a temp file once, on click, and offer it until it is downloaded.
+
+    `version` is the data version the export reflects; once it changes the file is
+    outdated and the button builds a new one. The workbook is written with flat memory,
+    but the download button hands the finished file to Streamlit, which keeps it in
+    memory while the button is shown.
+    """
+    exports = st.session_state.setdefault(EXPORTS_KEY, {})
+    ready = exports.get(key)
+    if ready is not None and (ready[1:] != (filename, version) or not os.path.exists(ready[0])):
+        # built for another selection or older data (or the file was swept): build again on request
+        _discard_export(key)
+        ready = None
+    if ready is None:
+        if not st.button(label, key=key):
+            return
+        with st.spinner("Export wordt aangemaakt…"):
+            ready = exports[key] = (build(), filename, version)
+    path, name, _ = ready
+    with open(path, "rb") as fh:
+        data = fh.read()
+    st.download_button(
+        f"Download {name}", data=data, file_name=name, mime=export.XLSX_MIME, key=f"{key}_download", on_click=_discard_export, args=(key,)
+    )
+
+
+def render():
+    auth_state = get_auth_state(st.session_state)
+    if not auth_state.is_authenticated:
+        st.warning("Je moet ingelogd zijn om observaties te bekijken.")
+        return
+
+    st.title("Klasoverzicht")
+
+    with connect() as conn:
+        versions = read_data_versions(conn)
+    if auth_state.is_admin:
+        with st.expander("Alle gegevens exporteren"):
+            st.caption("Observaties, personen, categorieën, schooljaren en gebruikers, één tabblad per tabel.")
+            _export_button(
+                "Alles exporteren (XLSX)", "all_export", export.export_filename("alles"), versions, lambda: export.export_to_tempfile(export.export_all)
+            )
+
+    with connect() as conn:
+        cats = list_categories(conn)
+        if not cats:
+            st.info("Er zijn nog geen categorieën.")
+            return
+        labels = {c["id"]: c["label"] for c in cats}
+        category_id = st.selectbox("Categorie", options=list(labels), format_func=labels.get, key="class_cat")
+
+        pivot = get_cached_class_pivot(conn, category_id=category_id)
+
+    if not pivot.persons:
+        st.info("Geen klaslijst gevonden voor het meest recente schooljaar.")
+        return
+    if not pivot.dates:
+        st.info("Nog geen observaties voor deze categorie.")
+        return
+
+    st.dataframe(_display_frame(pivot), use_container_width=True)
+    st.caption(f"{len(pivot.flat)} observaties op {len(pivot.dates)} dagen")
+    _export_button(
+        "Export (XLSX)",
+        "class_export",
+        export.export_filename(f"klas-{category_id}"),
+        (versions.get("persons", 0), versions.get(f"observations:{pivot.school_year_id}", 0)),
+        lambda: export.export_to_tempfile(export.export_class, category_id=category_id, school_year_id=pivot.school_year_id),
+    )
+
+    names = dict(pivot.persons)
+    person_id = st.selectbox("Details voor", options=[None] + list(names), format_func=lambda x: names.get(x, "—"), key="class_detail")
+    if person_id is not None:
+        st.dataframe(pivot.detail(person_id), hide_index=True, use_container_width=True)
+        _export_button(
+            "Export persoon (XLSX)",
+            "person_export",
+            export.export_filename(f"persoon-{person_id}"),
+            versions,
+            lambda: export.export_to_tempfile(export.export_person, person_id=person_id),
+        )
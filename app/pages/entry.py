@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from datetime import date
+
+import streamlit as st
+from app.db import (
+    SCORE_UNKNOWN,
+    GridConflict,
+    ObservationInput,
+    connect,
+    get_cached_entry_grid,
+    list_categories,
+    save_grid_changes,
+)
+from app.state import get_auth_state
+
+# Session keys: the snapshot the current edits are diffed against, and what it was loaded for
+SNAPSHOT_KEY = "entry_snapshot"
+SNAPSHOT_SIG_KEY = "entry_snapshot_sig"
+# Warning shown after the page reloaded the grid because of a conflicting save
+CONFLICT_NOTICE_KEY = "entry_conflict_notice"
+
+SCORE_LABELS = {None: "", SCORE_UNKNOWN: "?", 1: "1", 2: "2", 3: "3", 4: "4"}
+LABEL_SCORES = {v: k for k, v in SCORE_LABELS.items()}
+
+
+def _editor_rows(grid, snapshot, category_id: int) -> list[dict]:
+    rows = []
+    for person_id, full_name in grid.persons:
+        cell = snapshot.get(person_id, category_id)
+        rows.append({"id": person_id, "Naam": full_name, "Score": SCORE_LABELS.get(cell.score, ""), "Opmerking": cell.comment or ""})
+    return rows
+
+
+def _edits_from_editor(rows, category_id: int, observed_at: date) -> list[ObservationInput]:
+    return [
+        ObservationInput(row["id"], category_id, observed_at, score=LABEL_SCORES.get(row.get("Score") or ""), comment=row.get("Opmerking"))
+        for row in rows
+    ]
+
+
+def render():
+    auth_state = get_auth_state(st.session_state)
+    if not auth_state.is_authenticated:
+        st.warning("Je moet ingelogd zijn om observaties in te voeren.")
+        return
+
+    st.title("Observaties invoeren")
+    notice = st.session_state.pop(CONFLICT_NOTICE_KEY, None)
+    if notice:
+        st.warning(notice)
+
+    with connect() as conn:
+        cats = [c for c in list_categories(conn) if c["is_active"]]
+        if not cats:
+            st.info("Er zijn nog geen categorieën.")
+            return
+        labels = {c["id"]: c["label"] for c in cats}
+
+        col1, col2 = st.columns(2)
+        with col1:
+            category_id = st.selectbox("Categorie", options=list(labels), format_func=labels.get, key="entry_cat")
+        with col2:
+            observed_at = st.date_input("Datum", value=date.today(), key="entry_date")
+
+        with st.sidebar.expander("Extra categorieën", expanded=False):
+            extra = [cid for cid in labels if cid != category_id and st.checkbox(labels[cid], key=f"entry_extra_{cid}")]
+        category_ids = [category_id] + extra
+
+        # One query (or none, when cached) for the class list and all visible cells
+        grid = get_cached_entry_grid(conn, observed_at=observed_at, category_ids=category_ids)
+        if grid.school_year_id is None or not grid.persons:
+            st.info("Geen klaslijst gevonden voor het meest recente schooljaar.")
+            return
+
+        sig = (grid.school_year_id, observed_at, grid.category_ids)
+        if st.session_state.get(SNAPSHOT_SIG_KEY) != sig:
+            st.session_state[SNAPSHOT_SIG_KEY] = sig
+            st.session_state[SNAPSHOT_KEY] = grid.snapshot()
+        snapshot = st.session_state[SNAPSHOT_KEY]
+
+        edits = []
+        for cid, column in zip(category_ids, st.columns(len(category_ids))):
+            with column:
+                st.subheader(labels[cid])
+                edited = st.data_editor(
+                    _editor_rows(grid, snapshot, cid),
+                    column_config={
+                        "id": None,
+                        "Naam": st.column_config.TextColumn(disabled=True),
+                        "Score": st.column_config.SelectboxColumn(options=list(LABEL_SCORES)),
+                        "Opmerking": st.column_config.TextColumn(),
+                    },
+                    hide_index=True,
+                    use_container_width=True,
+                    key=f"entry_editor_{cid}_{observed_at.isoformat()}",
+                )
+                edits.extend(_edits_from_editor(edited, cid, observed_at))
+
+        if st.button("Opslaan", type="primary", key="entry_save"):
+            # all categories are saved together, or nothing is when one cell conflicts
+            try:
+                result = save_grid_changes(conn, snapshot, edits)
+            except GridConflict as conflict:
+                names = dict(grid.persons)
+                who = ", ".join(sorted({names.get(pid, str(pid)) for pid, _ in conflict.conflicts}))
+                st.session_state[CONFLICT_NOTICE_KEY] = (
+                    f"Niets opgeslagen: iemand anders wijzigde intussen de observaties van {who}. "
+                    "De tabel is herladen met de huidige waarden; voer je wijzigingen opnieuw in."
+                )
+                # reload: a fresh snapshot, and editors without the rejected edits
+                st.session_state.pop(SNAPSHOT_SIG_KEY, None)
+                for cid in category_ids:
+                    st.session_state.pop(f"entry_editor_{cid}_{observed_at.isoformat()}", None)
+                st.rerun()
+            else:
+                result.apply(snapshot)
+                st.success(f"Opgeslagen: {result.inserted} nieuw, {result.updated} gewijzigd, {result.deleted} gewist.")
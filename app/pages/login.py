@@ -1,13 +1,24 @@
 from __future__ import annotations
 
 import streamlit as st
-import base64
-from datetime import datetime, timedelta, timezone
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 from app.state import get_auth_state, logout, set_next_route, is_dev_mode
 from app.ui_elements import render_material_card, redact_db_url
 from app import db, auth
-from app.auth import generate_url_token, check_url_token, get_url_tokens
+from app.auth import generate_url_token
+from app.hashing import HashingBusy, hash_metrics
+from app.maintenance import login_token_counts, maintenance_metrics
+
+
+def _client_key() -> str | None:
+    """Who is logging in, for the per-client login limit: the IP address, else the browser session."""
+    # st.context.ip_address only exists in recent Streamlit releases
+    ip = getattr(st.context, "ip_address", None)
+    if ip:
+        return f"ip:{ip}"
+    ctx = get_script_run_ctx()
+    return f"session:{ctx.session_id}" if ctx else None
 
 
 def render() -> None:
@@ -22,18 +33,26 @@ def render() -> None:
 
     st.title("Aanmelden")
 
-    # Ensure DB is initialized and initial admin exists
-    db.init_db()
+    # Ensure DB is initialized and initial admin exists (no-op after the first run in this process)
+    db.ensure_db_initialized()
 
     # Diagnostics (dev-only)
     if is_dev_mode():
         with st.expander("Diagnose", expanded=False):
             st.caption("Welke database gebruikt deze run?")
             st.code(redact_db_url(db.DB_URL))
+            st.caption("Connection pool")
+            st.json(db.get_pool_metrics())
+            st.caption("Wachtwoord-hashing")
+            st.json(hash_metrics())
+            st.caption("Login-tokens opruimen")
+            with db.connect() as conn:
+                st.json({**login_token_counts(conn), **maintenance_metrics.snapshot()})
+            st.caption("Aanmeldlimiet (per e-mail / per client)")
+            st.json({"email": auth.EMAIL_LIMITER.stats(), "client": auth.CLIENT_LIMITER.stats() if auth.CLIENT_LIMITER else "uit"})
             try:
                 from sqlalchemy import select
-                eng = db.get_engine()
-                with eng.connect() as conn:
+                with db.connect() as conn:
                     admin_row = conn.execute(select(db.users).where(db.users.c.email == "admin")).mappings().first()
                 if admin_row:
                     st.caption("Admin account toestand (uit DB)")
@@ -50,52 +69,26 @@ def render() -> None:
                 st.caption("Diagnose info niet beschikbaar")
                 st.write(str(e))
 
-    # Check for token in URL
+    # Check for token in URL (signature, expiry and revocation; no token table lookup)
     query_params = st.query_params
     token = query_params.get("token")
     if just_logged_out:
         token = None  # Ignore token for this rerun
-    st.write(f"[DEBUG] Token uit URL: {token}")
-    # Workaround: if token is present in query params but not in session, regenerate it for the current user
-    if token and token not in get_url_tokens() and auth_state.is_authenticated:
-        try:
-            decoded_token = base64.urlsafe_b64decode(token.encode()).decode()
-        except Exception:
-            decoded_token = token
-        # Regenerate and store token for current user
-        get_url_tokens()[decoded_token] = {"user_id": auth_state.user_id, "expires": datetime.now(timezone.utc) + timedelta(hours=1)}
     if token:
-        try:
-            decoded_token = base64.urlsafe_b64decode(token.encode()).decode()
-        except Exception:
-            decoded_token = token
-        st.write(f"[DEBUG] Decoded token: {decoded_token}")
-        st.write(f"[DEBUG] URL_TOKENS: {get_url_tokens()}")
-        user_id = check_url_token(decoded_token)
-        st.write(f"[DEBUG] user_id from token: {user_id}")
-        st.write(f"[DEBUG] Now (UTC): {datetime.now(timezone.utc)}")
-        if decoded_token in get_url_tokens():
-            st.write(f"[DEBUG] Token expiry: {get_url_tokens()[decoded_token]['expires']}")
-        if user_id:
-            # Fetch user info from DB
-            from app.db import users
-            eng = db.get_engine()
-            with eng.connect() as conn:
-                row = conn.execute(users.select().where(users.c.id == user_id)).mappings().first()
-            if row:
-                auth_state.is_authenticated = True
-                auth_state.user_id = row["id"]
-                auth_state.email = row["email"]
-                auth_state.full_name = row.get("full_name")
-                auth_state.is_admin = bool(row.get("is_admin"))
-                auth_state.must_change_password = bool(row.get("must_change_password"))
-                st.success(f"Je bent automatisch ingelogd via token. Geldig tot: {get_url_tokens().get(decoded_token, {}).get('expires', 'onbekend')}")
-                set_next_route(st.session_state, "Beveiligd")
-                st.rerun()
-            else:
-                st.error("Token is geldig, maar gebruiker bestaat niet meer.")
+        user = auth.user_from_url_token(token)
+        if user:
+            auth_state.is_authenticated = True
+            auth_state.user_id = user["id"]
+            auth_state.email = user["email"]
+            auth_state.full_name = user.get("full_name")
+            auth_state.is_admin = bool(user.get("is_admin"))
+            auth_state.must_change_password = bool(user.get("must_change_password"))
+            expires = user["token_expires_at"]
+            st.success(f"Je bent automatisch ingelogd via token. Geldig tot: {expires.astimezone().strftime('%H:%M') if expires else 'onbekend'}")
+            set_next_route(st.session_state, "Beveiligd")
+            st.rerun()
         else:
-            st.error("Token is ongeldig of verlopen.")
+            st.error("Token is ongeldig, verlopen of ingetrokken.")
 
     # If already authenticated and everything is OK, offer logout and stop.
     if auth_state.is_authenticated and not auth_state.must_change_password:
@@ -121,9 +114,13 @@ def render() -> None:
         submit = st.form_submit_button("Aanmelden")
 
     if submit:
+        client = _client_key()
         try:
-            user = auth.authenticate(email, password)
-        except Exception:
+            user = auth.authenticate(email, password, client=client)
+        except HashingBusy:
+            st.error("Het is momenteel erg druk. Probeer over enkele seconden opnieuw aan te melden.")
+            return
+        except auth.AuthLocked:
             st.error("Te veel mislukte pogingen. Deze account is tijdelijk geblokkeerd.")
             st.info("Admin herstel (zonder e-mail): reset je wachtwoord via de CLI: `python scripts/create_admin.py --email <email> --reset`")
             return
@@ -143,9 +140,7 @@ def render() -> None:
             st.info("Je logt in met een tijdelijk wachtwoord. Kies nu een nieuw wachtwoord.")
         else:
             # Genereer een token-URL en zet deze direct in de URL, rerun de app
-            raw_token = str(generate_url_token(user["id"]))
-            token = base64.urlsafe_b64encode(raw_token.encode()).decode()
-            st.query_params = {"token": token}
+            st.query_params = {"token": generate_url_token(user["id"], user)}
             set_next_route(st.session_state, "Beveiligd")
             st.rerun()
 
@@ -159,8 +154,8 @@ def render() -> None:
             if not new_pw or new_pw != new_pw2:
                 st.error("Wachtwoorden komen niet overeen of zijn leeg")
             else:
-                auth.change_password(auth_state.user_id, new_pw)
-                refreshed = auth.authenticate(auth_state.email or "", new_pw)
+                # change_password returns the updated user; no second (slow) password check needed
+                refreshed = auth.change_password(auth_state.user_id, new_pw)
                 if refreshed:
                     auth_state.is_authenticated = True
                     auth_state.user_id = refreshed["id"]
@@ -170,7 +165,7 @@ def render() -> None:
                     auth_state.must_change_password = bool(refreshed.get("must_change_password"))
                 else:
                     logout(st.session_state)
-                    st.error("Wachtwoord aangepast, maar her-authenticatie faalde. Probeer opnieuw aan te melden.")
+                    st.error("Wachtwoord aangepast, maar de gebruiker werd niet meer gevonden. Probeer opnieuw aan te melden.")
                     st.rerun()
                     return
                 set_next_route(st.session_state, "Beveiligd")
@@ -1,17 +1,57 @@
 from __future__ import annotations
 
+import math
+
 import streamlit as st
-from app.db import get_engine, get_observations, categories
-from app.state import get_auth_state
+from app.db import (
+    connect,
+    get_cached_observation_count,
+    get_cached_observations_page,
+    get_cached_ranked_observations,
+    list_categories,
+    observation_cache,
+    ObservationFilter,
+)
+from app.state import get_auth_state, is_dev_mode
+from dataclasses import replace
 from datetime import date
 
+PAGE_SIZE = 50
+
+# Session keys for keyset pagination
+CURSOR_KEY = "obs_cursor"
+PAGE_NO_KEY = "obs_page_no"
+FILTER_SIG_KEY = "obs_filter_sig"
+
 # Helper to fetch category options
 
 def get_category_options(conn):
-    cats = conn.execute(categories.select().order_by(categories.c.label)).mappings().all()
+    cats = list_categories(conn)
     return [(c["id"], c["label"]) for c in cats]
 
 
+def _reset_pagination_on_filter_change(filter_sig: ObservationFilter) -> None:
+    """Start again from the first page whenever a filter changes."""
+    if st.session_state.get(FILTER_SIG_KEY) != filter_sig:
+        st.session_state[FILTER_SIG_KEY] = filter_sig
+        st.session_state[CURSOR_KEY] = None
+        st.session_state[PAGE_NO_KEY] = 1
+
+
+def _render_ranked(conn, spec: ObservationFilter) -> None:
+    """The best matches of a word search, most relevant first (one page, no paging)."""
+    rows = get_cached_ranked_observations(conn, spec)
+    if not rows:
+        st.info("Geen observaties gevonden.")
+        return
+    st.dataframe([{k: v for k, v in o.items() if k != "rank"} for o in rows], use_container_width=True)
+    count = get_cached_observation_count(conn, spec)
+    if count.exact and count.value <= len(rows):
+        st.caption(f"{count.label()} observaties gevonden, meest relevante eerst")
+    else:
+        st.caption(f"{count.label()} observaties gevonden — de {len(rows)} beste getoond. Sorteer op datum om alle treffers te doorbladeren.")
+
+
 def render():
     auth_state = get_auth_state(st.session_state)
     if not auth_state.is_authenticated:
@@ -19,9 +59,9 @@ def render():
         return
 
     st.title("Observaties")
-    st.caption("Filter en bekijk observaties. Resultaten zijn beperkt tot 50 per pagina.")
+    st.caption(f"Filter en bekijk observaties. Resultaten zijn beperkt tot {PAGE_SIZE} per pagina.")
 
-    with get_engine().connect() as conn:
+    with connect() as conn:
         # Filter UI
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -30,16 +70,51 @@ def render():
         with col2:
             cat_options = get_category_options(conn)
             category_id = st.selectbox("Categorie", options=[None] + [c[0] for c in cat_options], format_func=lambda x: dict(cat_options).get(x, "Alle categorieën"), key="obs_cat")
+            with_subcategories = st.checkbox("Inclusief subcategorieën", value=True, key="obs_cat_sub", disabled=category_id is None)
         with col3:
             text = st.text_input("Zoek in commentaar", value="", key="obs_text")
-        # Pagination
-        page = st.number_input("Pagina", min_value=1, value=1, step=1, key="obs_page")
-        offset = (page - 1) * 50
-        # Query
-        obs = get_observations(conn, start_date=start_date, end_date=end_date, category_id=category_id, text=text, limit=50, offset=offset)
-        if not obs:
+            literal = st.checkbox("Letterlijke tekst (trager)", value=False, key="obs_text_literal", help="Zoek op een stukje tekst in plaats van op (het begin van) woorden.")
+            # word search can rank its matches; a literal search is only browsed by date
+            by_relevance = bool(text.strip()) and not literal and st.radio("Sorteer op", ["Relevantie", "Datum"], horizontal=True, key="obs_sort") == "Relevantie"
+
+        # Pagination (keyset: the cursor marks where the current page starts)
+        spec = ObservationFilter(start_date=start_date, end_date=end_date, category_id=category_id, include_descendants=with_subcategories, text=text, limit=PAGE_SIZE, search_mode="substring" if literal else "fts")
+        _reset_pagination_on_filter_change(spec)
+        spec = replace(spec, cursor=st.session_state.get(CURSOR_KEY))
+        page_no = st.session_state.get(PAGE_NO_KEY, 1)
+
+        if by_relevance:
+            _render_ranked(conn, spec)
+            return
+
+        # Query (repeated views of the same filters/page come from the result cache)
+        page = get_cached_observations_page(conn, spec)
+
+        # Diagnostics (dev-only)
+        if is_dev_mode():
+            with st.expander("Diagnose", expanded=False):
+                st.caption("Resultatencache observaties")
+                st.json(observation_cache.stats())
+        if not page.rows:
             st.info("Geen observaties gevonden.")
             return
         # Display table
-        st.dataframe([{k: v for k, v in o.items()} for o in obs], use_container_width=True)
-        st.caption(f"Totaal getoond: {len(obs)} observaties (pagina {page})")
+        st.dataframe([{k: v for k, v in o.items()} for o in page.rows], use_container_width=True)
+        count = get_cached_observation_count(conn, spec)
+        if count.exact:
+            pages = f"pagina {page_no} van {max(1, math.ceil(count.value / PAGE_SIZE))}"
+        else:
+            pages = f"pagina {page_no}"
+        st.caption(f"{count.label()} observaties gevonden — {len(page.rows)} getoond ({pages})")
+
+        nav_prev, nav_next = st.columns(2)
+        with nav_prev:
+            if st.button("Vorige", disabled=page.prev_cursor is None, use_container_width=True, key="obs_prev"):
+                st.session_state[CURSOR_KEY] = page.prev_cursor if page_no > 2 else None
+                st.session_state[PAGE_NO_KEY] = max(1, page_no - 1)
+                st.rerun()
+        with nav_next:
+            if st.button("Volgende", disabled=page.next_cursor is None, use_container_width=True, key="obs_next"):
+                st.session_state[CURSOR_KEY] = page.next_cursor
+                st.session_state[PAGE_NO_KEY] = page_no + 1
+                st.rerun()
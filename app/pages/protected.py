@@ -23,12 +23,13 @@ def render() -> None:
         with st.expander("Diagnose", expanded=False):
             st.caption("Welke database gebruikt deze run?")
             st.code(redact_db_url(db.DB_URL))
+            st.caption("Connection pool")
+            st.json(db.get_pool_metrics())
 
             try:
                 from sqlalchemy import select
 
-                eng = db.get_engine()
-                with eng.connect() as conn:
+                with db.connect() as conn:
                     row = conn.execute(select(db.users).where(db.users.c.email == auth.email)).mappings().first() if auth.email else None
                 if row:
                     st.caption("Huidige gebruiker (uit DB)")
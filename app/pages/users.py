@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import streamlit as st
 from app.state import get_auth_state
-from app.db import get_engine, users
-from app.auth import create_user, reset_password
+from app.db import connect, list_school_years, list_users_page, set_users_admin
+from app import importer
+from app.auth import create_user, reset_passwords
 from html import escape
 from app.ui_elements import elements_available
 
@@ -72,6 +73,83 @@ def _render_copyable_password(pw: str, key: str) -> None:
     st.components.v1.html(html, height=40)
 
 
+PAGE_SIZE = 50
+# Session keys: the search the pages belong to, and the cursor each visited page starts after
+SEARCH_KEY = "users_search_applied"
+CURSORS_KEY = "users_cursors"
+
+
+def _list_row(r) -> dict:
+    last = r["last_login_at"].strftime("%d/%m/%Y %H:%M") if r["last_login_at"] else ""
+    return {"id": r["id"], "E-mail": r["email"], "Naam": r["full_name"], "Admin": bool(r["is_admin"]), "Actief": bool(r["is_active"]), "Laatste login": last}
+
+
+def _render_bulk_actions(selected: list[int], own_user_id, emails: dict) -> None:
+    """Admin on/off and password reset for all selected users, each in one transaction."""
+    cols = st.columns(3)
+    if cols[0].button("Admin aan", disabled=not selected, key="users_admin_on"):
+        with connect() as conn:
+            changed = set_users_admin(conn, selected, True)
+        st.toast(f"{changed} gebruiker(s) zijn nu admin.")
+        st.rerun()
+    if cols[1].button("Admin uit", disabled=not selected, key="users_admin_off"):
+        # an admin cannot lock themselves out
+        others = [uid for uid in selected if uid != own_user_id]
+        with connect() as conn:
+            changed = set_users_admin(conn, others, False)
+        if len(others) < len(selected):
+            st.toast("Je eigen adminrechten kan je hier niet intrekken.")
+        st.toast(f"{changed} gebruiker(s) zijn geen admin meer.")
+        st.rerun()
+    if cols[2].button("Wachtwoord resetten", disabled=not selected, key="users_reset"):
+        temps = reset_passwords(selected)
+        st.info("Nieuwe tijdelijke wachtwoorden (kopieer nu, ze worden niet meer getoond):")
+        if len(temps) == 1:
+            ((uid, temp),) = temps.items()
+            _render_copyable_password(temp, key=f"reset_{uid}")
+        else:
+            st.dataframe([{"E-mail": emails.get(uid, uid), "Tijdelijk wachtwoord": temp} for uid, temp in temps.items()], hide_index=True)
+
+
+def _render_import(created_by_id) -> None:
+    """Upload a CSV/XLSX of users or of a class list; checked completely before anything is written."""
+    kind = st.radio("Wat importeer je?", ["Gebruikers", "Klaslijst"], horizontal=True, key="import_kind")
+    school_year_id = None
+    if kind == "Klaslijst":
+        with connect() as conn:
+            years = {sy["id"]: sy["name"] for sy in list_school_years(conn)}
+        if not years:
+            st.info("Maak eerst een schooljaar aan.")
+            return
+        school_year_id = st.selectbox("Schooljaar", options=list(years), format_func=years.get, key="import_school_year")
+        st.caption("Kolommen: voornaam, achternaam en optioneel extern id.")
+    else:
+        st.caption("Kolommen: e-mail, naam en optioneel admin (ja/nee).")
+    upload = st.file_uploader("Bestand (CSV of XLSX)", type=["csv", "xlsx"], key="import_file")
+    dry_run = st.checkbox("Enkel controleren", value=False, key="import_dry_run")
+    if upload is None or not st.button("Importeren", key="import_go"):
+        return
+
+    rows, errors = importer.read_rows(upload.getvalue(), upload.name)
+    with st.spinner(f"{len(rows)} rijen verwerken..."):
+        if errors:
+            report = importer.ImportReport(errors=errors)
+        elif kind == "Klaslijst":
+            report = importer.import_persons(rows, school_year_id=school_year_id, dry_run=dry_run)
+        else:
+            report = importer.import_users(rows, created_by_id=created_by_id, dry_run=dry_run)
+    if not report.ok:
+        st.error(f"{len(report.errors)} fout(en) gevonden; er werd niets geïmporteerd.")
+        st.dataframe([{"Rij": e.row, "Probleem": e.message} for e in report.errors], hide_index=True)
+    elif dry_run:
+        st.success(f"{len(rows)} rijen gecontroleerd, geen fouten.")
+    else:
+        st.success(f"{report.inserted} rijen geïmporteerd.")
+        if report.passwords:
+            st.info("Download nu de tijdelijke wachtwoorden; ze worden niet meer getoond.")
+            st.download_button("Wachtwoorden downloaden (CSV)", importer.passwords_csv(report), file_name="tijdelijke-wachtwoorden.csv", mime="text/csv")
+
+
 def render() -> None:
     auth_state = get_auth_state(st.session_state)
     if not auth_state.is_authenticated or not auth_state.is_admin:
@@ -100,19 +178,42 @@ def render() -> None:
                     st.info("Tijdelijk wachtwoord (kopieer en geef door aan de gebruiker):")
                     _render_copyable_password(u["temp_password"], key=f"new_{u['id']}")
 
+    with st.expander("Importeren uit CSV/XLSX"):
+        _render_import(auth_state.user_id)
+
     st.write("---")
     st.header("Bestaande gebruikers")
-    eng = get_engine()
-    with eng.connect() as conn:
-        rows = conn.execute(users.select().order_by(users.c.id)).mappings().all()
-        for r in rows:
-            cols = st.columns([3, 1, 1])
-            cols[0].text(f"{r['email']} — {r['full_name']}")
-            if cols[1].button("Reset\npw", key=f"reset_{r['id']}"):
-                temp = reset_password(r["id"])
-                st.info("Nieuw tijdelijk wachtwoord (kopieer nu):")
-                _render_copyable_password(temp, key=f"reset_{r['id']}")
-            if cols[2].button("Admin\naan/uit", key=f"toggle_{r['id']}"):
-                conn.execute(users.update().where(users.c.id == r["id"]).values(is_admin=not r["is_admin"]))
-                conn.commit()
-                st.rerun()
+    search = st.text_input("Zoek op e-mail of naam (begin)", key="users_search")
+    if st.session_state.get(SEARCH_KEY) != search:
+        # new search: back to the first page
+        st.session_state[SEARCH_KEY] = search
+        st.session_state[CURSORS_KEY] = [None]
+    cursors = st.session_state.setdefault(CURSORS_KEY, [None])
+
+    with connect() as conn:
+        page = list_users_page(conn, search=search, after=cursors[-1], limit=PAGE_SIZE)
+    if not page.rows:
+        st.info("Geen gebruikers gevonden.")
+    else:
+        edited = st.data_editor(
+            [{"Selecteer": False, **_list_row(r)} for r in page.rows],
+            column_config={"id": None, "Selecteer": st.column_config.CheckboxColumn()},
+            disabled=["E-mail", "Naam", "Admin", "Actief", "Laatste login"],
+            hide_index=True,
+            use_container_width=True,
+            key=f"users_editor_{len(cursors)}_{search}",
+        )
+        selected = [row["id"] for row in edited if row["Selecteer"]]
+        _render_bulk_actions(selected, auth_state.user_id, {r["id"]: r["email"] for r in page.rows})
+
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if st.button("Vorige", disabled=len(cursors) == 1, key="users_prev"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Volgende", disabled=page.next_cursor is None, key="users_next"):
+            cursors.append(page.next_cursor)
+            st.rerun()
+    with col3:
+        st.caption(f"Pagina {len(cursors)}")
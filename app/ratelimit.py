@@ -0,0 +1,163 @@
+"""Login rate limiting with a sliding window.
+
+Every limited key (an e-mail address, or an IP address/browser session) keeps a few
+numbers: the start of the current window, the failures in it and in the window before,
+and a lock deadline. The failures in the last `window_seconds` are estimated as
+`count + previous * (1 - elapsed / window)`. This is the sliding-window counter: O(1)
+time and memory per key, with no list of timestamps. A key reaching `max_attempts`
+is locked for `lock_seconds`.
+
+Two backends (RATE_LIMIT_BACKEND):
+- `memory` (default): a bounded LRU dict per process (RATE_LIMIT_MAX_KEYS). Under
+  credential stuffing the least recently used keys are evicted instead of growing.
+- `database`: the `login_attempts` table. It is shared by all server processes; on
+  SQLite it works within one machine. Stale rows are removed by app.maintenance.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import func, select
+
+from app import db
+
+DEFAULT_MAX_KEYS = 10_000
+
+
+@dataclass(frozen=True)
+class Limit:
+    max_attempts: int
+    window_seconds: float
+    lock_seconds: float
+
+
+def _register_failure(entry: dict, now: float, limit: Limit) -> None:
+    """Count one failure in `entry` (window_start, count, previous, locked_until) at `now`."""
+    if entry["locked_until"]:
+        if now < entry["locked_until"]:
+            return
+        # lock served: start over
+        entry.update(window_start=now, count=0, previous=0, locked_until=0)
+    elapsed = now - entry["window_start"]
+    if elapsed >= 2 * limit.window_seconds:
+        entry.update(window_start=now, count=0, previous=0)
+    elif elapsed >= limit.window_seconds:
+        entry.update(window_start=entry["window_start"] + limit.window_seconds, previous=entry["count"], count=0)
+    entry["count"] += 1
+    weight = 1 - (now - entry["window_start"]) / limit.window_seconds
+    if entry["count"] + entry["previous"] * weight >= limit.max_attempts:
+        entry["locked_until"] = now + limit.lock_seconds
+
+
+class MemoryRateLimiter:
+    """Per-process limiter holding at most `max_keys` keys, least recently used evicted first."""
+
+    def __init__(self, limit: Limit, max_keys: int = DEFAULT_MAX_KEYS) -> None:
+        self.limit = limit
+        self.max_keys = max_keys
+        self.evictions = 0
+        # key -> {"window_start", "count", "previous", "locked_until"}
+        self.entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_locked(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or not entry["locked_until"]:
+                return False
+            if now < entry["locked_until"]:
+                return True
+            # expired lock -> forget the key
+            del self.entries[key]
+            return False
+
+    def record_failure(self, key: str, now: Optional[float] = None) -> bool:
+        """Count a failed attempt; returns whether the key is locked now."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {"window_start": now, "count": 0, "previous": 0, "locked_until": 0}
+                if len(self.entries) > self.max_keys:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self.entries.move_to_end(key)
+            _register_failure(entry, now, self.limit)
+            return now < entry["locked_until"]
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", "keys": len(self.entries), "max_keys": self.max_keys, "evictions": self.evictions}
+
+
+class DatabaseRateLimiter:
+    """Limiter state in `login_attempts`, shared by every process using the database.
+
+    Keys are stored as "<scope>:<key>", so several limiters share the table. A failure is
+    one upsert plus a locked read and an update of a single row, in a short transaction
+    of its own: the row lock is released right away, also inside a request scope.
+    """
+
+    def __init__(self, limit: Limit, scope: str) -> None:
+        self.limit = limit
+        self.scope = scope
+
+    def _key(self, key: str) -> str:
+        return f"{self.scope}:{key}"
+
+    def is_locked(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        la = db.login_attempts
+        with db.connect() as conn:
+            locked_until = conn.execute(select(la.c.locked_until).where(la.c.key == self._key(key))).scalar()
+        return bool(locked_until) and now < locked_until
+
+    def record_failure(self, key: str, now: Optional[float] = None) -> bool:
+        """Count a failed attempt; returns whether the key is locked now."""
+        now = time.time() if now is None else now
+        la = db.login_attempts
+        key = self._key(key)
+        with db.get_engine().begin() as conn:
+            insert_ = db._dialect_insert(conn)
+            conn.execute(
+                insert_(la)
+                .values(key=key, window_start=now, count=0, previous=0, locked_until=0)
+                .on_conflict_do_nothing(index_elements=[la.c.key])
+            )
+            # the row lock serialises concurrent failures of one key (SQLite locks the whole database)
+            row = conn.execute(select(la).where(la.c.key == key).with_for_update()).mappings().one()
+            entry = {name: row[name] for name in ("window_start", "count", "previous", "locked_until")}
+            _register_failure(entry, now, self.limit)
+            conn.execute(la.update().where(la.c.key == key).values(**entry))
+        return now < entry["locked_until"]
+
+    def clear(self, key: str) -> None:
+        la = db.login_attempts
+        with db.get_engine().begin() as conn:
+            conn.execute(la.delete().where(la.c.key == self._key(key)))
+
+    def stats(self) -> dict:
+        with db.connect() as conn:
+            keys = conn.execute(select(func.count()).select_from(db.login_attempts)).scalar()
+        return {"backend": "database", "keys": keys}
+
+
+def create_limiter(scope: str, limit: Limit):
+    """A limiter for `scope` on the backend chosen by RATE_LIMIT_BACKEND (memory or database)."""
+    backend = (db._get_setting("RATE_LIMIT_BACKEND") or "memory").strip().lower()
+    if backend == "database":
+        return DatabaseRateLimiter(limit, scope)
+    if backend != "memory":
+        raise ValueError(f"unknown RATE_LIMIT_BACKEND {backend!r} (expected memory or database)")
+    return MemoryRateLimiter(limit, int(db._get_setting("RATE_LIMIT_MAX_KEYS") or DEFAULT_MAX_KEYS))
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import streamlit as st
 
-from app.pages import home, login, protected, users, categories, observations
+from app.pages import home, login, protected, users, categories, observations, entry, class_overview
 from app.state import get_auth_state, pop_next_route
 
 
@@ -44,6 +44,8 @@ def render_sidebar() -> str:
     elif auth.is_authenticated:
         routes.append("Beveiligd")
         routes.append("Observaties")
+        routes.append("Observaties invoeren")
+        routes.append("Klasoverzicht")
         if auth.is_admin:
             routes.append("Admin: Gebruikers")
             routes.append("Admin: Categorieën")
@@ -123,5 +125,21 @@ def render_route(route: str) -> None:
         observations.render()
         return
 
+    if route == "Observaties invoeren":
+        if not auth.is_authenticated:
+            st.warning("Je moet ingelogd zijn om deze pagina te bekijken.")
+            login.render()
+            return
+        entry.render()
+        return
+
+    if route == "Klasoverzicht":
+        if not auth.is_authenticated:
+            st.warning("Je moet ingelogd zijn om deze pagina te bekijken.")
+            login.render()
+            return
+        class_overview.render()
+        return
+
     # Default fallback
     home.render()
@@ -3,6 +3,7 @@ import streamlit as st
 from app.config import load_config
 from app.router import render_route, render_sidebar
 from app import db
+from app.maintenance import start_maintenance_scheduler
 
 
 def main() -> None:
@@ -15,11 +16,15 @@ def main() -> None:
         initial_sidebar_state="auto",
     )
 
-    # Ensure DB is initialized once per run (stable DB_URL anchored in app.db)
-    db.init_db()
+    # Ensure DB is initialized once per server process (stable DB_URL anchored in app.db)
+    db.ensure_db_initialized()
+    # Hourly purge of expired login tokens (TOKEN_PURGE_INTERVAL_SECONDS; no-op once running)
+    start_maintenance_scheduler()
 
-    route = render_sidebar()
-    render_route(route)
+    # One shared connection per rerun, committed when the script finishes (or reruns)
+    with db.request_scope():
+        route = render_sidebar()
+        render_route(route)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+"""Micro-benchmarks for the observation data layer.
+
+Runs against a throw-away SQLite file by default, or against `--url` (e.g. a staging
+Postgres; the benchmark creates its own school year/persons/categories there).
+
+Usage examples:
+  python scripts/bench_observations.py upsert
+  python scripts/bench_observations.py upsert --persons 25 --categories 5 --repeat 20
+  python scripts/bench_observations.py pivot --persons 25 --days 150
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def _load_db(url: str | None):
+    if url:
+        os.environ["DATABASE_URL"] = url
+    else:
+        tmp = tempfile.mkdtemp(prefix="obs-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ.setdefault("IGNORE_STREAMLIT_SECRETS", "1")
+    from app import db
+
+    db.init_db()
+    return db
+
+
+def _seed_class(db, n_persons: int, n_categories: int):
+    suffix = str(time.time_ns())
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name=f"bench-{suffix}", start_year=2025, end_year=2026)
+        persons = [db.create_person(conn, school_year_id=sy, first_name=f"P{i:02d}", last_name=suffix) for i in range(n_persons)]
+        cats = [db.create_category(conn, label=f"bench {i}", key=f"bench_{suffix}_{i}") for i in range(n_categories)]
+    return sy, persons, cats
+
+
+def _naive_save(db, conn, rows, school_year_id):
+    """Per-row select-then-insert/update: the baseline the bulk upsert replaces."""
+    obs = db.observations
+    for r in rows:
+        existing = conn.execute(
+            obs.select().where(obs.c.person_id == r.person_id, obs.c.category_id == r.category_id, obs.c.observed_at == r.observed_at)
+        ).first()
+        if existing:
+            conn.execute(obs.update().where(obs.c.id == existing.id).values(score=r.score, comment=r.comment))
+        else:
+            conn.execute(obs.insert().values(person_id=r.person_id, category_id=r.category_id, observed_at=r.observed_at, school_year_id=school_year_id, score=r.score, comment=r.comment))
+
+
+def _report(label: str, timings: list[float], statements: int) -> None:
+    ms = [t * 1000 for t in timings]
+    print(f"{label:<28} median {statistics.median(ms):8.2f} ms   max {max(ms):8.2f} ms   statements/run {statements}")
+
+
+def bench_upsert(args) -> int:
+    db = _load_db(args.url)
+    sy, persons, cats = _seed_class(db, args.persons, args.categories)
+    print(f"{args.persons} persons x {args.categories} categories = {args.persons * args.categories} cells, {args.repeat} saves each")
+
+    for label, save in (("bulk upsert", None), ("naive select+insert/update", _naive_save)):
+        timings = []
+        statements = 0
+        for i in range(args.repeat):
+            day = date(2025, 9, 1) if save is None else date(2025, 9, 2)
+            rows = [db.ObservationInput(p, c, day, score=(i + p) % 4 + 1, comment=f"save {i}") for p in persons for c in cats]
+            with db.count_queries() as stats:
+                start = time.perf_counter()
+                with db.connect() as conn:
+                    if save is None:
+                        db.upsert_observations(conn, rows, school_year_id=sy)
+                    else:
+                        save(db, conn, rows, sy)
+                timings.append(time.perf_counter() - start)
+            statements = stats.statements
+        _report(label, timings, statements)
+    return 0
+
+
+def _naive_pivot(db, conn, category_id, school_year_id):
+    """Row-by-row dict building plus the DataFrame st.dataframe needs: the baseline."""
+    obs = db.observations
+    rows = conn.execute(
+        obs.select().where(obs.c.category_id == category_id, obs.c.school_year_id == school_year_id).order_by(obs.c.person_id, obs.c.observed_at)
+    ).mappings().all()
+    grid: dict = {}
+    detail: dict = {}
+    for r in rows:
+        grid.setdefault(r["person_id"], {})[r["observed_at"]] = r["score"]
+        detail.setdefault(r["person_id"], []).append((r["observed_at"], r["score"], r["comment"]))
+    import pandas as pd
+
+    return pd.DataFrame.from_dict(grid, orient="index"), detail
+
+
+def bench_pivot(args) -> int:
+    db = _load_db(args.url)
+    sy, persons, cats = _seed_class(db, args.persons, 1)
+    days = [date(2025, 9, 1) + timedelta(days=d) for d in range(args.days)]
+    rows = [db.ObservationInput(p, cats[0], day, score=(p + i) % 5, comment=f"opmerking {i}" if i % 3 == 0 else None) for i, day in enumerate(days) for p in persons]
+    with db.connect() as conn:
+        db.upsert_observations(conn, rows, school_year_id=sy)
+    print(f"{args.persons} persons x {args.days} dates = {len(rows)} observations, {args.repeat} loads each")
+
+    for label, load in (("score matrix pivot", None), ("naive dict pivot", _naive_pivot)):
+        timings = []
+        for _ in range(args.repeat):
+            with db.count_queries() as stats:
+                start = time.perf_counter()
+                with db.connect() as conn:
+                    if load is None:
+                        db.load_class_pivot(conn, category_id=cats[0], school_year_id=sy)
+                    else:
+                        load(db, conn, cats[0], sy)
+                timings.append(time.perf_counter() - start)
+        _report(label, timings, stats.statements)
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Observation data-layer benchmarks")
+    p.add_argument("--url", help="Database URL (default: temporary SQLite file)")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    up = sub.add_parser("upsert", help="Save a full data-entry grid")
+    up.add_argument("--persons", type=int, default=25)
+    up.add_argument("--categories", type=int, default=5)
+    up.add_argument("--repeat", type=int, default=10)
+    up.set_defaults(func=bench_upsert)
+
+    pv = sub.add_parser("pivot", help="Build the class overview for a full school year")
+    pv.add_argument("--persons", type=int, default=25)
+    pv.add_argument("--days", type=int, default=150)
+    pv.add_argument("--repeat", type=int, default=10)
+    pv.set_defaults(func=bench_pivot)
+
+    args = p.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+"""Pick the PBKDF2 iteration count for a target hashing latency on this machine.
+
+Times pbkdf2_sha256 at a probe work factor, scales to the target latency and checks the
+result. Set the printed value as PBKDF2_ITERATIONS (environment or Streamlit secrets).
+Existing hashes are upgraded on each user's next login.
+
+Usage examples:
+  python scripts/calibrate_hashing.py
+  python scripts/calibrate_hashing.py --target-ms 150 --workers 4
+"""
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.db import DEFAULT_PBKDF2_ITERATIONS
+
+# Never recommend less than the app's own default. OWASP (2023) recommends 600 000
+# iterations for PBKDF2-HMAC-SHA256; the default is lower to keep logins fast on small
+# servers, so aim for OWASP's number where the target latency allows it.
+MIN_ITERATIONS = DEFAULT_PBKDF2_ITERATIONS
+PROBE_ITERATIONS = 50_000
+
+
+def _time_hash(iterations: int, samples: int) -> float:
+    """Median seconds for one pbkdf2_sha256 hash."""
+    salt = os.urandom(16)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", b"calibration password", salt, iterations)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def _throughput(iterations: int, workers: int, jobs: int) -> float:
+    """Hashes per second with `workers` hashing threads (pbkdf2_hmac releases the GIL)."""
+    salt = os.urandom(16)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda _: hashlib.pbkdf2_hmac("sha256", b"calibration password", salt, iterations), range(jobs)))
+    return jobs / (time.perf_counter() - start)
+
+
+def calibrate(target_ms: float, samples: int) -> int:
+    per_iteration = _time_hash(PROBE_ITERATIONS, samples) / PROBE_ITERATIONS
+    iterations = int(target_ms / 1000 / per_iteration)
+    # round down to a readable number, but stay above the floor
+    return max(MIN_ITERATIONS, iterations // 10_000 * 10_000)
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Calibrate PBKDF2_ITERATIONS for a target latency")
+    p.add_argument("--target-ms", type=float, default=250.0, help="Target time for one hash (default 250 ms)")
+    p.add_argument("--samples", type=int, default=5)
+    p.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)), help="HASH_WORKERS to estimate login throughput for")
+    args = p.parse_args(argv)
+
+    iterations = calibrate(args.target_ms, args.samples)
+    measured = _time_hash(iterations, args.samples) * 1000
+    rate = _throughput(iterations, args.workers, jobs=args.workers * 4)
+    print(f"{iterations} iterations: median {measured:.1f} ms per hash (target {args.target_ms:.0f} ms)")
+    print(f"~{rate:.1f} logins/s with {args.workers} hashing workers")
+    if iterations == MIN_ITERATIONS:
+        print(f"note: {MIN_ITERATIONS} is the minimum; this machine may be slower than the target allows")
+    print(f"\nPBKDF2_ITERATIONS={iterations}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
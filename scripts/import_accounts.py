@@ -0,0 +1,84 @@
+"""Bulk import of user accounts or a class list from a CSV or XLSX file.
+
+The whole file is checked first. If any row has an error, nothing is imported and
+the errors are listed per row. User imports write the temporary passwords to a CSV
+file, which the admin hands out.
+
+Columns (first row, case-insensitive):
+  users:   email / e-mail, naam / full_name, optional admin (ja/nee)
+  persons: voornaam / first_name, achternaam / last_name, optional extern id / external_id
+
+Usage examples:
+  python scripts/import_accounts.py users personeel.xlsx
+  python scripts/import_accounts.py users personeel.csv --dry-run
+  python scripts/import_accounts.py persons klas-3a.csv --school-year 2025/2026
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import db, importer
+
+
+def _print_errors(report: importer.ImportReport) -> None:
+    for error in report.errors:
+        print(f"rij {error.row}: {error.message}", file=sys.stderr)
+    print(f"{len(report.errors)} fout(en), niets geïmporteerd.", file=sys.stderr)
+
+
+def _school_year_id(name: str):
+    with db.connect() as conn:
+        return next((sy["id"] for sy in db.list_school_years(conn) if sy["name"] == name), None)
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Import users or persons from CSV/XLSX")
+    p.add_argument("kind", choices=["users", "persons"])
+    p.add_argument("file")
+    p.add_argument("--dry-run", action="store_true", help="Only validate, write nothing")
+    p.add_argument("--school-year", help="School year name (persons only), e.g. 2025/2026")
+    p.add_argument("--passwords-out", help="Where to write the temporary passwords (users only)")
+    p.add_argument("--processes", type=int, help="Hashing processes (default: one per core)")
+    args = p.parse_args(argv)
+
+    db.init_db()
+    with open(args.file, "rb") as fh:
+        rows, errors = importer.read_rows(fh.read(), args.file)
+    if errors:
+        _print_errors(importer.ImportReport(errors=errors))
+        return 1
+    start = time.perf_counter()
+
+    if args.kind == "persons":
+        if not args.school_year:
+            p.error("--school-year is required for persons")
+        school_year_id = _school_year_id(args.school_year)
+        if school_year_id is None:
+            print(f"Schooljaar {args.school_year!r} bestaat niet.", file=sys.stderr)
+            return 1
+        report = importer.import_persons(rows, school_year_id=school_year_id, dry_run=args.dry_run)
+    else:
+        report = importer.import_users(rows, dry_run=args.dry_run, processes=args.processes or os.cpu_count() or 1)
+
+    if not report.ok:
+        _print_errors(report)
+        return 1
+    if args.dry_run:
+        print(f"{len(rows)} rijen gecontroleerd, geen fouten.")
+        return 0
+    if report.passwords:
+        out = args.passwords_out or os.path.splitext(args.file)[0] + "-wachtwoorden.csv"
+        with open(out, "w", encoding="utf-8", newline="") as fh:
+            fh.write(importer.passwords_csv(report))
+        print(f"Tijdelijke wachtwoorden: {out}")
+    print(f"{report.inserted} {'gebruikers' if args.kind == 'users' else 'personen'} geïmporteerd in {time.perf_counter() - start:.1f} s.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,48 @@
+"""Delete expired login tokens in small batches (for cron or a one-off cleanup).
+
+Each batch is its own short transaction, so the app keeps working during the purge.
+With --max-per-user only each user's newest tokens are kept. The default comes from
+LOGIN_TOKENS_PER_USER.
+
+Usage examples:
+  python scripts/purge_login_tokens.py
+  python scripts/purge_login_tokens.py --batch-size 500 --pause 0.1
+  python scripts/purge_login_tokens.py --max-per-user 5
+  python scripts/purge_login_tokens.py --counts
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import db, maintenance
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Purge expired login tokens")
+    p.add_argument("--batch-size", type=int, default=maintenance.DEFAULT_BATCH_SIZE, help="Rows per transaction")
+    p.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    p.add_argument("--max-per-user", type=int, help="Keep at most this many tokens per user")
+    p.add_argument("--counts", action="store_true", help="Only print the token counts, delete nothing")
+    args = p.parse_args(argv)
+
+    db.init_db()
+    if not args.counts:
+        start = time.perf_counter()
+        result = maintenance.run_token_maintenance(max_per_user=args.max_per_user, batch_size=args.batch_size, pause=args.pause)
+        print(
+            f"{result['deleted_expired']} verlopen en {result['deleted_over_cap']} overtollige tokens, "
+            f"{result['deleted_attempts']} oude aanmeldpogingen verwijderd in {time.perf_counter() - start:.1f} s."
+        )
+    with db.connect() as conn:
+        counts = maintenance.login_token_counts(conn)
+    print(f"login_tokens: {counts['total']} totaal, {counts['live']} geldig, {counts['expired']} verlopen")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
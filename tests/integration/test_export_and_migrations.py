@@ -1,6 +1,7 @@
 import importlib
 import os
 import sys
+import tempfile
 
 # ensure project root is on sys.path
 ROOT = os.path.dirname(os.path.dirname(__file__))
@@ -33,10 +34,77 @@ def test_db_init_creates_schema(tmp_path):
 
 
 @pytest.mark.integration
-@pytest.mark.skip(reason="Excel export not yet implemented; placeholder for future integration test")
 def test_export_creates_xlsx(tmp_path):
-    # Placeholder: when export is implemented, this test will call the export function and verify the XLSX file
-    pass
+    from datetime import date
+
+    from openpyxl import load_workbook
+
+    db = reload_db(f"sqlite:///{tmp_path / 'export.db'}")
+    db.init_db()
+    import app.export as export
+    importlib.reload(export)
+
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        an, bo = (db.create_person(conn, school_year_id=sy, first_name=n, last_name="X") for n in ("An", "Bo"))
+        cat = db.create_category(conn, label="Sociaal", key="sociaal")
+        db.upsert_observations(
+            conn,
+            [
+                db.ObservationInput(an, cat, date(2025, 9, 1), score=4, comment="=HYPERLINK(\"x\")"),
+                db.ObservationInput(an, cat, date(2025, 9, 2), score=db.SCORE_UNKNOWN),
+                db.ObservationInput(bo, cat, date(2025, 9, 2), comment="afwezig"),
+            ],
+            school_year_id=sy,
+        )
+
+    path = export.export_class(str(tmp_path / "klas.xlsx"), category_id=cat)
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["Overzicht", "Observaties"]
+    pivot = [list(r) for r in workbook["Overzicht"].iter_rows(values_only=True)]
+    assert pivot[0] == ["Naam", "01/09/2025 score", "01/09/2025 commentaar", "02/09/2025 score", "02/09/2025 commentaar"]
+    assert pivot[1][:4] == ["An X", "4", '=HYPERLINK("x")', "?"]
+    assert pivot[2] == ["Bo X", None, None, None, "afwezig"]
+    flat = list(workbook["Observaties"].iter_rows(values_only=True))
+    assert len(flat) == 4 and flat[0][:3] == ("id", "school_year", "observed_at")
+    workbook.close()
+    # a comment that looks like a formula stays text
+    assert load_workbook(path)["Overzicht"]["C2"].data_type == "s"
+
+    path = export.export_person(str(tmp_path / "persoon.xlsx"), person_id=bo)
+    workbook = load_workbook(path, read_only=True)
+    rows = list(workbook["Observaties"].iter_rows(values_only=True))
+    assert [r[4] for r in rows[1:]] == ["Bo X"]
+    workbook.close()
+
+    path = export.export_to_tempfile(export.export_all)
+    try:
+        workbook = load_workbook(path, read_only=True)
+        assert workbook.sheetnames == ["Observaties", "Personen", "Categorieën", "Schooljaren", "Gebruikers"]
+        users = list(workbook["Gebruikers"].iter_rows(values_only=True))
+        assert "password_hash" not in users[0] and len(users) == 2
+        assert len(list(workbook["Observaties"].iter_rows())) == 4
+        workbook.close()
+    finally:
+        os.remove(path)
+
+
+@pytest.mark.integration
+def test_exports_left_behind_are_swept(tmp_path, monkeypatch):
+    db = reload_db(f"sqlite:///{tmp_path / 'sweep.db'}")
+    db.init_db()
+    import app.export as export
+    importlib.reload(export)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    abandoned = export.export_to_tempfile(export.export_all)
+    os.utime(abandoned, (0, 0))
+    other = tmp_path / "notes.xlsx"
+    other.write_bytes(b"")
+    # the next build removes the file whose download never came, and nothing else
+    fresh = export.export_to_tempfile(export.export_all)
+    assert not os.path.exists(abandoned) and os.path.exists(fresh) and other.exists()
+    assert export.sweep_stale_exports() == 0
 
 
 @pytest.mark.integration
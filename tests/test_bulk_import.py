@@ -0,0 +1,133 @@
+import importlib
+import io
+import os
+import sys
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_modules_with_dburl(db_url: str):
+    os.environ['DATABASE_URL'] = db_url
+    import app.db as db
+    importlib.reload(db)
+    import app.hashing as hashing
+    importlib.reload(hashing)
+    import app.importer as importer
+    importlib.reload(importer)
+    return db, importer
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    # a low work factor keeps the test fast; the code path is the same
+    monkeypatch.setenv("PBKDF2_ITERATIONS", "1000")
+    db, importer = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'import.db'}")
+    db.init_db()
+    return db, importer
+
+
+def csv_bytes(text):
+    return text.encode("utf-8-sig")
+
+
+def test_user_import_validates_everything_first(modules):
+    db, importer = modules
+    rows, _ = importer.read_rows(
+        csv_bytes("E-mail;Naam;Admin\nan@school.be;An;ja\n\nniet-geldig;Bo;nee\nan@school.be;An 2;\nadmin@school.be;;nee\ncas@school.be;Cas;misschien\n"),
+        "personeel.csv",
+    )
+    with db.connect() as conn:
+        conn.execute(db.users.insert().values(email="admin@school.be", full_name="X", password_hash="x"))
+    report = importer.import_users(rows)
+    assert not report.ok and report.inserted == 0
+    # row 3 is empty and skipped; numbering follows the file
+    assert [e.row for e in report.errors] == [4, 5, 6, 6, 7]
+    with db.connect() as conn:
+        assert db.get_user_by_email(conn, "an@school.be") is None
+
+
+def test_user_import_inserts_in_batches_with_hashed_passwords(modules):
+    db, importer = modules
+    lines = ["email,naam"] + [f"leerkracht{i}@school.be,Leerkracht {i}" for i in range(1200)]
+    rows, _ = importer.read_rows(csv_bytes("\n".join(lines)), "personeel.csv")
+
+    dry = importer.import_users(rows, dry_run=True)
+    assert dry.ok and dry.inserted == 0
+
+    with db.count_queries() as stats:
+        report = importer.import_users(rows, processes=2)
+    assert report.ok and report.inserted == 1200
+    # 3 existence checks before hashing, 3 again in the transaction + 3 multi-row INSERTs of 500 rows
+    assert stats.statements == 9
+    with db.connect() as conn:
+        user = db.get_user_by_email(conn, "leerkracht7@school.be")
+    assert user["must_change_password"] and not user["is_admin"]
+    assert db.verify_password(report.passwords["leerkracht7@school.be"], user["password_hash"])
+    assert user["password_hash"].split("$")[1] == str(db.PBKDF2_ITERATIONS)
+    assert "leerkracht7@school.be;" in importer.passwords_csv(report)
+
+
+def test_user_added_meanwhile_is_reported_and_nothing_is_imported(modules, monkeypatch):
+    db, importer = modules
+    rows, _ = importer.read_rows(csv_bytes("email,naam\nan@school.be,An\nbo@school.be,Bo\n"), "personeel.csv")
+    hash_passwords = importer.hash_passwords_in_processes
+
+    def hash_while_someone_adds_bo(passwords, processes=None):
+        with db.get_engine().begin() as other:
+            other.execute(db.users.insert().values(email="bo@school.be", full_name="Bo", password_hash="x"))
+        return hash_passwords(passwords, processes)
+
+    monkeypatch.setattr(importer, "hash_passwords_in_processes", hash_while_someone_adds_bo)
+    report = importer.import_users(rows, processes=2)
+    assert not report.ok and report.inserted == 0
+    assert [(e.row, e.message) for e in report.errors] == [(3, "er bestaat al een gebruiker bo@school.be")]
+    with db.connect() as conn:
+        assert db.get_user_by_email(conn, "an@school.be") is None
+
+
+def test_person_import_from_xlsx(modules):
+    db, importer = modules
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    wb.active.append(["Voornaam", "Achternaam", "Extern id"])
+    wb.active.append(["An", "Peeters", 101])
+    wb.active.append(["Bo", "Claes", None])
+    buf = io.BytesIO()
+    wb.save(buf)
+    rows, _ = importer.read_rows(buf.getvalue(), "klas.xlsx")
+
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        before = db.read_data_versions(conn).get("persons", 0)
+    report = importer.import_persons(rows, school_year_id=sy)
+    assert report.ok and report.inserted == 2
+    with db.connect() as conn:
+        people = db.list_persons(conn, sy)
+        assert db.read_data_versions(conn)["persons"] == before + 1
+    assert [(p["full_name"], p["external_id"]) for p in people] == [("An Peeters", "101"), ("Bo Claes", None)]
+
+    again = importer.import_persons(rows, school_year_id=sy)
+    assert [e.message for e in again.errors] == ["extern id 101 zit al in dit schooljaar"]
+
+
+def test_missing_columns_are_reported_on_the_header_row(modules):
+    _, importer = modules
+    rows, _ = importer.read_rows(csv_bytes("naam\nAn\n"), "klas.csv")
+    report = importer.import_persons(rows, school_year_id=1)
+    assert [e.row for e in report.errors] == [1, 1]
+
+
+def test_excel_csv_and_unreadable_files(modules):
+    _, importer = modules
+    # Excel saves CSV as Windows-1252
+    rows, errors = importer.read_rows("voornaam;achternaam\nChloé;Peeters\n".encode("cp1252"), "klas.csv")
+    assert errors == [] and rows == [(2, {"voornaam": "Chloé", "achternaam": "Peeters"})]
+
+    rows, errors = importer.read_rows(b"PK\x03\x04 not really a workbook", "klas.xlsx")
+    assert rows == [] and [e.row for e in errors] == [1]
@@ -0,0 +1,146 @@
+import importlib
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Taal > (Lezen > Begrijpend lezen, Schrijven), Rekenen."""
+    db = reload_db(f"sqlite:///{tmp_path / 'closure.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        taal = db.create_category(conn, label="Taal", key="taal")
+        lezen = db.create_category(conn, label="Lezen", key="lezen", parent_id=taal)
+        begrijpend = db.create_category(conn, label="Begrijpend lezen", key="begrijpend", parent_id=lezen)
+        schrijven = db.create_category(conn, label="Schrijven", key="schrijven", parent_id=taal)
+        rekenen = db.create_category(conn, label="Rekenen", key="rekenen")
+    db.test_ids = dict(taal=taal, lezen=lezen, begrijpend=begrijpend, schrijven=schrijven, rekenen=rekenen)
+    return db
+
+
+def category(db, category_id):
+    with db.connect() as conn:
+        return next(c for c in db.list_categories(conn) if c["id"] == category_id)
+
+
+def closure(db):
+    with db.connect() as conn:
+        rows = conn.execute(db.category_closure.select()).all()
+    return {(r.ancestor_id, r.descendant_id): r.depth for r in rows}
+
+
+def rebuilt(db):
+    with db.connect() as conn:
+        db.rebuild_category_closure(conn)
+    return closure(db)
+
+
+def subtree(db, category_id):
+    with db.connect() as conn:
+        return set(conn.execute(db.category_subtree(category_id)).scalars())
+
+
+def test_create_maintains_closure(db):
+    ids = db.test_ids
+    assert subtree(db, ids["taal"]) == {ids["taal"], ids["lezen"], ids["begrijpend"], ids["schrijven"]}
+    assert closure(db)[(ids["taal"], ids["begrijpend"])] == 2
+    assert closure(db) == rebuilt(db)
+
+
+def test_reparent_moves_whole_subtree(db):
+    ids = db.test_ids
+    with db.connect() as conn:
+        db.update_category(conn, ids["lezen"], parent_id=ids["rekenen"])
+    assert subtree(db, ids["taal"]) == {ids["taal"], ids["schrijven"]}
+    assert subtree(db, ids["rekenen"]) == {ids["rekenen"], ids["lezen"], ids["begrijpend"]}
+    assert closure(db) == rebuilt(db)
+
+    with db.connect() as conn:
+        db.update_category(conn, ids["lezen"], parent_id=None)
+    assert subtree(db, ids["rekenen"]) == {ids["rekenen"]}
+    assert closure(db) == rebuilt(db)
+
+
+def test_reparent_under_own_descendant_is_refused(db):
+    ids = db.test_ids
+    before = closure(db)
+    for new_parent in (ids["taal"], ids["begrijpend"]):
+        with pytest.raises(ValueError, match="category_cycle"):
+            with db.connect() as conn:
+                db.update_category(conn, ids["taal"], label="Taal!", parent_id=new_parent)
+    assert closure(db) == before
+    assert category(db, ids["taal"])["label"] == "Taal"
+
+
+def test_delete_moves_children_up(db):
+    ids = db.test_ids
+    with db.connect() as conn:
+        db.delete_category(conn, ids["lezen"])
+    assert category(db, ids["begrijpend"])["parent_id"] == ids["taal"]
+    assert closure(db)[(ids["taal"], ids["begrijpend"])] == 1
+    assert closure(db) == rebuilt(db)
+
+
+def test_ensure_builds_missing_closure(db):
+    expected = closure(db)
+    with db.connect() as conn:
+        conn.execute(db.category_closure.delete())
+        db.ensure_category_closure(conn)
+    assert closure(db) == expected
+
+
+def test_subtree_filter_and_plan(db):
+    ids = db.test_ids
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        p = db.create_person(conn, school_year_id=sy, first_name="An", last_name="X")
+        db.upsert_observations(
+            conn, [db.ObservationInput(p, c, date(2025, 10, 6), score=2) for c in ids.values()], school_year_id=sy
+        )
+    spec = db.ObservationFilter(category_id=ids["lezen"], include_descendants=True)
+    with db.connect() as conn:
+        rows = db.get_observations_page(conn, spec).rows
+        assert {r["category_id"] for r in rows} == {ids["lezen"], ids["begrijpend"]}
+        assert db.count_observations(conn, spec).value == 2
+        only = db.get_observations_page(conn, db.ObservationFilter(category_id=ids["lezen"])).rows
+        assert [r["category_id"] for r in only] == [ids["lezen"]]
+
+        stmt = db.category_subtree(ids["lezen"]).compile(compile_kwargs={"literal_binds": True})
+        plan = " ".join(r[-1] for r in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {stmt}"))
+    assert "category_closure" in plan and "SCAN" not in plan
+
+
+def test_category_tree_order_and_parent_choices(db):
+    ids = db.test_ids
+    with db.count_queries() as stats:
+        with db.request_scope():
+            with db.connect() as conn:
+                tree = db.get_category_tree(conn)
+                assert db.get_category_tree(conn) is tree
+    # data_versions poll + the tree query; the second call is served from the cache
+    assert stats.statements == 2
+    assert [tree.by_id[cid]["label"] for cid, _ in tree.order] == ["Rekenen", "Taal", "Lezen", "Begrijpend lezen", "Schrijven"]
+    assert dict(tree.order)[ids["begrijpend"]] == 2
+    assert tree.descendants(ids["lezen"]) == {ids["lezen"], ids["begrijpend"]}
+    assert set(tree.parent_choices(ids["lezen"])) == {ids["taal"], ids["schrijven"], ids["rekenen"]}
+
+    with db.connect() as conn:
+        db.update_category(conn, ids["rekenen"], parent_id=ids["begrijpend"])
+        moved = db.get_category_tree(conn)
+    assert dict(moved.order)[ids["rekenen"]] == 3
+    assert [cid for cid, _ in moved.order][:4] == [ids["taal"], ids["lezen"], ids["begrijpend"], ids["rekenen"]]
@@ -0,0 +1,93 @@
+import importlib
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+D1, D2, D3 = date(2025, 9, 1), date(2025, 9, 8), date(2025, 9, 15)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'pivot.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        cas, an, bo = (db.create_person(conn, school_year_id=sy, first_name=n, last_name="X") for n in ("Cas", "An", "Bo"))
+        cat, other = db.create_category(conn, label="Sociaal", key="sociaal"), db.create_category(conn, label="Andere", key="andere")
+        db.upsert_observations(
+            conn,
+            [
+                db.ObservationInput(an, cat, D3, score=4, comment="top"),
+                db.ObservationInput(an, cat, D1, score=db.SCORE_UNKNOWN),
+                db.ObservationInput(cas, cat, D2, score=None, comment="afwezig"),
+                db.ObservationInput(cas, other, D1, score=1),  # other category
+            ],
+            school_year_id=sy,
+        )
+    db.test_ids = sy, (an, bo, cas), cat
+    return db
+
+
+def test_pivot_is_persons_by_dates(db):
+    sy, (an, bo, cas), cat = db.test_ids
+    with db.count_queries() as stats:
+        with db.connect() as conn:
+            pivot = db.load_class_pivot(conn, category_id=cat)
+    assert stats.statements == 1
+    assert pivot.school_year_id == sy
+    assert pivot.persons == ((an, "An X"), (bo, "Bo X"), (cas, "Cas X"))
+    assert pivot.dates == (D1, D2, D3)
+    assert list(pivot.scores.index) == [an, bo, cas]
+    assert list(pivot.scores.columns) == [D1, D2, D3]
+    assert pivot.scores.loc[an, D1] == 0  # "?" is a score, not a gap
+    assert pivot.scores.loc[an, D3] == 4
+    assert (pivot.scores.loc[bo] == db.SCORE_NULL).all()
+    assert pivot.scores.loc[cas, D2] == db.SCORE_NULL
+    assert pivot.matrix.get(cas, D2, cat) == (None, "afwezig")
+
+
+def test_flat_detail_per_person(db):
+    sy, (an, bo, cas), cat = db.test_ids
+    with db.connect() as conn:
+        pivot = db.load_class_pivot(conn, category_id=cat)
+    assert len(pivot.flat) == 3
+    detail = pivot.detail(an)
+    assert list(detail["observed_at"]) == [D1, D3]
+    assert list(detail["comment"].fillna("")) == ["", "top"]
+    assert pivot.detail(bo).empty
+
+
+def test_pivot_without_observations_or_school_year(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'empty.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        pivot = db.get_cached_class_pivot(conn, category_id=1)
+        assert pivot.school_year_id is None and pivot.persons == () and pivot.scores.empty
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        db.create_person(conn, school_year_id=sy, first_name="An", last_name="X")
+        pivot = db.get_cached_class_pivot(conn, category_id=1)
+    assert pivot.school_year_id == sy
+    assert pivot.scores.shape == (1, 0)
+
+
+def test_cached_pivot_follows_saves(db):
+    sy, (an, bo, cas), cat = db.test_ids
+    with db.connect() as conn:
+        first = db.get_cached_class_pivot(conn, category_id=cat)
+        assert db.get_cached_class_pivot(conn, category_id=cat) is first
+        db.upsert_observations(conn, [db.ObservationInput(bo, cat, D1, score=2)], school_year_id=sy)
+        assert db.get_cached_class_pivot(conn, category_id=cat).scores.loc[bo, D1] == 2
@@ -0,0 +1,122 @@
+import importlib
+import os
+import sys
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+COMMENTS = [
+    "Zeer betrokken tijdens de les",
+    "Werkt zelfstandig, weinig betrokkenheid",
+    "Helpt klasgenoten spontaan",
+    "Betrokken bij groepswerk, helpt anderen",
+    None,
+    "Moeilijke dag",
+    "Boekbespreking goed voorbereid",
+]
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'fts.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        person = db.create_person(conn, school_year_id=sy, first_name="An", last_name="Peeters")
+        cat = db.create_category(conn, label="Betrokkenheid", key="betrokkenheid")
+        conn.execute(
+            db.observations.insert(),
+            [dict(person_id=person, category_id=cat, observed_at=date(2025, 9, i + 1), school_year_id=sy, score=3, comment=c) for i, c in enumerate(COMMENTS)],
+        )
+    return db
+
+
+def comments_for(db, query, mode):
+    with db.connect() as conn:
+        rows = db.get_observations(conn, db.ObservationFilter(text=query, search_mode=mode, limit=100))
+    return sorted(r["comment"] for r in rows)
+
+
+@pytest.mark.parametrize("query", ["helpt", "groepswerk", "les", "moeilijke dag", "ZEER betrokken"])
+def test_fts_matches_substring_for_whole_words(db, query):
+    assert comments_for(db, query, "fts") == comments_for(db, query, "substring")
+
+
+def test_fts_matches_word_prefixes_only(db):
+    # "betrokken" is a prefix of "betrokkenheid"; both modes agree here
+    assert len(comments_for(db, "betrokken", "fts")) == 3
+    # "oek" is inside "Boekbespreking" but starts no word: only the substring mode finds it
+    assert comments_for(db, "oek", "fts") == []
+    assert comments_for(db, "oek", "substring") == ["Boekbespreking goed voorbereid"]
+    # the legacy text= argument keeps matching substrings; full-text search is opt-in
+    with db.connect() as conn:
+        assert [r["comment"] for r in db.get_observations(conn, text="oek")] == ["Boekbespreking goed voorbereid"]
+
+
+def test_browse_uses_fts_table(db):
+    with db.connect() as conn:
+        stmt = db.select(db.observations).where(*db._observation_filters(db.ObservationFilter(text="helpt", search_mode="fts"), "sqlite"))
+        plan = " ".join(r[-1] for r in conn.execute(text(f"EXPLAIN QUERY PLAN {stmt.compile(conn, compile_kwargs={'literal_binds': True})}")))
+    assert "observations_fts VIRTUAL TABLE INDEX" in plan, plan
+
+
+def test_search_index_stays_in_sync_on_write(db):
+    with db.connect() as conn:
+        row = conn.execute(db.observations.select().where(db.observations.c.comment == "Moeilijke dag")).mappings().first()
+        conn.execute(db.observations.update().where(db.observations.c.id == row["id"]).values(comment="Fantastische dag"))
+    assert comments_for(db, "moeilijke", "fts") == []
+    assert comments_for(db, "fantastische", "fts") == ["Fantastische dag"]
+
+    with db.connect() as conn:
+        conn.execute(db.observations.delete().where(db.observations.c.id == row["id"]))
+    assert comments_for(db, "fantastische", "fts") == []
+
+
+def test_search_ranks_best_match_first(db):
+    with db.connect() as conn:
+        rows = db.search_observations(conn, "helpt betrokken")
+    assert [r["comment"] for r in rows] == ["Betrokken bij groepswerk, helpt anderen"]
+
+    with db.connect() as conn:
+        rows = db.search_observations(conn, "betrokken")
+    assert len(rows) == 3
+    assert "rank" in rows[0]
+
+
+def test_ranked_browse_applies_the_other_filters(db):
+    # "betrokken" (a prefix of "betrokkenheid" too) matches on 1, 2 and 4 September
+    spec = db.ObservationFilter(text="betrokken", start_date=date(2025, 9, 2), limit=10, search_mode="fts")
+    with db.connect() as conn:
+        rows = db.get_cached_ranked_observations(conn, spec)
+        again = db.get_cached_ranked_observations(conn, db.replace(spec, cursor="ignored"))
+    assert sorted(r["observed_at"] for r in rows) == [date(2025, 9, 2), date(2025, 9, 4)]
+    assert again is rows
+
+
+def test_existing_database_gets_search_index(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'legacy.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        for trigger in ("observations_fts_ai", "observations_fts_ad", "observations_fts_au"):
+            conn.execute(text(f"DROP TRIGGER {trigger}"))
+        conn.execute(text("DROP TABLE observations_fts"))
+        sy = db.create_school_year(conn, name="2025/2026")
+        person = db.create_person(conn, school_year_id=sy, first_name="An", last_name="P")
+        cat = db.create_category(conn, label="X", key="x")
+        conn.execute(db.observations.insert().values(person_id=person, category_id=cat, observed_at=date(2025, 9, 1), school_year_id=sy, comment="van voor de index"))
+
+    db.init_db()
+    assert comments_for(db, "index", "fts") == ["van voor de index"]
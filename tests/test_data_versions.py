@@ -0,0 +1,131 @@
+import importlib
+import os
+import subprocess
+import sys
+import textwrap
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+def run_other_process(db_url: str, code: str) -> None:
+    """Run `code` in a separate Python process against the same database."""
+    env = {**os.environ, "DATABASE_URL": db_url, "IGNORE_STREAMLIT_SECRETS": "1"}
+    script = "import sys; sys.path.insert(0, %r)\nfrom app import db\n" % ROOT + textwrap.dedent(code)
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, timeout=60)
+
+
+def test_bump_is_part_of_the_write_transaction(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'tx.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        assert db.data_version(conn, "categories") == 0
+
+    try:
+        with db.connect() as conn:
+            db.create_category(conn, label="Weg", key="weg")
+            raise RuntimeError("rollback")
+    except RuntimeError:
+        pass
+    with db.connect() as conn:
+        assert db.data_version(conn, "categories") == 0
+        db.create_category(conn, label="Blijft", key="blijft")
+        db.bump_data_version(conn, *db.observation_domains(7))
+    with db.connect() as conn:
+        versions = db.read_data_versions(conn)
+    assert versions == {"categories": 1, "observations": 1, "observations:7": 1}
+
+
+def test_bump_commits_with_the_write_and_pending_reads_stay_private(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'scope.db'}")
+    db.init_db()
+    with db.request_scope():
+        with db.connect() as conn:
+            db.create_category(conn, label="Vast", key="vast")
+            # the version row is committed (and unlocked) before the rerun goes on
+            with db.get_engine().connect() as other:
+                assert db.read_data_versions(other)["categories"] == 1
+            try:
+                with db.transaction():
+                    db.create_category(conn, label="Weg", key="weg")
+                    # this rerun sees its own write, but it is not cached for other sessions
+                    assert [c["label"] for c in db.list_categories(conn)] == ["Vast", "Weg"]
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+            assert [c["label"] for c in db.list_categories(conn)] == ["Vast"]
+    assert db.reference_cache.stats()["entries"] == 1
+    with db.connect() as conn:
+        assert [c["label"] for c in db.list_categories(conn)] == ["Vast"]
+
+
+def test_versions_are_polled_once_per_rerun(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'poll.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        db.create_category(conn, label="A", key="a")
+    with db.connect() as conn:
+        db.list_categories(conn)  # warm the cache
+
+    with db.count_queries() as stats:
+        with db.request_scope():
+            with db.connect() as conn:
+                for _ in range(3):
+                    db.list_categories(conn)
+                    db.list_school_years(conn)
+    # one data_versions poll + one school_years load; categories come from the cache
+    assert stats.statements == 2
+
+
+def test_cache_sees_writes_from_another_process(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'shared.db'}"
+    db = reload_db(db_url)
+    db.init_db()
+    with db.connect() as conn:
+        db.create_category(conn, label="Lokaal", key="lokaal")
+    with db.connect() as conn:
+        assert [c["label"] for c in db.list_categories(conn)] == ["Lokaal"]
+
+    run_other_process(
+        db_url,
+        """
+        with db.connect() as conn:
+            db.create_category(conn, label="Extern", key="extern")
+        """,
+    )
+
+    with db.connect() as conn:
+        assert [c["label"] for c in db.list_categories(conn)] == ["Extern", "Lokaal"]
+
+
+def test_unchanged_versions_keep_cache_across_processes(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'quiet.db'}"
+    db = reload_db(db_url)
+    db.init_db()
+    with db.connect() as conn:
+        db.create_category(conn, label="Lokaal", key="lokaal")
+    with db.connect() as conn:
+        db.list_categories(conn)
+
+    # the other process only reads
+    run_other_process(
+        db_url,
+        """
+        with db.connect() as conn:
+            assert len(db.list_categories(conn)) == 1
+        """,
+    )
+
+    misses = db.reference_cache.stats()["misses"]
+    with db.connect() as conn:
+        db.list_categories(conn)
+    assert db.reference_cache.stats()["misses"] == misses
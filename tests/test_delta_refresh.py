@@ -0,0 +1,153 @@
+import importlib
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+D1, D2, D3 = date(2025, 9, 1), date(2025, 9, 8), date(2025, 9, 15)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'delta.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        people = [db.create_person(conn, school_year_id=sy, first_name=n, last_name="X") for n in ("An", "Bo", "Cas")]
+        cat = db.create_category(conn, label="Sociaal", key="sociaal")
+        db.upsert_observations(
+            conn, [db.ObservationInput(p, cat, d, score=2) for p in people for d in (D1, D2)], school_year_id=sy
+        )
+    db.test_ids = sy, people, cat
+    return db
+
+
+def same_as_full_load(db, pivot):
+    with db.connect() as conn:
+        full = db.load_class_pivot(conn, category_id=pivot.category_id)
+    assert pivot.dates == full.dates
+    assert np.array_equal(pivot.matrix.scores, full.matrix.scores)
+    assert pivot.matrix.comments == full.matrix.comments
+    assert np.array_equal(pivot.matrix.observation_ids, full.matrix.observation_ids)
+
+
+def test_cached_pivot_is_patched_with_the_delta(db):
+    sy, (an, bo, cas), cat = db.test_ids
+    with db.connect() as conn:
+        first = db.get_cached_class_pivot(conn, category_id=cat)
+
+    with db.connect() as conn:
+        db.upsert_observations(
+            conn,
+            [db.ObservationInput(an, cat, D1, score=4, comment="top"), db.ObservationInput(bo, cat, D3, score=1)],
+            school_year_id=sy,
+        )
+
+    with db.count_queries() as stats:
+        with db.request_scope():
+            with db.connect() as conn:
+                pivot = db.get_cached_class_pivot(conn, category_id=cat)
+    # data_versions poll + changed rows + tombstones; no full reload
+    assert stats.statements == 3
+    assert db.observation_cache.stats()["refreshes"] == 1
+    assert pivot.matrix.get(an, D1, cat) == (4, "top")
+    assert pivot.dates == (D1, D2, D3)
+    assert first.matrix.get(an, D1, cat) == (2, None)  # the shared old value is untouched
+    same_as_full_load(db, pivot)
+
+
+def test_deletions_reach_loaded_grids_through_tombstones(db):
+    sy, people, cat = db.test_ids
+    with db.connect() as conn:
+        pivot = db.load_class_pivot(conn, category_id=cat)
+        grid = db.load_entry_grid(conn, observed_at=D2, category_ids=[cat])
+        snapshot = grid.snapshot()
+        result = db.save_grid_changes(conn, snapshot, [db.ObservationInput(p, cat, D2, score=None) for p in people])
+    assert result.deleted == 3
+
+    with db.connect() as conn:
+        pivot = db.refresh_class_pivot(conn, pivot)
+        grid = db.refresh_entry_grid(conn, grid)
+    assert pivot.dates == (D1,)  # the emptied date column is gone
+    assert grid.cells == {}
+    assert grid.watermark.deletion_id == 3
+    same_as_full_load(db, pivot)
+
+
+def test_refresh_without_changes_keeps_the_matrix(db):
+    sy, people, cat = db.test_ids
+    with db.connect() as conn:
+        pivot = db.load_class_pivot(conn, category_id=cat)
+        again = db.refresh_class_pivot(conn, pivot)
+    assert again.matrix is pivot.matrix
+
+
+def test_rows_stamped_by_a_lagging_clock_are_not_missed(db):
+    sy, (an, bo, cas), cat = db.test_ids
+    with db.connect() as conn:
+        pivot = db.load_class_pivot(conn, category_id=cat)
+        # another app server whose clock runs a minute behind updates a row
+        lagging = pivot.watermark.updated_at - timedelta(seconds=60)
+        obs = db.observations
+        conn.execute(obs.update().where(obs.c.person_id == cas, obs.c.observed_at == D1).values(score=3, updated_at=lagging))
+    with db.connect() as conn:
+        pivot = db.refresh_class_pivot(conn, pivot)
+    assert pivot.matrix.get(cas, D1, cat) == (3, None)
+    same_as_full_load(db, pivot)
+
+
+def test_tombstones_committed_out_of_id_order_are_not_missed(db):
+    sy, (an, bo, cas), cat = db.test_ids
+    obs, tomb = db.observations, db.observation_deletions
+    now = datetime.now(timezone.utc)
+
+    def delete(person, tombstone_id, deleted_at):
+        with db.connect() as conn:
+            oid = conn.execute(select(obs.c.id).where(obs.c.person_id == person, obs.c.observed_at == D1)).scalar_one()
+            conn.execute(obs.delete().where(obs.c.id == oid))
+            conn.execute(
+                tomb.insert().values(
+                    id=tombstone_id, observation_id=oid, school_year_id=sy, person_id=person, category_id=cat, observed_at=D1, deleted_at=deleted_at
+                )
+            )
+
+    with db.connect() as conn:
+        pivot = db.load_class_pivot(conn, category_id=cat)
+    # on PostgreSQL the transaction that got tombstone id 7 can commit after the one that got id 10
+    delete(bo, 10, now)
+    with db.connect() as conn:
+        pivot = db.refresh_class_pivot(conn, pivot)
+    assert pivot.watermark.deletion_id == 10
+    delete(an, 7, now - timedelta(seconds=1))
+    with db.connect() as conn:
+        pivot = db.refresh_class_pivot(conn, pivot)
+    assert pivot.matrix.get(an, D1, cat) == (None, None)
+    same_as_full_load(db, pivot)
+
+
+def test_class_list_change_reloads_in_full(db):
+    sy, people, cat = db.test_ids
+    with db.connect() as conn:
+        db.get_cached_class_pivot(conn, category_id=cat)
+    with db.connect() as conn:
+        newcomer = db.create_person(conn, school_year_id=sy, first_name="Dirk", last_name="X")
+        db.upsert_observations(conn, [db.ObservationInput(newcomer, cat, D1, score=1)], school_year_id=sy)
+    with db.connect() as conn:
+        pivot = db.get_cached_class_pivot(conn, category_id=cat)
+    assert pivot.persons[-1] == (newcomer, "Dirk X")
+    same_as_full_load(db, pivot)
@@ -0,0 +1,90 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def hermetic_settings(monkeypatch):
+    monkeypatch.setenv("IGNORE_STREAMLIT_SECRETS", "1")
+    import app.db as db
+
+    for setting in db.ENGINE_PROFILE_SETTINGS.values():
+        monkeypatch.delenv(setting, raising=False)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+def test_dialect_defaults(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'p.db'}")
+    assert db.load_engine_profile("sqlite:///x.db") == db.SQLITE_ENGINE_DEFAULTS
+    pg = db.load_engine_profile("postgresql+psycopg://u:p@host/db")
+    assert pg == db.POSTGRES_ENGINE_DEFAULTS
+    assert pg.pool_pre_ping is True
+    assert pg.pool_recycle > 0
+
+
+def test_env_overrides(tmp_path, monkeypatch):
+    db = reload_db(f"sqlite:///{tmp_path / 'p.db'}")
+    monkeypatch.setenv("DB_POOL_SIZE", "12")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "2.5")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+    profile = db.load_engine_profile("postgresql+psycopg://u:p@host/db")
+    assert profile.pool_size == 12
+    assert profile.pool_pre_ping is False
+    assert profile.pool_timeout == 2.5
+    assert profile.statement_timeout_ms == 5000
+    assert profile.max_overflow == db.POSTGRES_ENGINE_DEFAULTS.max_overflow
+
+
+def test_invalid_override_is_reported(tmp_path, monkeypatch):
+    db = reload_db(f"sqlite:///{tmp_path / 'p.db'}")
+    monkeypatch.setenv("DB_POOL_SIZE", "lots")
+    with pytest.raises(ValueError, match="DB_POOL_SIZE"):
+        db.load_engine_profile("sqlite:///x.db")
+
+
+def test_engine_uses_profile_and_records_checkouts(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "2")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    db = reload_db(f"sqlite:///{tmp_path / 'p.db'}")
+    engine = db.get_engine()
+    assert isinstance(engine.pool, db.MeteredQueuePool)
+    assert engine.pool.size() == 2
+
+    db.pool_metrics.reset()
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+    stats = db.get_pool_metrics()
+    assert stats["checkouts"] == 3
+    assert stats["timeouts"] == 0
+    assert stats["checked_out"] == 0
+    assert stats["pool_size"] == 2
+
+
+def test_pool_timeout_is_counted(tmp_path, monkeypatch):
+    from sqlalchemy.exc import TimeoutError as SATimeoutError
+
+    monkeypatch.setenv("DB_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "0.05")
+    db = reload_db(f"sqlite:///{tmp_path / 'p.db'}")
+    engine = db.get_engine()
+    db.pool_metrics.reset()
+    with engine.connect():
+        with pytest.raises(SATimeoutError):
+            engine.connect()
+    assert db.get_pool_metrics()["timeouts"] == 1
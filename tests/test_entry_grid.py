@@ -0,0 +1,89 @@
+import importlib
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DAY = date(2025, 10, 6)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'entry.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        old = db.create_school_year(conn, name="2024/2025", start_year=2024, end_year=2025)
+        db.create_person(conn, school_year_id=old, first_name="Oud", last_name="Leerling")
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        people = [db.create_person(conn, school_year_id=sy, first_name=n, last_name="X") for n in ("Cas", "An", "Bo")]
+        cats = [db.create_category(conn, label=f"C{i}", key=f"c{i}") for i in range(3)]
+        db.upsert_observations(
+            conn,
+            [
+                db.ObservationInput(people[0], cats[0], DAY, score=3),
+                db.ObservationInput(people[1], cats[1], DAY, score=None, comment="afwezig"),
+                db.ObservationInput(people[1], cats[2], DAY, score=1),  # category not on screen
+                db.ObservationInput(people[2], cats[0], date(2025, 10, 7), score=4),  # other date
+            ],
+            school_year_id=sy,
+        )
+    db.test_ids = sy, people, cats
+    return db
+
+
+def test_grid_is_loaded_in_one_query(db):
+    sy, people, cats = db.test_ids
+    with db.count_queries() as stats:
+        with db.connect() as conn:
+            grid = db.load_entry_grid(conn, observed_at=DAY, category_ids=cats[:2])
+    assert stats.statements == 1
+    assert grid.school_year_id == sy
+    assert [name for _, name in grid.persons] == ["An X", "Bo X", "Cas X"]
+    assert set(grid.cells) == {(people[0], cats[0]), (people[1], cats[1])}
+    assert grid.cells[(people[1], cats[1])].comment == "afwezig"
+
+
+def test_school_year_without_persons_still_resolves(db):
+    with db.connect() as conn:
+        empty = db.create_school_year(conn, name="2026/2027", start_year=2026, end_year=2027)
+    with db.connect() as conn:
+        grid = db.load_entry_grid(conn, observed_at=DAY, category_ids=[1])
+    assert grid.school_year_id == empty
+    assert grid.persons == () and grid.cells == {}
+
+
+def test_cached_grid_is_reused_until_it_is_saved(db):
+    sy, people, cats = db.test_ids
+    with db.connect() as conn:
+        first = db.get_cached_entry_grid(conn, observed_at=DAY, category_ids=[cats[1], cats[0]])
+
+    with db.count_queries() as stats:
+        with db.request_scope():
+            with db.connect() as conn:
+                again = db.get_cached_entry_grid(conn, observed_at=DAY, category_ids=cats[:2])
+    assert again is first
+    assert stats.statements == 1  # data_versions poll only
+
+    snapshot = first.snapshot()
+    with db.connect() as conn:
+        result = db.save_grid_changes(conn, snapshot, [db.ObservationInput(people[2], cats[0], DAY, score=2)])
+    result.apply(snapshot)
+    assert (people[2], cats[0]) not in first.cells  # the cached grid is never mutated by a session
+
+    with db.connect() as conn:
+        fresh = db.get_cached_entry_grid(conn, observed_at=DAY, category_ids=cats[:2])
+    assert fresh is not first
+    assert fresh.cells == snapshot.cells
@@ -0,0 +1,157 @@
+import importlib
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DAY = date(2025, 10, 6)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+@pytest.fixture
+def grid(tmp_path):
+    """A 25 persons x 5 categories class with one saved grid for DAY."""
+    db = reload_db(f"sqlite:///{tmp_path / 'grid.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        persons = [db.create_person(conn, school_year_id=sy, first_name=f"P{i:02d}", last_name="X") for i in range(25)]
+        cats = [db.create_category(conn, label=f"C{i}", key=f"c{i}") for i in range(5)]
+        db.upsert_observations(conn, [db.ObservationInput(p, c, DAY, score=2) for p in persons for c in cats[:4]], school_year_id=sy)
+    return db, sy, persons, cats
+
+
+def load(db, sy, cats):
+    with db.connect() as conn:
+        return db.load_grid_snapshot(conn, school_year_id=sy, observed_at=DAY, category_ids=cats)
+
+
+def test_unchanged_grid_writes_nothing(grid):
+    db, sy, persons, cats = grid
+    snapshot = load(db, sy, cats)
+    edits = [db.ObservationInput(p, c, DAY, score=2) for p in persons for c in cats[:4]]
+    edits += [db.ObservationInput(p, cats[4], DAY) for p in persons]  # untouched empty column
+    with db.count_queries() as stats:
+        with db.connect() as conn:
+            result = db.save_grid_changes(conn, snapshot, edits)
+    assert result == db.GridSaveResult()
+    assert stats.statements == 0
+
+
+def test_only_changed_cells_are_written(grid):
+    db, sy, persons, cats = grid
+    snapshot = load(db, sy, cats)
+    edits = [
+        db.ObservationInput(persons[0], cats[0], DAY, score=4),  # update
+        db.ObservationInput(persons[1], cats[0], DAY, score=3, comment="beter"),  # update
+        db.ObservationInput(persons[2], cats[4], DAY, score=1),  # insert
+        db.ObservationInput(persons[3], cats[1], DAY, score=None),  # cleared -> delete
+        db.ObservationInput(persons[4], cats[1], DAY, score=2),  # unchanged
+    ]
+    with db.count_queries() as stats:
+        with db.connect() as conn:
+            result = db.save_grid_changes(conn, snapshot, edits)
+    assert result == db.GridSaveResult(inserted=1, updated=2, deleted=1)
+    # insert + update + delete + tombstone + data_versions bump
+    assert stats.statements == 5
+
+    fresh = load(db, sy, cats)
+    assert fresh.cells != snapshot.cells  # the snapshot only changes once the save is committed
+    result.apply(snapshot)
+    assert fresh.cells == snapshot.cells
+    assert fresh.get(persons[1], cats[0]).comment == "beter"
+    assert fresh.get(persons[3], cats[1]) == db.CellState()
+
+
+def test_one_conflicting_cell_saves_nothing(grid):
+    db, sy, persons, cats = grid
+    teacher_a = load(db, sy, cats)
+    teacher_b = load(db, sy, cats)
+
+    with db.connect() as conn:
+        assert db.save_grid_changes(conn, teacher_a, [db.ObservationInput(persons[0], cats[0], DAY, score=4)]).updated == 1
+    with db.connect() as conn:
+        version = db.data_version(conn, f"observations:{sy}")
+
+    edits = [
+        db.ObservationInput(persons[0], cats[0], DAY, score=1),  # A changed this meanwhile
+        db.ObservationInput(persons[1], cats[0], DAY, score=1),  # update
+        db.ObservationInput(persons[2], cats[4], DAY, score=3),  # insert
+        db.ObservationInput(persons[3], cats[1], DAY, score=None),  # delete
+    ]
+    before = teacher_b.cells
+    with pytest.raises(db.GridConflict) as err:
+        with db.connect() as conn:
+            db.save_grid_changes(conn, teacher_b, edits)
+    assert err.value.conflicts == ((persons[0], cats[0]),)
+    assert teacher_b.cells == before
+
+    final = load(db, sy, cats)
+    assert final.get(persons[0], cats[0]).score == 4
+    assert final.get(persons[1], cats[0]).score == 2
+    assert final.get(persons[2], cats[4]) == db.CellState()
+    assert final.get(persons[3], cats[1]).score == 2
+    with db.connect() as conn:
+        assert db.data_version(conn, f"observations:{sy}") == version
+        assert conn.execute(db.observation_deletions.select()).all() == []
+
+
+def test_conflict_inside_a_rerun_is_rolled_back_on_its_own(grid):
+    db, sy, persons, cats = grid
+    teacher_a = load(db, sy, cats)
+    teacher_b = load(db, sy, cats)
+    with db.connect() as conn:
+        db.save_grid_changes(conn, teacher_a, [db.ObservationInput(persons[0], cats[0], DAY, score=4)])
+
+    with db.request_scope():
+        with db.connect() as conn:
+            with pytest.raises(db.GridConflict):
+                db.save_grid_changes(
+                    conn, teacher_b, [db.ObservationInput(persons[0], cats[0], DAY, score=1), db.ObservationInput(persons[1], cats[0], DAY, score=1)]
+                )
+            # the page goes on with the same connection; the scope commits at the end
+            db.create_school_year(conn, name="2026/2027", start_year=2026, end_year=2027)
+
+    final = load(db, sy, cats)
+    assert final.get(persons[1], cats[0]).score == 2
+
+
+def test_concurrent_insert_and_delete_are_conflicts(grid):
+    db, sy, persons, cats = grid
+    teacher_a = load(db, sy, cats)
+    teacher_b = load(db, sy, cats)
+    with db.connect() as conn:
+        db.save_grid_changes(
+            conn,
+            teacher_a,
+            [db.ObservationInput(persons[0], cats[4], DAY, score=3), db.ObservationInput(persons[1], cats[0], DAY, score=None)],
+        )
+
+    with pytest.raises(db.GridConflict) as err:
+        with db.connect() as conn:
+            db.save_grid_changes(
+                conn,
+                teacher_b,
+                [db.ObservationInput(persons[0], cats[4], DAY, score=1), db.ObservationInput(persons[1], cats[0], DAY, score=None)],
+            )
+    assert set(err.value.conflicts) == {(persons[0], cats[4]), (persons[1], cats[0])}
+    assert load(db, sy, cats).get(persons[0], cats[4]).score == 3
+
+
+def test_edits_for_another_date_are_rejected(grid):
+    db, sy, persons, cats = grid
+    snapshot = load(db, sy, cats)
+    with pytest.raises(ValueError):
+        snapshot.changed([db.ObservationInput(persons[0], cats[0], date(2025, 10, 7), score=1)])
@@ -0,0 +1,98 @@
+import importlib
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_modules_with_dburl(db_url: str):
+    os.environ['DATABASE_URL'] = db_url
+    import app.db as db
+    importlib.reload(db)
+    import app.hashing as hashing
+    importlib.reload(hashing)
+    import app.auth as auth
+    importlib.reload(auth)
+    return db, hashing, auth
+
+
+def test_executor_caps_concurrency_and_records_queue_wait(tmp_path):
+    _, hashing, _ = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'h.db'}")
+    executor = hashing.HashExecutor(workers=2, max_pending=8, queue_timeout=5)
+    running, peak, lock = 0, 0, threading.Lock()
+
+    def slow():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    futures = [executor.submit(slow) for _ in range(6)]
+    for f in futures:
+        f.result()
+    stats = executor.metrics.snapshot()
+    assert peak == 2
+    assert stats["jobs"] == 6 and stats["in_flight"] == 0
+    # the last two jobs queued behind two rounds of 50 ms
+    assert stats["max_wait_ms"] >= 80
+    executor.shutdown()
+
+
+def test_full_queue_raises_busy(tmp_path):
+    _, hashing, _ = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'h.db'}")
+    executor = hashing.HashExecutor(workers=1, max_pending=1, queue_timeout=0.05)
+    release = threading.Event()
+    blocked = executor.submit(release.wait)
+    with pytest.raises(hashing.HashingBusy):
+        executor.submit(lambda: None)
+    release.set()
+    blocked.result()
+    assert executor.metrics.snapshot()["rejected"] == 1
+    # the slot is free again
+    assert executor.run(lambda: 42) == 42
+    executor.shutdown()
+
+
+def test_login_rehashes_outdated_work_factor(tmp_path, monkeypatch):
+    monkeypatch.setenv("PBKDF2_ITERATIONS", "1000")
+    db, hashing, auth = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'h.db'}")
+    db.init_db()
+    auth.create_user("juf@school.be", "Juf", temp_password="geheim")
+
+    def stored():
+        with db.connect() as conn:
+            return db.get_user_by_email(conn, "juf@school.be")["password_hash"]
+
+    old = stored()
+    assert db._pbkdf2_iterations(old) == 1000
+    assert auth.authenticate("juf@school.be", "geheim")
+    assert stored() == old
+
+    monkeypatch.setenv("PBKDF2_ITERATIONS", "2000")
+    importlib.reload(db)
+    assert hashing.needs_rehash(old)
+    assert auth.authenticate("juf@school.be", "geheim")
+    assert db._pbkdf2_iterations(stored()) == 2000
+    assert auth.authenticate("juf@school.be", "geheim")
+    assert not auth.authenticate("juf@school.be", "fout")
+
+
+def test_change_password_returns_user_without_hash(tmp_path):
+    db, _, auth = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'h.db'}")
+    db.init_db()
+    u = auth.create_user("meester@school.be", "Meester")
+    user = auth.change_password(u["id"], "nieuw-wachtwoord")
+    assert user["email"] == "meester@school.be"
+    assert user["must_change_password"] is False
+    assert "password_hash" not in user
+    assert auth.change_password(10_000, "x") is None
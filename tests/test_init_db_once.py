@@ -0,0 +1,84 @@
+import importlib
+import os
+import sys
+import threading
+
+from sqlalchemy import event, text
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+def count_statements(engine):
+    statements = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _before)
+    return statements
+
+
+def test_ensure_db_initialized_runs_once_per_process(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'once.db'}")
+    statements = count_statements(db.get_engine())
+
+    db.ensure_db_initialized()
+    assert statements, "first call should bootstrap the schema"
+
+    statements.clear()
+    for _ in range(5):
+        db.ensure_db_initialized()
+    assert statements == []
+
+    with db.get_engine().connect() as conn:
+        assert len(conn.execute(db.users.select()).all()) == 1
+
+
+def test_concurrent_sessions_bootstrap_once(tmp_path, monkeypatch):
+    db = reload_db(f"sqlite:///{tmp_path / 'race.db'}")
+    calls = []
+    real_init = db.init_db
+
+    def counting_init():
+        calls.append(1)
+        real_init()
+
+    monkeypatch.setattr(db, "init_db", counting_init)
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        db.ensure_db_initialized()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == [1]
+
+
+def test_init_db_skips_create_all_when_schema_is_at_head(tmp_path, monkeypatch):
+    db = reload_db(f"sqlite:///{tmp_path / 'stamped.db'}")
+    db.init_db()
+    with db.get_engine().connect() as conn:
+        conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        conn.execute(text("INSERT INTO alembic_version VALUES (:v)"), {"v": db.SCHEMA_REVISION})
+        conn.commit()
+
+    def fail_create_all(*args, **kwargs):
+        raise AssertionError("create_all should not run for a database at head")
+
+    monkeypatch.setattr(db.metadata, "create_all", fail_create_all)
+    db.init_db()
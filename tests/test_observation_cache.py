@@ -0,0 +1,98 @@
+import importlib
+import os
+import sys
+from datetime import date
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.cache import TTLCache
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+def seed(db):
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        person = db.create_person(conn, school_year_id=sy, first_name="An", last_name="Peeters")
+        cat = db.create_category(conn, label="Sociaal", key="sociaal")
+        conn.execute(
+            db.observations.insert(),
+            [dict(person_id=person, category_id=cat, observed_at=date(2025, 9, d), school_year_id=sy, score=2, comment="ok") for d in range(1, 11)],
+        )
+    return sy, person, cat
+
+
+def test_filter_spec_is_hashable_and_normalized():
+    from app.db import ObservationFilter
+
+    a = ObservationFilter(text="  ", category_id=0)
+    b = ObservationFilter()
+    assert a == b and hash(a) == hash(b)
+    assert ObservationFilter(cursor="x").first_page() == b
+
+
+def test_repeated_views_are_served_from_memory(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'cache.db'}")
+    db.init_db()
+    seed(db)
+    spec = db.ObservationFilter(start_date=date(2025, 9, 3), limit=5)
+
+    with db.connect() as conn:
+        first = db.get_cached_observations_page(conn, spec)
+    with db.count_queries() as stats:
+        with db.request_scope():
+            with db.connect() as conn:
+                again = db.get_cached_observations_page(conn, spec)
+    assert again is first
+    assert stats.statements == 1  # data_versions poll only
+    assert db.observation_cache.stats()["hits"] == 1
+
+
+def test_observation_write_invalidates_cached_pages(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'inval.db'}")
+    db.init_db()
+    sy, person, cat = seed(db)
+    spec = db.ObservationFilter(limit=50)
+
+    with db.connect() as conn:
+        assert len(db.get_cached_observations_page(conn, spec).rows) == 10
+    with db.connect() as conn:
+        conn.execute(db.observations.insert().values(person_id=person, category_id=cat, observed_at=date(2025, 10, 1), school_year_id=sy, score=1))
+        db.bump_data_version(conn, *db.observation_domains(sy))
+    with db.connect() as conn:
+        assert len(db.get_cached_observations_page(conn, spec).rows) == 11
+
+
+def test_ttl_cache_expires_and_evicts_lru():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    loads = []
+
+    def loader(value):
+        def _load():
+            loads.append(value)
+            return value
+
+        return _load
+
+    assert cache.get_or_load("a", 1, loader("a")) == "a"
+    assert cache.get_or_load("a", 1, loader("a2")) == "a"
+    # version change forces a reload
+    assert cache.get_or_load("a", 2, loader("a3")) == "a3"
+    cache.get_or_load("b", 1, loader("b"))
+    cache.get_or_load("a", 2, loader("unused"))  # touch a so b is least recently used
+    cache.get_or_load("c", 1, loader("c"))
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_load("b", 1, loader("b2")) == "b2"
+
+    now[0] = 11
+    assert cache.get_or_load("c", 1, loader("c2")) == "c2"
+    assert loads == ["a", "a3", "b", "c", "b2", "c2"]
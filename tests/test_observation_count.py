@@ -0,0 +1,77 @@
+import importlib
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'count.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        person = db.create_person(conn, school_year_id=sy, first_name="An", last_name="Peeters")
+        cats = [db.create_category(conn, label=f"C{i}", key=f"c{i}") for i in range(3)]
+        conn.execute(
+            db.observations.insert(),
+            [
+                dict(person_id=person, category_id=c, observed_at=date(2025, 9, 1) + timedelta(days=d), school_year_id=sy, score=1, comment="goed" if d % 2 else "matig")
+                for c in cats
+                for d in range(40)
+            ],
+        )
+    db.test_categories = cats
+    return db
+
+
+def test_exact_count_for_filters_under_the_cap(db):
+    with db.connect() as conn:
+        assert db.count_observations(conn, db.ObservationFilter()) == db.ObservationCount(120)
+        assert db.count_observations(conn, db.ObservationFilter(category_id=db.test_categories[0])).value == 40
+        assert db.count_observations(conn, db.ObservationFilter(text="goed")).value == 60
+        assert db.count_observations(conn, db.ObservationFilter(start_date=date(2025, 10, 1))).value == 30
+
+
+def test_count_stops_at_the_cap(db):
+    with db.connect() as conn:
+        count = db.count_observations(conn, db.ObservationFilter(), cap=50)
+    assert count == db.ObservationCount(50, exact=False)
+    assert count.label() == "meer dan 50"
+
+
+def test_count_is_cached_across_page_flips(db):
+    spec = db.ObservationFilter(limit=10)
+    with db.connect() as conn:
+        page1 = db.get_cached_observations_page(conn, spec)
+        assert db.get_cached_observation_count(conn, spec).value == 120
+
+    with db.count_queries() as stats:
+        with db.request_scope():
+            with db.connect() as conn:
+                page2_spec = db.ObservationFilter(limit=10, cursor=page1.next_cursor)
+                db.get_cached_observations_page(conn, page2_spec)
+                assert db.get_cached_observation_count(conn, page2_spec).value == 120
+    # data_versions poll + the page-2 query; the count comes from the cache
+    assert stats.statements == 2
+
+
+def test_count_labels():
+    from app.db import ObservationCount
+
+    assert ObservationCount(1234).label() == "1 234"
+    assert ObservationCount(25000, exact=False, estimated=True).label() == "ongeveer 25 000"
+    assert ObservationCount(10000, exact=False).label() == "meer dan 10 000"
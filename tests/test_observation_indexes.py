@@ -0,0 +1,133 @@
+import importlib
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select, text
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+@pytest.fixture
+def seeded_db(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'idx.db'}")
+    db.init_db()
+    eng = db.get_engine()
+    with eng.connect() as conn:
+        sy = conn.execute(db.school_years.insert().values(name="2025/2026", start_year=2025, end_year=2026)).inserted_primary_key[0]
+        persons = [
+            conn.execute(db.persons.insert().values(school_year_id=sy, first_name=f"P{i}", last_name="X", full_name=f"P{i} X")).inserted_primary_key[0]
+            for i in range(20)
+        ]
+        cats = [conn.execute(db.categories.insert().values(key=f"c{i}", label=f"C{i}")).inserted_primary_key[0] for i in range(5)]
+        start = date(2025, 9, 1)
+        conn.execute(
+            db.observations.insert(),
+            [
+                dict(person_id=p, category_id=c, observed_at=start + timedelta(days=d), school_year_id=sy, score=1)
+                for p in persons
+                for c in cats
+                for d in range(10)
+            ],
+        )
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+    return db
+
+
+def query_plan(conn, stmt) -> str:
+    compiled = stmt.compile(conn, compile_kwargs={"literal_binds": True})
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return "\n".join(r[-1] for r in rows)
+
+
+def assert_uses_index(plan: str, index_name: str) -> None:
+    assert index_name in plan, plan
+    assert "USING" in plan and "INDEX" in plan, plan
+
+
+def test_metadata_declares_index_set(seeded_db):
+    db = seeded_db
+    from sqlalchemy import inspect
+
+    inspector = inspect(db.get_engine())
+    obs_indexes = {ix["name"]: ix for ix in inspector.get_indexes("observations")}
+    assert obs_indexes["uq_observations_person_category_observed_at"]["unique"]
+    assert "ix_observations_observed_at_id" in obs_indexes
+    assert "ix_observations_observed_at_category_id" in obs_indexes
+    assert "ix_observations_school_year_category_observed_at" in obs_indexes
+    assert "ix_persons_school_year_full_name" in {ix["name"] for ix in inspector.get_indexes("persons")}
+
+
+def test_browse_query_uses_index(seeded_db):
+    db = seeded_db
+    obs = db.observations
+    with db.get_engine().connect() as conn:
+        stmt = select(obs).order_by(obs.c.observed_at.desc(), obs.c.id.desc()).limit(51)
+        assert_uses_index(query_plan(conn, stmt), "ix_observations_observed_at_id")
+
+        stmt = select(obs).where(obs.c.observed_at >= date(2025, 9, 8)).order_by(obs.c.observed_at.desc(), obs.c.id.desc()).limit(51)
+        assert_uses_index(query_plan(conn, stmt), "ix_observations_observed_at")
+
+
+def test_browse_by_category_uses_index(seeded_db):
+    db = seeded_db
+    obs = db.observations
+    with db.get_engine().connect() as conn:
+        stmt = select(obs).where(obs.c.category_id == 2).order_by(obs.c.observed_at.desc(), obs.c.id.desc()).limit(51)
+        assert_uses_index(query_plan(conn, stmt), "ix_observations_category_observed_at_id")
+
+
+def test_person_view_uses_index(seeded_db):
+    db = seeded_db
+    obs = db.observations
+    with db.get_engine().connect() as conn:
+        stmt = select(obs).where(obs.c.person_id == 3).order_by(obs.c.category_id, obs.c.observed_at)
+        assert_uses_index(query_plan(conn, stmt), "uq_observations_person_category_observed_at")
+
+
+def test_class_pivot_uses_index(seeded_db):
+    db = seeded_db
+    obs = db.observations
+    with db.get_engine().connect() as conn:
+        stmt = select(obs.c.person_id, obs.c.observed_at, obs.c.score).where(obs.c.school_year_id == 1, obs.c.category_id == 2)
+        assert_uses_index(query_plan(conn, stmt), "ix_observations_school_year_category_observed_at")
+
+
+def test_class_list_uses_index(seeded_db):
+    db = seeded_db
+    persons = db.persons
+    with db.get_engine().connect() as conn:
+        stmt = select(persons).where(persons.c.school_year_id == 1).order_by(persons.c.full_name)
+        plan = query_plan(conn, stmt)
+        assert_uses_index(plan, "ix_persons_school_year_full_name")
+        assert "TEMP B-TREE" not in plan
+
+
+def test_unique_key_rejects_duplicate_observation(seeded_db):
+    db = seeded_db
+    from sqlalchemy.exc import IntegrityError
+
+    with db.get_engine().connect() as conn:
+        row = conn.execute(select(db.observations).limit(1)).mappings().first()
+        with pytest.raises(IntegrityError):
+            conn.execute(
+                db.observations.insert().values(
+                    person_id=row["person_id"],
+                    category_id=row["category_id"],
+                    observed_at=row["observed_at"],
+                    school_year_id=row["school_year_id"],
+                    score=2,
+                )
+            )
@@ -0,0 +1,97 @@
+import importlib
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+@pytest.fixture
+def grid(tmp_path):
+    """A 25 persons x 5 categories class on a fresh database."""
+    db = reload_db(f"sqlite:///{tmp_path / 'upsert.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        sy = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        persons = [db.create_person(conn, school_year_id=sy, first_name=f"P{i:02d}", last_name="X") for i in range(25)]
+        cats = [db.create_category(conn, label=f"C{i}", key=f"c{i}") for i in range(5)]
+    return db, sy, persons, cats
+
+
+def cells(db, persons, cats, day, score=2, comment=None):
+    return [db.ObservationInput(p, c, day, score=score, comment=comment) for p in persons for c in cats]
+
+
+def test_full_grid_is_written_in_one_statement(grid):
+    db, sy, persons, cats = grid
+    day = date(2025, 10, 6)
+    with db.count_queries() as stats:
+        with db.connect() as conn:
+            result = db.upsert_observations(conn, cells(db, persons, cats, day), school_year_id=sy)
+    assert result == db.UpsertResult(inserted=125, updated=0, skipped=0)
+    # the upsert itself + the data_versions bump
+    assert stats.statements == 2
+    assert stats.commits == 1
+
+
+def test_second_save_overwrites_existing_rows(grid):
+    db, sy, persons, cats = grid
+    day = date(2025, 10, 6)
+    with db.connect() as conn:
+        db.upsert_observations(conn, cells(db, persons, cats, day, score=1), school_year_id=sy)
+    with db.connect() as conn:
+        changed = cells(db, persons[:10], cats, day, score=4, comment="  beter  ")
+        new_day = cells(db, persons[:2], cats[:1], date(2025, 10, 7), score=3)
+        result = db.upsert_observations(conn, changed + new_day, school_year_id=sy)
+    assert result == db.UpsertResult(inserted=2, updated=50, skipped=0)
+
+    with db.connect() as conn:
+        rows = conn.execute(db.observations.select().where(db.observations.c.person_id == persons[0], db.observations.c.observed_at == day)).mappings().all()
+    assert len(rows) == 5
+    assert all(r["score"] == 4 and r["comment"] == "beter" for r in rows)
+
+
+def test_empty_cells_are_skipped_and_question_mark_is_kept(grid):
+    db, sy, persons, cats = grid
+    day = date(2025, 10, 6)
+    rows = [
+        db.ObservationInput(persons[0], cats[0], day, score=None, comment="   "),
+        db.ObservationInput(persons[1], cats[0], day, score=None, comment="afwezig"),
+        db.ObservationInput(persons[2], cats[0], day, score=db.SCORE_UNKNOWN),
+        dict(person_id=persons[3], category_id=cats[0], observed_at=day, score=None),
+    ]
+    with db.connect() as conn:
+        result = db.upsert_observations(conn, rows, school_year_id=sy)
+    assert result == db.UpsertResult(inserted=2, updated=0, skipped=2)
+
+
+def test_invalid_score_rolls_back_the_whole_save(grid):
+    db, sy, persons, cats = grid
+    day = date(2025, 10, 6)
+    with pytest.raises(ValueError):
+        with db.connect() as conn:
+            db.upsert_observations(conn, cells(db, persons, cats[:1], day), school_year_id=sy)
+            db.upsert_observations(conn, [db.ObservationInput(persons[0], cats[1], day, score=7)], school_year_id=sy)
+    with db.connect() as conn:
+        assert conn.execute(db.observations.select()).first() is None
+
+
+def test_save_bumps_observation_versions(grid):
+    db, sy, persons, cats = grid
+    with db.connect() as conn:
+        db.upsert_observations(conn, cells(db, persons[:1], cats[:1], date(2025, 10, 6)), school_year_id=sy)
+        versions = db.read_data_versions(conn)
+    assert versions["observations"] == 1
+    assert versions[f"observations:{sy}"] == 1
@@ -0,0 +1,119 @@
+import importlib
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+def seed(db, n_days=12, per_day=3):
+    """Seed one school year, one person, one category and n_days * per_day observations."""
+    eng = db.get_engine()
+    with eng.connect() as conn:
+        sy = conn.execute(db.school_years.insert().values(name="2025/2026", start_year=2025, end_year=2026)).inserted_primary_key[0]
+        person = conn.execute(db.persons.insert().values(school_year_id=sy, first_name="An", last_name="Peeters", full_name="An Peeters")).inserted_primary_key[0]
+        cats = [
+            conn.execute(db.categories.insert().values(key=f"cat{i}", label=f"Cat {i}", is_active=True)).inserted_primary_key[0]
+            for i in range(per_day)
+        ]
+        start = date(2025, 9, 1)
+        rows = [
+            dict(person_id=person, category_id=cats[j], observed_at=start + timedelta(days=d), school_year_id=sy, score=(d % 4) + 1, comment=f"dag {d}")
+            for d in range(n_days)
+            for j in range(per_day)
+        ]
+        conn.execute(db.observations.insert(), rows)
+        conn.commit()
+    return sy, person, cats
+
+
+def walk_forward(db, conn, limit, **filters):
+    pages = []
+    cursor = None
+    while True:
+        page = db.get_observations_page(conn, limit=limit, cursor=cursor, **filters)
+        pages.append(page)
+        if page.next_cursor is None:
+            return pages
+        cursor = page.next_cursor
+
+
+def test_keyset_pages_match_offset_order(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'keyset.db'}")
+    db.init_db()
+    seed(db)
+
+    with db.get_engine().connect() as conn:
+        expected = [r["id"] for r in db.get_observations(conn, limit=1000)]
+        pages = walk_forward(db, conn, limit=5)
+
+    seen = [r["id"] for p in pages for r in p.rows]
+    assert seen == expected
+    assert pages[0].prev_cursor is None
+    assert all(p.prev_cursor is not None for p in pages[1:])
+    assert len(pages) == 8  # 36 rows / 5 per page
+
+
+def test_prev_cursor_returns_previous_page(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'prev.db'}")
+    db.init_db()
+    seed(db)
+
+    with db.get_engine().connect() as conn:
+        pages = walk_forward(db, conn, limit=4)
+        back = db.get_observations_page(conn, limit=4, cursor=pages[3].prev_cursor)
+        assert [r["id"] for r in back.rows] == [r["id"] for r in pages[2].rows]
+        assert back.next_cursor is not None
+        assert back.prev_cursor is not None
+
+        first = db.get_observations_page(conn, limit=4, cursor=pages[1].prev_cursor)
+        assert [r["id"] for r in first.rows] == [r["id"] for r in pages[0].rows]
+        assert first.prev_cursor is None
+
+
+def test_keyset_page_is_stable_when_new_rows_are_saved(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'stable.db'}")
+    db.init_db()
+    sy, person, cats = seed(db)
+
+    with db.get_engine().connect() as conn:
+        page1 = db.get_observations_page(conn, limit=5)
+        page2 = db.get_observations_page(conn, limit=5, cursor=page1.next_cursor)
+        # someone saves a newer observation in between
+        conn.execute(db.observations.insert().values(person_id=person, category_id=cats[0], observed_at=date(2026, 1, 1), school_year_id=sy, score=1))
+        conn.commit()
+        page2_again = db.get_observations_page(conn, limit=5, cursor=page1.next_cursor)
+
+    assert [r["id"] for r in page2_again.rows] == [r["id"] for r in page2.rows]
+
+
+def test_keyset_respects_filters(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'filters.db'}")
+    db.init_db()
+    sy, person, cats = seed(db)
+
+    with db.get_engine().connect() as conn:
+        pages = walk_forward(db, conn, limit=5, category_id=cats[1], start_date=date(2025, 9, 5))
+    rows = [r for p in pages for r in p.rows]
+    assert len(rows) == 8
+    assert all(r["category_id"] == cats[1] and r["observed_at"] >= date(2025, 9, 5) for r in rows)
+
+
+def test_invalid_cursor_raises_value_error(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'bad.db'}")
+    db.init_db()
+    with db.get_engine().connect() as conn:
+        with pytest.raises(ValueError):
+            db.get_observations_page(conn, cursor="not-a-cursor")
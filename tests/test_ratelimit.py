@@ -0,0 +1,155 @@
+import importlib
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import select
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_modules_with_dburl(db_url: str):
+    os.environ['DATABASE_URL'] = db_url
+    import app.db as db
+    importlib.reload(db)
+    import app.ratelimit as ratelimit
+    importlib.reload(ratelimit)
+    import app.maintenance as maintenance
+    importlib.reload(maintenance)
+    return db, ratelimit, maintenance
+
+
+@pytest.fixture
+def modules(tmp_path):
+    db, ratelimit, maintenance = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'ratelimit.db'}")
+    db.init_db()
+    return db, ratelimit, maintenance
+
+
+def test_sliding_window_and_lock_expiry(modules):
+    _, ratelimit, _ = modules
+    limiter = ratelimit.MemoryRateLimiter(ratelimit.Limit(max_attempts=4, window_seconds=60, lock_seconds=300))
+
+    for now in (0, 10, 20):
+        assert not limiter.record_failure("a", now=now)
+    # 50 s into the next window the three old failures weigh 3 * (1 - 50/60)
+    assert not limiter.record_failure("a", now=110)
+    assert not limiter.is_locked("a", now=110)
+    # right after the window rolled they still count fully
+    for now in (0, 58, 59):
+        assert not limiter.record_failure("b", now=now)
+    assert limiter.record_failure("b", now=60)
+    assert limiter.is_locked("b", now=359)
+    assert not limiter.is_locked("b", now=360)
+    assert "b" not in limiter.entries
+
+
+def test_memory_backend_is_bounded(modules):
+    _, ratelimit, _ = modules
+    limiter = ratelimit.MemoryRateLimiter(ratelimit.Limit(1000, 60, 300), max_keys=100)
+    limiter.record_failure("victim@school.be", now=0)
+    for i in range(1000):
+        limiter.record_failure(f"stuffing{i}@example.com", now=1)
+        if i % 10 == 0:
+            # recently used keys survive the churn
+            limiter.record_failure("victim@school.be", now=1)
+    assert len(limiter.entries) == 100
+    assert limiter.stats()["evictions"] == 901
+    assert limiter.entries["victim@school.be"]["count"] == 101
+
+
+def test_memory_backend_under_thread_hammer(modules):
+    _, ratelimit, _ = modules
+    limit = ratelimit.Limit(max_attempts=8000, window_seconds=3600, lock_seconds=300)
+    limiter = ratelimit.MemoryRateLimiter(limit, max_keys=50)
+    start = threading.Barrier(16)
+
+    def hammer(worker):
+        start.wait()
+        for i in range(500):
+            limiter.record_failure("shared", now=1)
+            limiter.record_failure(f"w{worker}-{i}", now=1)
+            limiter.is_locked("shared", now=1)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(hammer, range(16)))
+    # no lost updates on the shared key (locked exactly at the 8000th), and the dict never outgrew its bound
+    assert limiter.entries["shared"]["count"] == 8000
+    assert len(limiter.entries) == 50
+    assert limiter.is_locked("shared", now=2)
+
+
+def test_database_backend_is_shared_and_purged(modules):
+    db, ratelimit, maintenance = modules
+    limit = ratelimit.Limit(max_attempts=40, window_seconds=60, lock_seconds=300)
+    # two limiters on one table, as in two server processes
+    first = ratelimit.DatabaseRateLimiter(limit, "email")
+    second = ratelimit.DatabaseRateLimiter(limit, "email")
+
+    def hammer(limiter):
+        for _ in range(20):
+            limiter.record_failure("juf@school.be", now=1000)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(hammer, [first, second, first, second]))
+    assert first.is_locked("juf@school.be", now=1001) and second.is_locked("juf@school.be", now=1001)
+    with db.connect() as conn:
+        assert conn.execute(db.login_attempts.select()).mappings().one()["count"] == 40
+
+    second.clear("juf@school.be")
+    assert not first.is_locked("juf@school.be", now=1001)
+    first.record_failure("old@school.be", now=1000)
+    assert maintenance.purge_stale_login_attempts(now=1000 + maintenance.STALE_ATTEMPT_SECONDS + 1) == 1
+
+
+def test_database_backend_commits_on_its_own_and_skips_unknown_addresses(modules, monkeypatch):
+    db, ratelimit, _ = modules
+    import app.auth as auth
+    monkeypatch.setenv("RATE_LIMIT_BACKEND", "database")
+    importlib.reload(auth)
+    try:
+        with db.request_scope():
+            with db.connect() as conn:
+                for i in range(50):
+                    assert auth.authenticate(f"stuffing{i}@example.com", "pw") is None
+                assert auth.authenticate("admin", "wrong") is None
+                # the failure was committed by the limiter, not left in the rerun's transaction
+                assert not conn.in_transaction()
+        with db.connect() as conn:
+            assert conn.execute(select(db.login_attempts.c.key)).scalars().all() == ["email:admin"]
+    finally:
+        monkeypatch.delenv("RATE_LIMIT_BACKEND")
+        importlib.reload(auth)
+
+
+def test_client_limit_is_off_by_default(modules):
+    import app.auth as auth
+    importlib.reload(auth)
+
+    assert auth.CLIENT_LIMITER is None
+    for i in range(50):
+        assert auth.authenticate(f"probe{i}@example.com", "pw", client="ip:203.0.113.9") is None
+    assert auth.authenticate("admin", "admin", client="ip:203.0.113.9") is not None
+
+
+def test_locked_client_is_refused_before_the_password_is_checked(modules, monkeypatch):
+    import app.auth as auth
+    monkeypatch.setenv("LOGIN_CLIENT_MAX_ATTEMPTS", "20")
+    importlib.reload(auth)
+
+    for i in range(auth.MAX_CLIENT_ATTEMPTS):
+        assert auth.authenticate(f"probe{i}@example.com", "pw", client="ip:203.0.113.9") is None
+    assert auth.CLIENT_LIMITER.is_locked("ip:203.0.113.9")
+    # a correct guess from the locked client does not sign in either
+    with pytest.raises(auth.AuthLocked):
+        auth.authenticate("admin", "admin", client="ip:203.0.113.9")
+    # the account itself is not locked: another client still signs in
+    assert auth.authenticate("admin", "admin", client="ip:198.51.100.1") is not None
+
+    monkeypatch.delenv("LOGIN_CLIENT_MAX_ATTEMPTS")
+    importlib.reload(auth)
@@ -0,0 +1,88 @@
+import importlib
+import os
+import sys
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_db(db_url):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    return db
+
+
+def test_categories_are_served_from_cache_until_written(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'ref.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        db.create_category(conn, label="Sociaal", key="sociaal")
+
+    with db.connect() as conn:
+        first = db.list_categories(conn)
+    with db.count_queries() as stats:
+        with db.request_scope():
+            with db.connect() as conn:
+                for _ in range(4):
+                    assert db.list_categories(conn) is first
+    # only the data_versions poll; the categories themselves come from the cache
+    assert stats.statements == 1
+
+    with db.connect() as conn:
+        db.create_category(conn, label="Andere", key="andere")
+    with db.connect() as conn:
+        labels = [c["label"] for c in db.list_categories(conn)]
+    assert labels == ["Andere", "Sociaal"]
+
+
+def test_update_and_delete_invalidate(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'upd.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        cid = db.create_category(conn, label="Oud", key="oud")
+    with db.connect() as conn:
+        assert db.list_categories(conn)[0]["label"] == "Oud"
+        db.update_category(conn, cid, label="Nieuw")
+    with db.connect() as conn:
+        assert db.list_categories(conn)[0]["label"] == "Nieuw"
+        db.delete_category(conn, cid)
+    with db.connect() as conn:
+        assert db.list_categories(conn) == ()
+
+
+def test_uncommitted_write_is_not_cached_for_other_sessions(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'race.db'}")
+    db.init_db()
+    writer = db.get_engine().connect()
+    db.create_category(writer, label="Pending", key="pending")
+    # another session reads before the writer commits and caches the old state
+    with db.connect() as conn:
+        assert db.list_categories(conn) == ()
+    writer.commit()
+    writer.close()
+    with db.connect() as conn:
+        assert [c["label"] for c in db.list_categories(conn)] == ["Pending"]
+
+
+def test_class_list_for_latest_school_year(tmp_path):
+    db = reload_db(f"sqlite:///{tmp_path / 'persons.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        old = db.create_school_year(conn, name="2024/2025", start_year=2024, end_year=2025)
+        new = db.create_school_year(conn, name="2025/2026", start_year=2025, end_year=2026)
+        db.create_person(conn, school_year_id=new, first_name="Zoë", last_name="Claes")
+        pid = db.create_person(conn, school_year_id=new, first_name="Arne", last_name="Maes")
+        db.create_person(conn, school_year_id=old, first_name="Old", last_name="Student")
+
+    with db.connect() as conn:
+        latest = db.get_latest_school_year(conn)
+        assert latest["id"] == new
+        assert [p["full_name"] for p in db.list_persons(conn, new)] == ["Arne Maes", "Zoë Claes"]
+
+    with db.connect() as conn:
+        db.update_person(conn, pid, first_name="Bram")
+    with db.connect() as conn:
+        assert [p["full_name"] for p in db.list_persons(conn, new)] == ["Bram Maes", "Zoë Claes"]
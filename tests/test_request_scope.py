@@ -0,0 +1,109 @@
+import importlib
+import os
+import sys
+
+import pytest
+from streamlit.runtime.scriptrunner import StopException
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_modules_with_dburl(db_url: str):
+    os.environ["DATABASE_URL"] = db_url
+    import app.db as db
+    importlib.reload(db)
+    import app.auth as auth
+    importlib.reload(auth)
+    return db, auth
+
+
+def test_login_flow_shares_one_connection_per_rerun(tmp_path):
+    db, auth = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'scope.db'}")
+    db.init_db()
+
+    with db.count_queries() as unscoped:
+        user = auth.authenticate("admin", "admin")
+        auth.generate_url_token(user["id"])
+    assert unscoped.connections == 2
+
+    with db.count_queries() as scoped:
+        with db.request_scope():
+            user = auth.authenticate("admin", "admin")
+            token = auth.generate_url_token(user["id"], user)
+            assert auth.check_url_token(token) == user["id"]
+    assert scoped.connections == 1
+    # user lookup, last_login update, data_versions poll (signed token, cached revocation check);
+    # the login write commits right away, the read block when it ends
+    assert scoped.statements == 3
+    assert scoped.commits == 2
+
+
+def test_request_scope_without_db_access_checks_out_nothing(tmp_path):
+    db, _ = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'idle.db'}")
+    db.init_db()
+    with db.count_queries() as stats:
+        with db.request_scope() as scope:
+            pass
+    assert not scope.has_connection
+    assert stats.connections == 0
+    assert stats.round_trips == 0
+
+
+def test_request_scope_commits_on_rerun_and_rolls_back_on_error(tmp_path):
+    db, auth = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'tx.db'}")
+    db.init_db()
+
+    with pytest.raises(StopException):
+        with db.request_scope():
+            with db.connect() as conn:
+                conn.execute(db.users.update().where(db.users.c.email == "admin").values(full_name="Kept"))
+                raise StopException()
+
+    for error in (RuntimeError("boom"), KeyboardInterrupt(), SystemExit(1)):
+        with pytest.raises(type(error)):
+            with db.request_scope():
+                with db.connect() as conn:
+                    conn.execute(db.users.update().where(db.users.c.email == "admin").values(full_name="Dropped"))
+                    raise error
+
+    with db.connect() as conn:
+        assert db.get_user_by_email(conn, "admin")["full_name"] == "Kept"
+
+
+def test_writes_commit_at_once_and_a_failed_one_does_not_poison_the_rerun(tmp_path):
+    db, auth = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'units.db'}")
+    db.init_db()
+
+    with db.request_scope():
+        with db.connect() as conn:
+            db.create_school_year(conn, name="2024-2025")
+            # committed: no transaction (or row lock) is left open for the rest of the rerun
+            assert not conn.in_transaction()
+            with pytest.raises(RuntimeError):
+                with db.transaction():
+                    auth.create_user("dropped@example.com", "Dropped")
+                    raise RuntimeError("boom")
+            auth.create_user("after@example.com", "After")
+            assert not conn.in_transaction()
+
+    with db.connect() as conn:
+        assert [y["name"] for y in db.list_school_years(conn)] == ["2024-2025"]
+        assert db.get_user_by_email(conn, "dropped@example.com") is None
+        assert db.get_user_by_email(conn, "after@example.com") is not None
+
+
+def test_nested_counters_add_to_parent(tmp_path):
+    db, _ = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'nested.db'}")
+    db.init_db()
+    with db.count_queries() as outer:
+        with db.connect() as conn:
+            conn.execute(db.users.select())
+        with db.count_queries() as inner:
+            with db.connect() as conn:
+                conn.execute(db.users.select())
+    assert inner.connections == 1
+    assert outer.connections == 2
+    assert outer.statements == 2
@@ -0,0 +1,91 @@
+import os
+import sys
+from datetime import date
+
+import numpy as np
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.matrix import SCORE_NULL, ScoreMatrix, intern_axis
+
+D1, D2 = date(2025, 9, 1), date(2025, 9, 8)
+
+
+def make_matrix(**kwargs):
+    return ScoreMatrix.build(
+        person_ids=[3, 1, 2],
+        person_names=["An", "Bo", "Cas"],
+        dates=[D1, D2],
+        category_ids=[10, 20],
+        obs_person_ids=[3, 1, 2, 2],
+        obs_dates=[D1, D2, D1, D2],
+        obs_category_ids=[10, 10, 10, 20],
+        obs_scores=[0, 4, None, 1],
+        obs_comments=[None, "top", "afwezig", None],
+        **kwargs,
+    )
+
+
+def test_cells_use_int8_codes_with_sentinels():
+    m = make_matrix()
+    assert m.scores.dtype == np.int8
+    assert m.get(3, D1, 10) == (0, None)  # "?"
+    assert m.get(1, D2, 10) == (4, "top")
+    assert m.get(2, D1, 10) == (None, "afwezig")
+    assert m.get(1, D1, 20) == (None, None)
+    assert m.codes(10).tolist() == [[0, SCORE_NULL], [SCORE_NULL, 4], [SCORE_NULL, SCORE_NULL]]
+    assert len(m.comments) == 2
+    # 2 categories x 2 dates x 3 persons, one byte each, plus the two comments
+    assert m.scores.nbytes == 12
+
+
+def test_axes_are_shared_between_matrices():
+    a, b = make_matrix(), make_matrix()
+    assert a.persons is b.persons and a.dates is b.dates
+    assert intern_axis([3, 1, 2], np.int64) is a.persons
+    c = a.copy()
+    c.set(3, D1, 10, 2, "beter")
+    assert a.get(3, D1, 10) == (0, None)
+    assert c.persons is a.persons
+
+
+def test_interning_does_not_freeze_the_callers_array():
+    ids = np.array([3, 1, 2], dtype=np.int64)
+    axis = intern_axis(ids, np.int64)
+    ids[0] = 9  # still writable, and the axis keeps its own labels
+    assert axis.tolist() == [3, 1, 2]
+    assert not axis.values.flags.writeable
+
+
+def test_conversions_share_the_score_buffer():
+    m = make_matrix()
+    assert np.shares_memory(m.codes_frame(10).to_numpy(), m.scores)
+
+    frame = m.to_pandas(10)
+    assert list(frame.index) == ["An", "Bo", "Cas"]
+    assert frame[D1].tolist()[0] == "?" and frame[D2].tolist()[1] == "4"
+    assert frame[D1].isna().tolist() == [False, True, True]
+    assert np.shares_memory(frame[D1].array.codes, m.scores)
+
+    table = m.to_arrow(10)
+    assert table.column_names == ["Naam", "2025-09-01", "2025-09-08"]
+    assert table.column("2025-09-01").to_pylist() == ["?", None, None]
+
+
+def test_flat_lists_filled_cells_by_person_then_date():
+    m = make_matrix()
+    flat = m.flat(10)
+    assert list(zip(flat["person_id"], flat["observed_at"])) == [(3, D1), (1, D2), (2, D1)]
+    assert flat["comment"].tolist() == [None, "top", "afwezig"]
+    assert m.flat(person_id=2)["category_id"].tolist() == [10, 20]
+
+
+def test_versions_are_tracked_for_entry_grids():
+    m = make_matrix(obs_ids=[7, 8, 9, 10], obs_updated_at=[f"2025-09-0{i} 10:00:00.123456" for i in range(1, 5)])
+    observation_id, updated_at = m.version(1, D2, 10)
+    assert observation_id == 8 and updated_at.microsecond == 123456
+    assert m.version(1, D1, 10) == (None, None)
+    assert sorted(m.filled()) == [(1, D2, 10), (2, D1, 10), (2, D2, 20), (3, D1, 10)]
@@ -0,0 +1,115 @@
+import importlib
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_modules_with_dburl(db_url: str):
+    os.environ['DATABASE_URL'] = db_url
+    import app.db as db
+    importlib.reload(db)
+    import app.auth as auth
+    importlib.reload(auth)
+    return db, auth
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    monkeypatch.setenv("TOKEN_SECRET", "test-secret")
+    db, auth = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'tokens.db'}")
+    db.init_db()
+    return db, auth
+
+
+def login(auth, email="admin", password="admin"):
+    user = auth.authenticate(email, password)
+    return user, auth.generate_url_token(user["id"], user)
+
+
+def test_token_is_verified_without_touching_the_token_table(modules):
+    db, auth = modules
+    user, token = login(auth)
+    assert token.startswith("v2.")
+    with db.request_scope():
+        auth.check_url_token(token)
+        with db.count_queries() as stats:
+            for _ in range(5):
+                found = auth.user_from_url_token(token)
+    assert stats.statements == 0
+    assert found["id"] == user["id"] and found["is_admin"] and "password_hash" not in found
+    with db.connect() as conn:
+        assert conn.execute(db.login_tokens.select()).first() is None
+
+
+def test_tampered_or_expired_tokens_are_rejected(modules):
+    _, auth = modules
+    user, token = login(auth)
+    prefix, payload, signature = token.split(".")
+    claims = auth.decode_token(token)
+    forged = auth.issue_token(auth.TokenClaims(claims.user_id, True, False, claims.expires_at, claims.generation))
+    assert auth.check_url_token(f"{prefix}.{forged.split('.')[1]}.{signature}") is None
+    assert auth.check_url_token(token[:-2]) is None
+    assert auth.decode_token(token, now=claims.expires_at + timedelta(seconds=1)) is None
+
+    auth._token_secret = b"another server's secret"
+    assert auth.check_url_token(token) is None
+
+
+def test_password_change_reset_and_role_change_revoke_tokens(modules):
+    db, auth = modules
+    user, token = login(auth)
+    changed = auth.change_password(user["id"], "nieuw")
+    assert auth.check_url_token(token) is None
+    # the page signs a new token from the returned user
+    fresh = auth.generate_url_token(user["id"], changed)
+    assert auth.check_url_token(fresh) == user["id"]
+
+    auth.reset_password(user["id"])
+    assert auth.check_url_token(fresh) is None
+
+    other = auth.create_user("juf@school.be", "Juf", temp_password="geheim")
+    _, other_token = login(auth, "juf@school.be", "geheim")
+    with db.connect() as conn:
+        db.set_users_admin(conn, [other["id"]], True)
+    assert auth.check_url_token(other_token) is None
+
+
+def test_legacy_uuid_tokens_still_work_until_expiry(modules):
+    db, auth = modules
+    user, _ = login(auth)
+    now = datetime.now(timezone.utc)
+    valid, expired = str(uuid.uuid4()), str(uuid.uuid4())
+    with db.connect() as conn:
+        conn.execute(
+            db.login_tokens.insert(),
+            [
+                dict(token=valid, user_id=user["id"], expires_at=now + timedelta(minutes=5), created_at=now),
+                dict(token=expired, user_id=user["id"], expires_at=now - timedelta(minutes=5), created_at=now),
+            ],
+        )
+    import base64
+
+    assert auth.check_url_token(valid) == user["id"]
+    assert auth.check_url_token(base64.urlsafe_b64encode(valid.encode()).decode()) == user["id"]
+    assert auth.check_url_token(expired) is None
+
+
+def test_token_secret_is_required_outside_dev_mode(modules, monkeypatch):
+    _, auth = modules
+    monkeypatch.delenv("TOKEN_SECRET")
+    monkeypatch.setenv("IGNORE_STREAMLIT_SECRETS", "1")
+    monkeypatch.setattr(auth, "_token_secret", None)
+    monkeypatch.setenv("APP_ENV", "prod")
+    with pytest.raises(RuntimeError, match="TOKEN_SECRET"):
+        auth.generate_url_token(1, {"is_admin": True, "must_change_password": False, "token_generation": 0})
+    # dev mode falls back to a random key
+    monkeypatch.setenv("APP_ENV", "dev")
+    assert auth.generate_url_token(1, {"is_admin": True, "must_change_password": False, "token_generation": 0}).startswith("v2.")
@@ -0,0 +1,89 @@
+import importlib
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_modules_with_dburl(db_url: str):
+    os.environ['DATABASE_URL'] = db_url
+    import app.db as db
+    importlib.reload(db)
+    import app.maintenance as maintenance
+    importlib.reload(maintenance)
+    return db, maintenance
+
+
+@pytest.fixture
+def modules(tmp_path):
+    db, maintenance = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'purge.db'}")
+    db.init_db()
+    return db, maintenance
+
+
+def add_tokens(db, user_id, n, *, expires_in, created_at=None):
+    now = datetime.now(timezone.utc)
+    rows = [
+        dict(
+            token=str(uuid.uuid4()),
+            user_id=user_id,
+            expires_at=now + expires_in,
+            created_at=(created_at or now) + timedelta(seconds=i),
+        )
+        for i in range(n)
+    ]
+    with db.connect() as conn:
+        conn.execute(db.login_tokens.insert(), rows)
+    return [r["token"] for r in rows]
+
+
+def test_purge_deletes_only_expired_tokens_in_batches(modules):
+    db, maintenance = modules
+    add_tokens(db, 1, 25, expires_in=timedelta(minutes=-5))
+    live = add_tokens(db, 1, 3, expires_in=timedelta(minutes=5))
+
+    with db.count_queries() as stats:
+        deleted = maintenance.purge_expired_login_tokens(batch_size=10)
+    assert deleted == 25
+    # 10 + 10 + 5: one short transaction per batch
+    assert stats.commits == 3
+    with db.connect() as conn:
+        assert sorted(conn.execute(db.login_tokens.select()).scalars()) == sorted(live)
+        assert maintenance.login_token_counts(conn) == {"total": 3, "expired": 0, "live": 3}
+
+
+def test_cap_keeps_the_newest_tokens_per_user(modules):
+    db, maintenance = modules
+    start = datetime.now(timezone.utc) - timedelta(hours=1)
+    first = add_tokens(db, 1, 5, expires_in=timedelta(hours=1), created_at=start)
+    second = add_tokens(db, 2, 2, expires_in=timedelta(hours=1), created_at=start)
+
+    assert maintenance.cap_login_tokens_per_user(2, batch_size=2) == 3
+    with db.connect() as conn:
+        left = set(conn.execute(db.login_tokens.select()).scalars())
+    assert left == set(first[-2:]) | set(second)
+
+
+def test_run_records_metrics_and_scheduler_starts_once(modules, monkeypatch):
+    db, maintenance = modules
+    add_tokens(db, 1, 4, expires_in=timedelta(minutes=-1))
+    add_tokens(db, 1, 3, expires_in=timedelta(minutes=5))
+    monkeypatch.setenv("LOGIN_TOKENS_PER_USER", "1")
+
+    assert maintenance.run_token_maintenance() == {"deleted_expired": 4, "deleted_over_cap": 2, "deleted_attempts": 0}
+    snap = maintenance.maintenance_metrics.snapshot()
+    assert snap["runs"] == 1 and snap["deleted_expired"] == 4 and snap["deleted_over_cap"] == 2
+
+    assert maintenance.start_maintenance_scheduler(interval=0) is False
+    try:
+        assert maintenance.start_maintenance_scheduler(interval=3600) is True
+        assert maintenance.start_maintenance_scheduler(interval=3600) is False
+    finally:
+        maintenance.stop_maintenance_scheduler()
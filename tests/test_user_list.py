@@ -0,0 +1,96 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# ensure project root is on sys.path
+ROOT = os.path.dirname(os.path.dirname(__file__))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def reload_modules_with_dburl(db_url: str):
+    os.environ['DATABASE_URL'] = db_url
+    import app.db as db
+    importlib.reload(db)
+    import app.auth as auth
+    importlib.reload(auth)
+    return db, auth
+
+
+@pytest.fixture
+def modules(tmp_path):
+    db, auth = reload_modules_with_dburl(f"sqlite:///{tmp_path / 'users.db'}")
+    db.init_db()
+    with db.connect() as conn:
+        conn.execute(
+            db.users.insert(),
+            [
+                dict(email=f"user{i:03d}@school.be", full_name=name, password_hash="x", is_admin=False)
+                for i, name in enumerate(["An Peeters", "Bram Janssens", "anna Claes"] + [f"Leerkracht {i}" for i in range(117)])
+            ],
+        )
+    return db, auth
+
+
+def test_pages_follow_email_order_without_password_hash(modules):
+    db, _ = modules
+    seen, after = [], None
+    with db.connect() as conn:
+        while True:
+            page = db.list_users_page(conn, after=after, limit=50)
+            assert "password_hash" not in page.rows[0].keys()
+            seen.extend(r["email"] for r in page.rows)
+            after = page.next_cursor
+            if after is None:
+                break
+    # 120 users + the bootstrapped admin, no duplicates, in order
+    assert len(seen) == len(set(seen)) == 121
+    assert seen == sorted(seen)
+
+
+def test_prefix_search_on_email_and_name(modules):
+    db, _ = modules
+    with db.connect() as conn:
+        by_name = db.list_users_page(conn, search="  AN ").rows
+        by_email = db.list_users_page(conn, search="user00", limit=5)
+        nothing = db.list_users_page(conn, search="peeters").rows
+    assert {r["full_name"] for r in by_name} == {"An Peeters", "anna Claes"}
+    assert len(by_email.rows) == 5 and by_email.next_cursor == "user004@school.be"
+    assert nothing == []
+
+
+def test_search_uses_indexes(modules):
+    db, _ = modules
+    with db.connect() as conn:
+        stmt = db.select(db.users.c.id).where(
+            db._prefix_match(db.users.c.email, "an", "sqlite") | db._prefix_match(db.func.lower(db.users.c.full_name), "an", "sqlite")
+        )
+        compiled = stmt.compile(conn, compile_kwargs={"literal_binds": True})
+        plan = " ".join(r[-1] for r in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}"))
+    assert "ix_users_full_name_lower" in plan
+    assert "SCAN users" not in plan
+
+
+def test_bulk_admin_and_reset_in_one_transaction(modules):
+    db, auth = modules
+    with db.connect() as conn:
+        ids = [r["id"] for r in db.list_users_page(conn, search="user0", limit=10).rows]
+    with db.count_queries() as stats:
+        with db.connect() as conn:
+            assert db.set_users_admin(conn, ids, True) == 10
+            # already admin: nothing changes
+            assert db.set_users_admin(conn, ids[:3], True) == 0
+    assert stats.commits == 1
+
+    with db.count_queries() as stats:
+        temps = auth.reset_passwords(ids[:4] + [10_000])
+    assert set(temps) == set(ids[:4])
+    # the email lookup + one executemany update + the users version bump
+    assert stats.statements == 3 and stats.commits == 1
+    for uid, temp in temps.items():
+        with db.connect() as conn:
+            row = conn.execute(db.users.select().where(db.users.c.id == uid)).mappings().first()
+        assert row["is_admin"] and row["must_change_password"]
+        assert db.verify_password(temp, row["password_hash"])